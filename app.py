@@ -15,6 +15,7 @@ from vision.json.new_json import componentJSON, wiresJSON
 from vision.processing import extract_pred
 from vision.wire.processing import extract_pred_wire
 from vision.tools.operations import create_white_mask
+from vision.inception.classes import IdTable
 from vision.inception.main import inceptionFunction as inception
 # Import new circuit visualization module
 from vision.visualization.circuit_viz import build_circuit_diagram
@@ -281,7 +282,8 @@ def main():
             data_wire = []
         
         # Inception (component and wire joining)
-        devices, wires = inception(data_device_dict, data_wire, (width, height), classes)
+        ids = IdTable()
+        devices, wires = inception(data_device_dict, data_wire, (width, height), classes, ids)
         
         # Ensure devices and wires are properly formatted
         if not isinstance(devices, dict):
@@ -301,8 +303,8 @@ def main():
         freenodes = list(set(tuple(node) for node in freenodes) - connected_points)
         
         # Generate JSON with free nodes
-        component_json = componentJSON(devices, freenodes)
-        wires_json = wiresJSON(wires)
+        component_json = componentJSON(devices, freenodes, ids)
+        wires_json = wiresJSON(wires, ids)
         
         json_data = {
             "wires": wires_json,
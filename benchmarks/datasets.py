@@ -0,0 +1,99 @@
+import json
+import math
+import os
+import random
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+# Recorded detections at the repo root (device boxes, wire segments, classes)
+FIXTURES = ["stored_data.json", "stored_data_2.json"]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Dataset = Dict[str, object]
+
+
+def load_fixture(name: str) -> Dataset:
+    """Load one of the stored_data*.json recordings"""
+    with open(os.path.join(REPO_ROOT, name), "r") as file:
+        data = json.load(file)
+    return {
+        "name": os.path.splitext(name)[0],
+        "data_device": data["data_device"],
+        "data_wire": [tuple(w) for w in data["data_wire"]],
+        "image_size": tuple(data["image_size"]),
+        "classes": data["classes"],
+    }
+
+
+def _wire(x1: float, y1: float, x2: float, y2: float) -> Tuple[float, float, float, float, float]:
+    """Wire tuple in extract_pred_wire's (angle, x1, y1, x2, y2) format"""
+    return (math.degrees(math.atan2(y2 - y1, x2 - x1)), x1, y1, x2, y2)
+
+
+def synthetic(n_wires: int, seed: int = 0) -> Dataset:
+    """Grid of two-terminal devices joined by wires, in normalised coordinates.
+
+    Devices sit on a square grid; each wire runs from one device terminal to
+    the next one along a row or down a column, with a little endpoint jitter
+    so the clustering in inception has real work to do. wire_nodes holds
+    the terminal each wire end was drawn from (2 * device + 0 for the left
+    terminal, + 1 for the right, None for free-floating stubs), the ground
+    truth for the matchers.
+    """
+    rng = random.Random(seed)
+    n_devices = max(2, n_wires // 2)
+    per_row = math.ceil(math.sqrt(n_devices))
+    cell = 1.0 / per_row
+    jitter = 0.02 * cell
+    device_classes = ["resistor", "capacitor", "inductor", "diode", "switch", "powersource"]
+
+    data_device = {}
+    classes = []
+    terminals = []
+    for i in range(n_devices):
+        row, col = divmod(i, per_row)
+        cx, cy = (col + 0.5) * cell, (row + 0.5) * cell
+        x1, x2 = cx - 0.2 * cell, cx + 0.2 * cell
+        y1, y2 = cy - 0.1 * cell, cy + 0.1 * cell
+        data_device[str(uuid.UUID(int=rng.getrandbits(128)))] = [x1, y1, x2, y2]
+        classes.append(rng.choice(device_classes))
+        terminals.append(((x1, cy), (x2, cy)))
+
+    def jittered(point):
+        return point[0] + rng.uniform(-jitter, jitter), point[1] + rng.uniform(-jitter, jitter)
+
+    data_wire: List[Tuple[float, float, float, float, float]] = []
+    wire_nodes: List[Tuple[Optional[int], Optional[int]]] = []
+    i = 0
+    while len(data_wire) < n_wires:
+        row, col = divmod(i % n_devices, per_row)
+        j = i % n_devices
+        if i < n_devices:
+            # along the row: right terminal -> next device's left terminal
+            if col + 1 < per_row and j + 1 < n_devices:
+                start, end = terminals[j][1], terminals[j + 1][0]
+                data_wire.append(_wire(*jittered(start), *jittered(end)))
+                wire_nodes.append((2 * j + 1, 2 * (j + 1)))
+        else:
+            # down the column, from the left terminal
+            below = j + per_row
+            if below < n_devices:
+                start, end = terminals[j][0], terminals[below][0]
+                data_wire.append(_wire(*jittered(start), *jittered(end)))
+                wire_nodes.append((2 * j, 2 * below))
+            elif i > 4 * n_devices:
+                # small grids run out of column wires; add free-floating stubs
+                x, y = rng.random(), rng.random()
+                data_wire.append(_wire(x, y, x + 0.3 * cell, y))
+                wire_nodes.append((None, None))
+        i += 1
+
+    return {
+        "name": f"synthetic-{n_wires}",
+        "data_device": data_device,
+        "data_wire": data_wire,
+        "wire_nodes": wire_nodes,
+        "image_size": (640, 640),
+        "classes": classes,
+    }
@@ -0,0 +1,118 @@
+"""Speed and match quality of the wire endpoint matching strategies.
+
+Runs every strategy in vision.tools.algo.matcher.MATCHERS on the
+stored_data fixtures and on synthetic circuits, and reports per strategy:
+
+    links      endpoint-to-point links made
+    matched    share of wire endpoints that ended up on a node with anything
+    meanDist   mean length of a link, in normalised image units
+    correct    share of links joining two points of the same true terminal
+               (synthetic circuits only, they know where each wire was drawn)
+
+    python -m benchmarks.matchers --sizes 10 100 1000 --output matchers.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import statistics
+import sys
+from typing import List, Optional
+
+from loguru import logger
+
+from benchmarks.datasets import FIXTURES, Dataset, load_fixture, synthetic
+from benchmarks.run import QUADRATIC_LIMIT, UNBOUNDED_MATCHERS, time_call
+from vision.json.getjson import deviceJSON
+from vision.tools.algo.matcher import MATCHERS, MatchPoints, match_points
+
+DEFAULT_SIZES = [10, 100, 1000]
+
+
+def match_inputs(dataset: Dataset) -> MatchPoints:
+    boxes = list(dataset["data_device"].values())
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, device_uuids, num_nodes = deviceJSON(boxes, dataset["classes"])
+    wire_uuids = [(f"w{i}a", f"w{i}b") for i in range(len(dataset["data_wire"]))]
+    return MatchPoints(boxes, dataset["data_wire"], device_uuids, num_nodes, wire_uuids)
+
+
+def quality(points: MatchPoints, links, dataset: Dataset) -> dict:
+    nodes = points.nodes(links)
+    sizes = {}
+    for node in nodes:
+        sizes[node] = sizes.get(node, 0) + 1
+    matched = sum(1 for index in range(points.n_endpoints) if sizes[nodes[index]] > 1)
+    result = {
+        "links": len(links),
+        "matched": matched / points.n_endpoints if points.n_endpoints else 0.0,
+        "meanDist": statistics.mean(math.dist(points.xy[a], points.xy[b]) for a, b in links) if links else 0.0,
+        "correct": None,
+    }
+
+    wire_nodes = dataset.get("wire_nodes")
+    if wire_nodes is not None and links:
+        # synthetic devices all have two nodes, so device point d is terminal d
+        truth = [node for ends in wire_nodes for node in ends]
+        truth += list(range(len(points) - points.n_endpoints))
+        right = sum(1 for a, b in links if truth[a] is not None and truth[a] == truth[b])
+        result["correct"] = right / len(links)
+    return result
+
+
+def run(datasets: List[Dataset], strategies: List[str], repeat: int, no_limit: bool = False) -> List[dict]:
+    rows = []
+    print(f"{'strategy':<9} {'dataset':<18} {'median ms':>10} {'links':>6} {'matched':>8} "
+          f"{'meanDist':>9} {'correct':>8}")
+    for dataset in datasets:
+        points = match_inputs(dataset)
+        n_wires = len(dataset["data_wire"])
+        for strategy in strategies:
+            if strategy not in UNBOUNDED_MATCHERS and n_wires > QUADRATIC_LIMIT and not no_limit:
+                print(f"{strategy:<9} {dataset['name']:<18} skipped (> {QUADRATIC_LIMIT} wires)")
+                continue
+            times = time_call(lambda: match_points(points, strategy), repeat, warmup=1)
+            row = {
+                "strategy": strategy,
+                "dataset": dataset["name"],
+                "wires": n_wires,
+                "median": statistics.median(times),
+                **quality(points, match_points(points, strategy), dataset),
+            }
+            rows.append(row)
+            correct = "-" if row["correct"] is None else f"{row['correct']:.3f}"
+            print(f"{strategy:<9} {dataset['name']:<18} {row['median'] * 1000:10.3f} {row['links']:6d} "
+                  f"{row['matched']:8.3f} {row['meanDist']:9.4f} {correct:>8}")
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the wire endpoint matching strategies")
+    parser.add_argument("--sizes", type=int, nargs="*", default=DEFAULT_SIZES,
+                        help="synthetic circuit sizes, in wires")
+    parser.add_argument("--strategies", nargs="*", default=list(MATCHERS), choices=list(MATCHERS))
+    parser.add_argument("--no-fixtures", action="store_true", help="skip the stored_data recordings")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-limit", action="store_true",
+                        help=f"run the quadratic strategies beyond {QUADRATIC_LIMIT} wires")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    datasets = [] if args.no_fixtures else [load_fixture(name) for name in FIXTURES]
+    datasets += [synthetic(n, seed=args.seed) for n in args.sizes]
+    rows = run(datasets, args.strategies, args.repeat, args.no_limit)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"results": rows}, file, indent=2)
+        print(f"\nWrote {len(rows)} results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""Offline benchmarks for the post-inference pipeline.
+
+Times inception, the wire/device matchers and the JSON builders on the
+stored_data fixtures and on synthetic circuits, without loading any model.
+
+    python -m benchmarks.run --sizes 10 100 1000 10000 --output bench.json
+    python -m benchmarks.run --baseline bench.json --tolerance 0.1
+
+With --baseline, the run fails (exit code 1) if any stage's median time is
+more than --tolerance slower than the saved run.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from benchmarks.datasets import FIXTURES, Dataset, load_fixture, synthetic
+from vision.json.getjson import deviceJSON
+from vision.json.new_json import componentJSON, wiresJSON
+from vision.inception.classes import IdTable
+from vision.inception.incremental import IncrementalCircuit
+from vision.inception.main import inceptionFunction
+from vision.tools.algo.matcher import MATCHERS, match_wire_device_points
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+# The scanning matchers are quadratic in endpoints; past this they take minutes
+QUADRATIC_LIMIT = 1000
+# Matching strategies that scale past it
+UNBOUNDED_MATCHERS = {"grid", "optimal"}
+
+
+def _prepare(dataset: Dataset) -> dict:
+    """Inputs shared by every stage: device lists, node uuids and wire uuid pairs"""
+    data_device = dataset["data_device"]
+    boxes = list(data_device.values())
+    _, device_uuids, num_nodes = deviceJSON(boxes, dataset["classes"])
+    wire_uuids = [(f"w{i}a", f"w{i}b") for i in range(len(dataset["data_wire"]))]
+
+    ids = IdTable()
+    with contextlib.redirect_stdout(io.StringIO()):
+        devices, wires = inceptionFunction(
+            data_device, dataset["data_wire"], dataset["image_size"], dataset["classes"], ids
+        )
+
+    return {
+        "boxes": boxes,
+        "device_uuids": device_uuids,
+        "num_nodes": num_nodes,
+        "wire_uuids": wire_uuids,
+        "devices": devices,
+        "wires": wires,
+        "ids": ids,
+    }
+
+
+def _inception(dataset, prepared):
+    return lambda: inceptionFunction(
+        dataset["data_device"], dataset["data_wire"], dataset["image_size"], dataset["classes"]
+    )
+
+
+def _match(strategy):
+    def build(dataset, prepared):
+        def run():
+            match_wire_device_points(
+                prepared["boxes"], dataset["data_wire"], prepared["device_uuids"],
+                prepared["num_nodes"], prepared["wire_uuids"], dataset["image_size"], strategy=strategy
+            )
+        return run
+    return build
+
+
+def _reconnect(dataset, prepared):
+    """One wire nudged and re-joined, on a circuit kept between runs"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        circuit = IncrementalCircuit(
+            [(f"d{i}", kind, box) for i, (kind, box) in enumerate(zip(dataset["classes"], prepared["boxes"]))],
+            [(f"w{i}", wire) for i, wire in enumerate(dataset["data_wire"])]
+        )
+    angle, x1, y1, x2, y2 = dataset["data_wire"][0]
+    offsets = itertools.cycle((0.001, 0.0))
+
+    def run():
+        dx = next(offsets)
+        circuit.edit(moved_wires=[("w0", (angle, x1 + dx, y1, x2 + dx, y2))])
+    return run
+
+
+def _json_build(dataset, prepared):
+    def run():
+        wiresJSON(prepared["wires"], prepared["ids"])
+        componentJSON(prepared["devices"], [], prepared["ids"])
+    return run
+
+
+# name -> (builder, max wires or None for no limit)
+STAGES: Dict[str, tuple] = {
+    "inception": (_inception, None),
+    **{
+        f"match_{name}": (_match(name), None if name in UNBOUNDED_MATCHERS else QUADRATIC_LIMIT)
+        for name in MATCHERS
+    },
+    "reconnect": (_reconnect, None),
+    "json_build": (_json_build, None),
+}
+
+
+def time_call(fn: Callable[[], object], repeat: int, warmup: int) -> List[float]:
+    """Run fn warmup times untimed, then repeat timed runs with the GC paused"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+        times = []
+        for _ in range(repeat):
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                fn()
+                times.append(time.perf_counter() - start)
+            finally:
+                gc.enable()
+    return times
+
+
+def run_benchmarks(
+    datasets: List[Dataset],
+    stages: List[str],
+    repeat: int,
+    warmup: int,
+    no_limit: bool = False
+) -> List[dict]:
+    rows = []
+    for dataset in datasets:
+        n_wires = len(dataset["data_wire"])
+        prepared = _prepare(dataset)
+        for name in stages:
+            build, limit = STAGES[name]
+            if limit is not None and n_wires > limit and not no_limit:
+                print(f"{name:<13} {dataset['name']:<18} skipped (> {limit} wires)")
+                continue
+
+            times = time_call(build(dataset, prepared), repeat, warmup)
+            row = {
+                "stage": name,
+                "dataset": dataset["name"],
+                "wires": n_wires,
+                "devices": len(dataset["data_device"]),
+                "repeat": repeat,
+                "min": min(times),
+                "median": statistics.median(times),
+                "mean": statistics.mean(times),
+            }
+            rows.append(row)
+            print(f"{name:<13} {dataset['name']:<18} median {row['median'] * 1000:10.3f} ms"
+                  f"  min {row['min'] * 1000:10.3f} ms")
+    return rows
+
+
+def compare(rows: List[dict], baseline: dict, tolerance: float) -> List[dict]:
+    """Rows whose median is more than tolerance slower than the baseline's"""
+    previous = {(r["stage"], r["dataset"]): r for r in baseline.get("results", [])}
+    regressions = []
+    print("\nstage         dataset            baseline ms    current ms   ratio")
+    for row in rows:
+        old = previous.get((row["stage"], row["dataset"]))
+        if old is None:
+            continue
+        ratio = row["median"] / old["median"] if old["median"] > 0 else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append({**row, "baseline": old["median"], "ratio": ratio})
+            flag = "  REGRESSION"
+        print(f"{row['stage']:<13} {row['dataset']:<18} {old['median'] * 1000:11.3f} "
+              f"{row['median'] * 1000:13.3f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark inception, matchers and JSON building")
+    parser.add_argument("--sizes", type=int, nargs="*", default=DEFAULT_SIZES,
+                        help="synthetic circuit sizes, in wires")
+    parser.add_argument("--stages", nargs="*", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--no-fixtures", action="store_true", help="skip the stored_data recordings")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-limit", action="store_true",
+                        help=f"run quadratic matchers beyond {QUADRATIC_LIMIT} wires")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed median slowdown against the baseline (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    # inception logs its join threshold at DEBUG on every call
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    datasets = [] if args.no_fixtures else [load_fixture(name) for name in FIXTURES]
+    datasets += [synthetic(n, seed=args.seed) for n in args.sizes]
+
+    rows = run_benchmarks(datasets, args.stages, args.repeat, args.warmup, args.no_limit)
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "seed": args.seed,
+        },
+        "results": rows,
+    }
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nWrote {len(rows)} results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        regressions = compare(rows, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
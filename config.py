@@ -0,0 +1,130 @@
+import os
+
+# Runtime settings, overridable through environment variables
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+def _env_float(name, default):
+    return float(os.getenv(name, default))
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+# Model weights
+COMPONENT_MODEL_PATH = os.getenv("COMPONENT_MODEL_PATH", r"models\Components\90mapROBOFLOW.pt")
+WIRE_MODEL_PATH = os.getenv("WIRE_MODEL_PATH", "models/best_wire_new.pt")
+
+# Inference backend: "torch" runs the .pt weights through ultralytics,
+# "onnx"/"openvino" run the files from `python -m vision.runtime.export`
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+COMPONENT_ONNX_PATH = os.getenv("COMPONENT_ONNX_PATH", os.path.splitext(COMPONENT_MODEL_PATH)[0] + ".onnx")
+WIRE_ONNX_PATH = os.getenv("WIRE_ONNX_PATH", os.path.splitext(WIRE_MODEL_PATH)[0] + ".onnx")
+# "int8" serves the quantized files from `python -m vision.runtime.quantize`
+# (onnx/openvino backends only)
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "fp32").lower()
+COMPONENT_INT8_PATH = os.getenv("COMPONENT_INT8_PATH", os.path.splitext(COMPONENT_ONNX_PATH)[0] + ".int8.onnx")
+WIRE_INT8_PATH = os.getenv("WIRE_INT8_PATH", os.path.splitext(WIRE_ONNX_PATH)[0] + ".int8.onnx")
+# Intra-op threads per exported model session (0 = runtime default)
+INFERENCE_THREADS = _env_int("INFERENCE_THREADS", 0)
+# NMS settings for the exported backends (ultralytics' predict defaults)
+NMS_IOU_THRESHOLD = _env_float("NMS_IOU_THRESHOLD", 0.7)
+MAX_DETECTIONS = _env_int("MAX_DETECTIONS", 300)
+# Folder of snapshots from `python -m vision.runtime.snapshot` to load
+# instead of the model files above (compiled-model cache for openvino);
+# empty loads the model files as they are
+MODEL_SNAPSHOT_DIR = os.getenv("MODEL_SNAPSHOT_DIR", "")
+# Load the models (and import torch/onnxruntime) on the first request that
+# needs them instead of at startup
+LAZY_MODEL_LOAD = _env_bool("LAZY_MODEL_LOAD", False)
+# One dummy inference per model right after loading, so the first real
+# request doesn't pay for kernel selection and allocator warm-up
+MODEL_WARMUP = _env_bool("MODEL_WARMUP", True)
+
+# Detection confidence passed to both models (ultralytics' own default)
+CONFIDENCE_THRESHOLD = _env_float("CONFIDENCE_THRESHOLD", 0.25)
+
+# Tiled inference for large scans (/analyze-circuit, its stream and jobs):
+# images whose longer side is over TILE_SIZE are cut into overlapping
+# TILE_SIZE tiles instead of being squashed to 640x640
+TILED_INFERENCE = _env_bool("TILED_INFERENCE", False)
+TILE_SIZE = _env_int("TILE_SIZE", 640)
+# Share of a tile its neighbours overlap
+TILE_OVERLAP = _env_float("TILE_OVERLAP", 0.2)
+# Scans are scaled down to this longer side before tiling (0 = full resolution)
+TILE_MAX_SIDE = _env_int("TILE_MAX_SIDE", 2560)
+
+# Images per YOLO forward pass on the batch endpoint
+BATCH_INFERENCE_SIZE = _env_int("BATCH_INFERENCE_SIZE", 8)
+
+# Processes used to fan inception out across images
+INCEPTION_WORKERS = _env_int("INCEPTION_WORKERS", os.cpu_count() or 1)
+
+# Pre-fork serving (python -m serving.prefork): worker processes, and the
+# threads each worker's models and image ops may use (0 = the cores split
+# evenly across workers). In that mode this replaces INFERENCE_THREADS.
+SERVER_WORKERS = _env_int("SERVER_WORKERS", os.cpu_count() or 1)
+WORKER_THREADS = _env_int("WORKER_THREADS", 0)
+
+# Threads running the blocking inference pipeline. Model calls from these
+# threads are merged by the micro-batcher, so more threads mean fuller batches.
+INFERENCE_WORKERS = _env_int("INFERENCE_WORKERS", 4)
+
+# Requests allowed to wait for an inference thread before returning 503
+INFERENCE_QUEUE_DEPTH = _env_int("INFERENCE_QUEUE_DEPTH", 16)
+
+# Retry-After (seconds) sent with 503 when the queue is full
+RETRY_AFTER_SECONDS = _env_int("RETRY_AFTER_SECONDS", 2)
+
+# Micro-batching of concurrent model calls
+MICROBATCH_ENABLED = _env_bool("MICROBATCH_ENABLED", True)
+MICROBATCH_MAX_SIZE = _env_int("MICROBATCH_MAX_SIZE", 8)
+MICROBATCH_WAIT_MS = _env_float("MICROBATCH_WAIT_MS", 5)
+
+# Background analyses (POST /jobs): "memory" keeps the queue in the process,
+# "sqlite" in JOB_QUEUE_DB, where it survives restarts and is shared by
+# pre-forked workers
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "memory").lower()
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", "jobs.db")
+# Threads running queued jobs
+JOB_WORKERS = _env_int("JOB_WORKERS", 1)
+# Queued jobs allowed before POST /jobs returns 503
+JOB_QUEUE_MAX = _env_int("JOB_QUEUE_MAX", 64)
+# Seconds a finished job's result stays available
+JOB_RESULT_TTL = _env_int("JOB_RESULT_TTL", 3600)
+
+# Content-hash cache of /analyze-circuit and /detect responses
+RESULT_CACHE_ENABLED = _env_bool("RESULT_CACHE_ENABLED", True)
+RESULT_CACHE_MAX_BYTES = _env_int("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+# sqlite file for the persistent tier; empty keeps the cache in memory only
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB", "")
+# Byte budget of the sqlite tier; past it the oldest entries are deleted
+RESULT_CACHE_DB_MAX_BYTES = _env_int("RESULT_CACHE_DB_MAX_BYTES", 512 * 1024 * 1024)
+
+# Sessions of POST /reconnect (the circuit's connectivity kept between
+# edits): at most SESSION_MAX per worker, dropped after SESSION_TTL seconds
+# without a request
+SESSION_MAX = _env_int("SESSION_MAX", 256)
+SESSION_TTL = _env_int("SESSION_TTL", 1800)
+
+# Intermediate artefacts of /detect and /analyze-circuit (preprocessed and
+# masked image, component and wire detections), kept under the artefactId
+# those routes return so later calls on the same image skip those stages
+ARTEFACT_STORE_ENABLED = _env_bool("ARTEFACT_STORE_ENABLED", True)
+ARTEFACT_MAX = _env_int("ARTEFACT_MAX", 64)
+ARTEFACT_TTL = _env_int("ARTEFACT_TTL", 600)
+ARTEFACT_MAX_BYTES = _env_int("ARTEFACT_MAX_BYTES", 256 * 1024 * 1024)
+
+# /detect previews: png, jpeg or webp; PREVIEW_QUALITY is the JPEG/WebP
+# quality (0-100) and PREVIEW_PNG_COMPRESSION the PNG zlib level (0-9,
+# 1 is fastest). Previews are scaled down to PREVIEW_MAX_SIDE (0 = model
+# resolution). A request can override all three.
+PREVIEW_FORMAT = os.getenv("PREVIEW_FORMAT", "png").lower()
+PREVIEW_QUALITY = _env_int("PREVIEW_QUALITY", 90)
+PREVIEW_PNG_COMPRESSION = _env_int("PREVIEW_PNG_COMPRESSION", 1)
+PREVIEW_MAX_SIDE = _env_int("PREVIEW_MAX_SIDE", 0)
+# Inline previews as base64 data URIs; otherwise /detect returns the URLs
+# of GET /artefacts/{artefactId}/previews/{name} (needs the artefact store)
+PREVIEW_INLINE = _env_bool("PREVIEW_INLINE", True)
+# Threads encoding the three previews of a /detect call side by side
+PREVIEW_ENCODE_WORKERS = _env_int("PREVIEW_ENCODE_WORKERS", 3)
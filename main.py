@@ -1,21 +1,30 @@
-from fastapi import FastAPI, File, UploadFile, Request
-from fastapi.responses import JSONResponse, StreamingResponse
+import time
+
+# module import time (fastapi, cv2, numpy and the vision code) for /health;
+# torch/ultralytics and onnxruntime are only imported when a model loads
+_import_start = time.perf_counter()
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from PIL import Image, ExifTags
 import io
 import uuid
 import cv2 as cv
-import uvicorn
 import base64
 import numpy as np
 import traceback
-import time
 import os
-from ultralytics import YOLO
 from loguru import logger
 import sys
-from typing import Callable
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
 import json
+from pydantic import BaseModel, Field
+
+import config
 
 # Create logs directory if it doesn't exist
 os.makedirs("logs", exist_ok=True)
@@ -51,23 +60,38 @@ logger.add(
     diagnose=True
 )
 
-# imports model pred and json output 
-from vision.json.getjson import deviceJSON, toJSON, wireJSON
-from vision.json.new_json import componentJSON, wiresJSON
-
-from vision.processing import extract_pred
+# imports model pred
+from vision.processing import extract_pred_batch, parse_component_result
 # wire imports
-from vision.wire.processing import extract_pred_wire
+from vision.wire.processing import extract_pred_wire_batch, parse_wire_result
 # tools imports
-from vision.tools.operations import create_white_mask
-from vision.tools.algo.match_algo_v4 import match_wire_device_points
-
+from vision.tools.operations import (
+    PreviewOptions, create_white_mask, decode_image, encode_preview, letterbox, prepare_large_image,
+    unmap_boxes, unmap_wires
+)
+from vision.tiling import detect_components_tiled, detect_wires_tiled
 
 # inception imports
-from vision.inception.main import inceptionFunction as inception
+from vision.inception.incremental import IncrementalCircuit
+from vision.pipeline import connect_circuit
+from vision.runtime.model import load_model
+
+# serving imports
+from serving.executor import InferenceExecutor, QueueFullError
+from serving.batcher import LockedModel, MicroBatcher
+from serving.cache import ResultCache, model_fingerprint
+from serving.metrics import MetricsRegistry, RequestTimer
+from serving.models import ModelStore
+from serving.jobs import MemoryJobQueue, SqliteJobQueue, JobWorkers
+from serving.sessions import SessionStore, array_bytes
+
+IMPORT_SECONDS = time.perf_counter() - _import_start
 
 app = FastAPI(title="Circuit Digitisation API", version="1.0.0")
 
+# Prometheus metrics shared by every route, served on /metrics
+metrics = MetricsRegistry()
+
 # Request/Response logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next: Callable):
@@ -86,8 +110,11 @@ async def log_requests(request: Request, call_next: Callable):
         logger.debug(f"[{req_id}] Multipart form data request - body not logged")
     
     start_time = time.time()
+    metrics.add_gauge("http_requests_in_flight", "Requests currently being handled", 1)
+    status_code = 500
     try:
         response = await call_next(request)
+        status_code = response.status_code
         process_time = time.time() - start_time
         
         logger.info(f"[{req_id}] Response: {response.status_code} | Time: {process_time:.4f}s")
@@ -98,6 +125,19 @@ async def log_requests(request: Request, call_next: Callable):
             status_code=500,
             content={"detail": "Internal Server Error", "traceback": traceback.format_exc()}
         )
+    finally:
+        metrics.add_gauge("http_requests_in_flight", "Requests currently being handled", -1)
+        # label by route template so path parameters don't explode cardinality
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        metrics.inc(
+            "http_requests_total", "Requests handled, by route and status",
+            method=request.method, path=path, status=str(status_code)
+        )
+        metrics.observe(
+            "http_request_duration_seconds", "End-to-end request latency",
+            time.time() - start_time, path=path
+        )
 
 # Enable CORS
 app.add_middleware(
@@ -108,141 +148,793 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def model_paths():
+    """Component and wire model files for the configured backend"""
+    if config.MODEL_PRECISION not in ("fp32", "int8"):
+        raise ValueError(f"MODEL_PRECISION must be fp32 or int8, got {config.MODEL_PRECISION!r}")
+    if config.INFERENCE_BACKEND == "torch":
+        if config.MODEL_PRECISION == "int8":
+            raise ValueError("MODEL_PRECISION=int8 needs INFERENCE_BACKEND=onnx or openvino")
+        return config.COMPONENT_MODEL_PATH, config.WIRE_MODEL_PATH
+    if config.MODEL_PRECISION == "int8":
+        return config.COMPONENT_INT8_PATH, config.WIRE_INT8_PATH
+    return config.COMPONENT_ONNX_PATH, config.WIRE_ONNX_PATH
+
+def warmup_model(model):
+    """One dummy inference on a blank page at the served input size"""
+    model(np.full((640, 640, 3), 255, dtype=np.uint8), conf=config.CONFIDENCE_THRESHOLD)
+
 def init_models():
-    """Initialize all models once at startup"""
-    logger.info("Initializing models...")
-    try:
-        component_model_path = r"models\Components\90mapROBOFLOW.pt"
-        wire_model_path = 'models/best_wire_new.pt'
-        
-        logger.info(f"Loading component model from: {component_model_path}")
-        component_model = YOLO(component_model_path)
-        logger.info(f"Component model loaded successfully. Model type: {type(component_model)}")
-        
-        logger.info(f"Loading wire model from: {wire_model_path}")
-        wire_model = YOLO(wire_model_path)
-        logger.info(f"Wire model loaded successfully. Model type: {type(wire_model)}")
-        
-        return {
-            'component_model': component_model,
-            'wire_model': wire_model
-        }
-    except Exception as e:
-        logger.error(f"Failed to load models: {str(e)}\n{traceback.format_exc()}")
-        raise
+    """Model store for the configured backend; nothing is loaded until store.load()"""
+    backend = config.INFERENCE_BACKEND
+    component_model_path, wire_model_path = model_paths()
+    options = {
+        "threads": config.INFERENCE_THREADS,
+        "iou": config.NMS_IOU_THRESHOLD,
+        "max_det": config.MAX_DETECTIONS,
+        "snapshot_dir": config.MODEL_SNAPSHOT_DIR,
+    }
+    logger.info(f"Using {backend} inference backend ({config.MODEL_PRECISION})")
+    if config.MODEL_SNAPSHOT_DIR:
+        logger.info(f"Loading model snapshots from {config.MODEL_SNAPSHOT_DIR}")
+
+    def loader(name, path):
+        def load():
+            logger.info(f"Loading {name} from: {path}")
+            try:
+                model = load_model(path, backend, **options)
+            except Exception as e:
+                logger.error(f"Failed to load {name}: {str(e)}\n{traceback.format_exc()}")
+                raise
+            logger.info(f"{name} loaded successfully. Model type: {type(model)}")
+            return model
+        return load
+
+    def batcher(name, model):
+        return MicroBatcher(model, config.MICROBATCH_MAX_SIZE, config.MICROBATCH_WAIT_MS, name)
+
+    def locked(name, model):
+        # the predictor isn't thread-safe, the executor and job threads take turns
+        return LockedModel(model, name)
+
+    return ModelStore(
+        {
+            'component_model': loader('component_model', component_model_path),
+            'wire_model': loader('wire_model', wire_model_path),
+        },
+        warmup=warmup_model if config.MODEL_WARMUP else None,
+        wrap=batcher if config.MICROBATCH_ENABLED else locked
+    )
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize models on startup"""
     logger.info("Application starting up...")
+    start = time.perf_counter()
+    app.state.started_at = start
     try:
-        app.state.models = init_models()
-        logger.info("Models initialized and stored in app state")
+        # a pre-fork master (serving.prefork) hands its workers a preloaded store
+        if getattr(app.state, 'models', None) is None:
+            app.state.models = init_models()
+        if config.LAZY_MODEL_LOAD:
+            logger.info("Lazy model loading: models load on the first request that needs them")
+        else:
+            app.state.models.load()
+            logger.info("Models initialized and stored in app state")
+
+        if config.MICROBATCH_ENABLED:
+            logger.info(f"Micro-batching enabled: max batch {config.MICROBATCH_MAX_SIZE}, wait {config.MICROBATCH_WAIT_MS}ms")
         logger.debug(f"Available models: {list(app.state.models.keys())}")
+
+        app.state.executor = InferenceExecutor(
+            max_workers=config.INFERENCE_WORKERS,
+            max_queue=config.INFERENCE_QUEUE_DEPTH,
+            retry_after=config.RETRY_AFTER_SECONDS
+        )
+        logger.info(f"Inference executor started with {config.INFERENCE_WORKERS} workers, queue depth {config.INFERENCE_QUEUE_DEPTH}")
+
+        app.state.model_id = model_fingerprint([config.INFERENCE_BACKEND, config.MODEL_PRECISION, *model_paths()])
+        app.state.result_cache = None
+        if config.RESULT_CACHE_ENABLED:
+            app.state.result_cache = ResultCache(
+                config.RESULT_CACHE_MAX_BYTES, config.RESULT_CACHE_DB or None, config.RESULT_CACHE_DB_MAX_BYTES
+            )
+            logger.info(f"Result cache enabled with {config.RESULT_CACHE_MAX_BYTES} byte memory budget")
+
+        # spawn so workers don't inherit torch's thread state
+        app.state.inception_pool = ProcessPoolExecutor(
+            max_workers=config.INCEPTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        logger.info(f"Inception worker pool started with {config.INCEPTION_WORKERS} workers")
+
+        if config.JOB_QUEUE_BACKEND == "sqlite":
+            app.state.jobs = SqliteJobQueue(
+                config.JOB_QUEUE_DB, config.JOB_QUEUE_MAX, config.JOB_RESULT_TTL, config.RETRY_AFTER_SECONDS
+            )
+        elif config.JOB_QUEUE_BACKEND == "memory":
+            app.state.jobs = MemoryJobQueue(config.JOB_QUEUE_MAX, config.JOB_RESULT_TTL, config.RETRY_AFTER_SECONDS)
+        else:
+            raise ValueError(f"JOB_QUEUE_BACKEND must be memory or sqlite, got {config.JOB_QUEUE_BACKEND!r}")
+        app.state.job_workers = JobWorkers(app.state.jobs, run_job, config.JOB_WORKERS)
+        logger.info(f"Job queue ({config.JOB_QUEUE_BACKEND}) drained by {config.JOB_WORKERS} workers")
+
+        app.state.sessions = SessionStore(config.SESSION_MAX, config.SESSION_TTL)
+        app.state.artefacts = None
+        if config.ARTEFACT_STORE_ENABLED:
+            app.state.artefacts = SessionStore(
+                config.ARTEFACT_MAX, config.ARTEFACT_TTL, config.ARTEFACT_MAX_BYTES, array_bytes
+            )
+            logger.info(f"Artefact store enabled with {config.ARTEFACT_MAX_BYTES} byte memory budget")
+        app.state.encode_pool = ThreadPoolExecutor(
+            max_workers=config.PREVIEW_ENCODE_WORKERS, thread_name_prefix="encode"
+        )
+
+        app.state.startup_seconds = time.perf_counter() - start
+        logger.info(f"Startup took {app.state.startup_seconds:.3f}s (imports {IMPORT_SECONDS:.3f}s)")
     except Exception as e:
         logger.critical(f"Startup failed: {str(e)}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the inference executor and the worker pools"""
+    logger.info("Application shutting down...")
+    executor = getattr(app.state, 'executor', None)
+    if executor is not None:
+        executor.shutdown()
+    job_workers = getattr(app.state, 'job_workers', None)
+    if job_workers is not None:
+        job_workers.close()
+    models = getattr(app.state, 'models', None)
+    for model in models.loaded_models() if models is not None else []:
+        if isinstance(model, MicroBatcher):
+            model.close()
+    for name in ('inception_pool', 'encode_pool'):
+        pool = getattr(app.state, name, None)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
 # Detailed image preprocessing function for reuse
-def preprocess_image(image, req_id):
-    """Common image preprocessing steps with detailed logging"""
-    logger.debug(f"[{req_id}] Original image format: {image.format}, mode: {image.mode}, size: {image.size}")
-    
-    # Auto-orient image
-    if hasattr(image, '_getexif'):
-        try:
-            logger.debug(f"[{req_id}] Checking EXIF for orientation")
-            for orientation in ExifTags.TAGS.keys():
-                if ExifTags.TAGS[orientation] == 'Orientation':
-                    break
-            exif = dict(image._getexif() or {}).get(orientation)
-            if exif:
-                logger.debug(f"[{req_id}] Found orientation: {exif}")
-                if exif == 3:
-                    logger.debug(f"[{req_id}] Rotating image 180°")
-                    image = image.rotate(180, expand=True)
-                elif exif == 6:
-                    logger.debug(f"[{req_id}] Rotating image 270°")
-                    image = image.rotate(270, expand=True)
-                elif exif == 8:
-                    logger.debug(f"[{req_id}] Rotating image 90°")
-                    image = image.rotate(90, expand=True)
-        except Exception as e:
-            logger.warning(f"[{req_id}] Error processing EXIF: {str(e)}")
-    
-    # Resize
-    logger.debug(f"[{req_id}] Resizing image to 640x640")
-    image = image.resize((640, 640), Image.Resampling.LANCZOS)
+def use_tiles(image):
+    """Whether an image is large enough for tiled inference, when that is enabled"""
+    return config.TILED_INFERENCE and max(image.shape[:2]) > config.TILE_SIZE
+
+def preprocess_image(image, req_id, timer=None, tiled=False):
+    """Common image preprocessing steps on a decoded BGR array, with detailed logging.
+
+    EXIF orientation is already applied by decode_image. The image is
+    letterboxed onto the 640x640 model input (aspect ratio kept, white
+    padding); the canvas is the one new buffer, the flip and later the
+    white mask work in place on it. With tiled, images over TILE_SIZE keep
+    their resolution (up to TILE_MAX_SIDE) for tiled inference.
+
+    Returns the image and its Letterbox transform, for unmapping detections
+    to original-image coordinates.
+    """
+    timer = timer or RequestTimer()
+    logger.debug(f"[{req_id}] Original image shape: {image.shape}, dtype: {image.dtype}")
     
-    # Flip
-    logger.debug(f"[{req_id}] Flipping image (TOP_BOTTOM)")
-    image = image.transpose(Image.FLIP_TOP_BOTTOM)
+    with timer.stage("resize"):
+        if tiled and use_tiles(image):
+            logger.debug(f"[{req_id}] Scaling to at most {config.TILE_MAX_SIDE}px and flipping for tiled inference")
+            image, transform = prepare_large_image(image, config.TILE_MAX_SIDE)
+        else:
+            # Letterbox and flip (TOP_BOTTOM)
+            logger.debug(f"[{req_id}] Letterboxing image to 640x640 and flipping")
+            image, transform = letterbox(image, 640)
     
-    logger.debug(f"[{req_id}] Final image size: {image.size}, mode: {image.mode}")
-    return image
+    logger.debug(f"[{req_id}] Final image shape: {image.shape}, scale {transform.scale:.4f}, pad ({transform.pad_x}, {transform.pad_y})")
+    return image, transform
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    """Fast rejection when the inference executor is saturated"""
+    return JSONResponse(
+        status_code=503,
+        content={"result": "error", "message": "Server busy, retry later"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+class ArtefactMissing(LookupError):
+    """An artefactId the store no longer holds, with no upload to start over from"""
+
+@app.exception_handler(ArtefactMissing)
+async def artefact_missing_handler(request: Request, exc: ArtefactMissing):
+    """An expired or evicted artefactId sent without the image"""
+    return JSONResponse(status_code=404, content={"result": "error", "message": str(exc)})
 
 @app.get("/")
 def read_root():
     return {"Hello": "Chris"}
 
+@app.get("/health")
+def health():
+    """Liveness plus cold-start timings: imports, startup, per-model load and warm-up"""
+    models = app.state.models
+    return {
+        "status": "ok" if models.loaded else "cold",
+        "backend": config.INFERENCE_BACKEND,
+        "precision": config.MODEL_PRECISION,
+        "snapshot": bool(config.MODEL_SNAPSHOT_DIR),
+        "lazyModelLoad": config.LAZY_MODEL_LOAD,
+        "modelsLoaded": models.loaded,
+        "importSeconds": IMPORT_SECONDS,
+        "startupSeconds": app.state.startup_seconds,
+        "models": models.timings,
+        "uptimeSeconds": time.perf_counter() - app.state.started_at,
+    }
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape endpoint: stage histograms, request counts, gauges"""
+    metrics.set_gauge("inference_pending", "Jobs running or queued on the inference executor", app.state.executor.pending)
+    if app.state.result_cache is not None:
+        stats = app.state.result_cache.stats()
+        metrics.set_gauge("result_cache_hits", "Result cache hits (memory and disk)", stats["hits"] + stats["diskHits"])
+        metrics.set_gauge("result_cache_misses", "Result cache misses", stats["misses"])
+        metrics.set_gauge("result_cache_bytes", "Bytes held by the in-memory result cache", stats["bytes"])
+    for status, count in app.state.jobs.stats().items():
+        metrics.set_gauge("jobs", "Background jobs by status", count, status=status)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters of the result cache"""
+    if app.state.result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **app.state.result_cache.stats()}
+
+@app.get("/artefacts/stats")
+def artefact_stats():
+    """Size and hit/miss counters of the artefact store"""
+    if app.state.artefacts is None:
+        return {"enabled": False}
+    return {"enabled": True, **app.state.artefacts.stats()}
+
+@app.get("/artefacts/{artefact_id}/previews/{name}")
+def artefact_preview(artefact_id: str, name: str):
+    """A preview image (components, masked or lines) as the last /detect on the artefact encoded it"""
+    artefacts = app.state.artefacts.get(artefact_id) if app.state.artefacts is not None else None
+    previews = artefacts.get("previews") if artefacts is not None else None
+    if previews is None or name not in previews["images"]:
+        raise HTTPException(status_code=404, detail="Unknown or expired preview")
+    return Response(content=previews["images"][name], media_type=previews["options"].media_type)
+
+def cache_key(route, artefacts):
+    """Result cache key for a bundle's preprocessed image and transform, or None when caching is off"""
+    if app.state.result_cache is None:
+        return None
+    return ResultCache.make_key(
+        route, artefacts["image"], app.state.model_id, config.CONFIDENCE_THRESHOLD, artefacts["transform"]
+    )
+
+def load_artefacts(contents, artefact_id, req_id, timer, allow_tiles=False, keep=True):
+    """A request's artefact bundle and its id (None when nothing is stored).
+
+    The stored bundle for artefact_id when the store still has one this
+    route can use, otherwise a new one from the upload: the decoded and
+    preprocessed image, its Letterbox transform and whether it is tiled.
+    The stage helpers below add components, the masked image and wires to
+    it, so a later call with the id, on any route, skips what is there.
+    Requests sharing a bundle take turns on its lock to fill it in.
+    """
+    store = app.state.artefacts
+    if artefact_id and store is not None:
+        artefacts = store.get(artefact_id)
+        # /detect never tiles, so it can't start from a tiled bundle
+        if artefacts is not None and artefacts["tiled"] and not allow_tiles and contents is None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Artefact {artefact_id} was built with tiled inference and can't be reused here, upload the image"
+            )
+        if artefacts is not None and (allow_tiles or not artefacts["tiled"]):
+            have = [stage for stage in ("components", "masked", "wires") if stage in artefacts]
+            logger.info(f"[{req_id}] Reusing artefact {artefact_id} ({', '.join(['image', *have])})")
+            return artefact_id, artefacts
+    if contents is None:
+        raise ArtefactMissing(f"Artefact {artefact_id} is unknown or expired, upload the image again")
+
+    with timer.stage("decode"):
+        image = decode_image(contents)
+    tiled = allow_tiles and use_tiles(image)
+    image, transform = preprocess_image(image, req_id, timer, tiled=tiled)
+    artefacts = {"image": image, "transform": transform, "tiled": tiled, "lock": threading.Lock()}
+    if store is None or not keep:
+        return None, artefacts
+    return store.create(artefacts), artefacts
+
+def save_artefacts(artefact_id, artefacts):
+    """Store a bundle again after stages were added, so its size is counted"""
+    if artefact_id is not None:
+        # sizing walks the bundle, which must not change meanwhile
+        with artefacts["lock"]:
+            app.state.artefacts.put(artefact_id, artefacts)
+
+def record_queue_wait(timer, stage, model):
+    """Time the thread's last model call waited for its batch (or the model lock), as a stage.
+
+    Part of the inference stage it was recorded after; for tiled images it
+    is the wait of the last batch of tiles.
+    """
+    if isinstance(model, (MicroBatcher, LockedModel)):
+        timer.record(stage, model.queue_wait)
+
+def detect_components(artefacts, req_id, timer):
+    """Component detections of a bundle, run once.
+
+    result is the model's Results (None for tiled images), data_device the
+    boxes in original-image units and boxes the canvas pixels for the mask.
+    """
+    with artefacts["lock"]:
+        if "components" not in artefacts:
+            logger.info(f"[{req_id}] Running component detection")
+            image, model = artefacts["image"], app.state.models['component_model']
+            with timer.stage("component_inference"):
+                if artefacts["tiled"]:
+                    logger.debug(f"[{req_id}] Tiled component detection on {image.shape[1]}x{image.shape[0]}")
+                    result = None
+                    data_device, classes, boxes = detect_components_tiled(
+                        image, model, config.CONFIDENCE_THRESHOLD,
+                        config.TILE_SIZE, config.TILE_OVERLAP, config.BATCH_INFERENCE_SIZE
+                    )
+                else:
+                    result = model(image, conf=config.CONFIDENCE_THRESHOLD)[0]
+                    data_device, classes, boxes = parse_component_result(result, model.names)
+            record_queue_wait(timer, "component_queue", model)
+            artefacts["components"] = {
+                "result": result,
+                "data_device": unmap_boxes(data_device, artefacts["transform"]),
+                "classes": classes,
+                "boxes": boxes,
+            }
+        return artefacts["components"]
+
+def mask_components(artefacts, timer):
+    """The bundle's image with the components painted white, made once"""
+    with artefacts["lock"]:
+        if "masked" not in artefacts:
+            with timer.stage("masking"):
+                # paint over the image itself unless the store keeps it for later calls
+                out = None if app.state.artefacts is not None else artefacts["image"]
+                artefacts["masked"] = create_white_mask(artefacts["image"], artefacts["components"]["boxes"], out=out)
+        return artefacts["masked"]
+
+def detect_wires(artefacts, req_id, timer):
+    """Wire detections on the masked image, run once; data_wire in original-image units"""
+    with artefacts["lock"]:
+        if "wires" not in artefacts:
+            masked, model = artefacts["masked"], app.state.models['wire_model']
+            with timer.stage("wire_inference"):
+                if artefacts["tiled"]:
+                    result = None
+                    data_wire = detect_wires_tiled(
+                        masked, model, config.CONFIDENCE_THRESHOLD,
+                        config.TILE_SIZE, config.TILE_OVERLAP, config.BATCH_INFERENCE_SIZE
+                    )
+                else:
+                    result = model(masked, conf=config.CONFIDENCE_THRESHOLD)[0]
+                    data_wire = parse_wire_result(result, (masked.shape[1], masked.shape[0]))
+            record_queue_wait(timer, "wire_queue", model)
+            artefacts["wires"] = {"result": result, "data_wire": unmap_wires(data_wire, artefacts["transform"])}
+        return artefacts["wires"]
+
+def analysis_components(contents, req_id, timer, artefact_id=None, keep=True):
+    """First stage of the circuit analysis: decode, resize, cache lookup, components.
+
+    Starts from the stored artefacts of artefact_id when there are any.
+    Returns the analysis state the later stages take. On a result cache hit
+    state["cached"] holds the circuit JSON and only the artefact is filled in.
+    """
+    artefact_id, artefacts = load_artefacts(contents, artefact_id, req_id, timer, allow_tiles=True, keep=keep)
+    transform = artefacts["transform"]
+    state = {
+        "artefactId": artefact_id, "artefacts": artefacts, "transform": transform,
+        "size": transform.original_size, "cached": None, "tiled": artefacts["tiled"]
+    }
+    
+    state["key"] = cache_key("analyze-circuit", artefacts)
+    if state["key"] is not None:
+        state["cached"] = app.state.result_cache.get(state["key"])
+        if state["cached"] is not None:
+            logger.info(f"[{req_id}] Result cache hit")
+            return state
+    
+    components = detect_components(artefacts, req_id, timer)
+    state["data_device"], state["classes"] = components["data_device"], components["classes"]
+    save_artefacts(artefact_id, artefacts)
+    return state
+
+def analysis_wires(state, req_id, timer):
+    """Second stage: mask the components out and detect the wires"""
+    artefacts = state["artefacts"]
+    mask_components(artefacts, timer)
+    state["data_wire"] = detect_wires(artefacts, req_id, timer)["data_wire"]
+    save_artefacts(state["artefactId"], artefacts)
+    logger.debug(f"[{req_id}] Detected {len(state['data_wire'])} wires")
+    return state
+
+def analysis_circuit(state, timer):
+    """Last stage: inception and the devices/wires JSON, stored in the result cache"""
+    json_data = connect_circuit(
+        state["data_device"], state["classes"], state["data_wire"], state["size"], stage=timer.stage
+    )
+    if state["key"] is not None:
+        app.state.result_cache.put(state["key"], json_data)
+    return json_data
+
+def run_circuit_analysis(contents, req_id, timer, artefact_id=None):
+    """Blocking part of /analyze-circuit, run on the inference executor.
+
+    Returns the circuit JSON, whether it came from the result cache and
+    the artefact id.
+    """
+    state = analysis_components(contents, req_id, timer, artefact_id)
+    if state["cached"] is not None:
+        return state["cached"], True, state["artefactId"]
+    analysis_wires(state, req_id, timer)
+    return analysis_circuit(state, timer), False, state["artefactId"]
+
+async def read_upload(file, artefact_id):
+    """The uploaded bytes, or None when the request only names an artefact"""
+    if file is None:
+        if not artefact_id:
+            raise HTTPException(status_code=422, detail="Send a file or an artefactId")
+        return None
+    return await file.read()
+
+def with_artefact(body, artefact_id):
+    """A response body with the artefactId later calls can pass instead of the image"""
+    return body if artefact_id is None else {**body, "artefactId": artefact_id}
+
 @app.post("/analyze-circuit")
-async def analyze_circuit(file: UploadFile = File(...)) -> JSONResponse:
+async def analyze_circuit(
+    file: Optional[UploadFile] = File(None), artefactId: Optional[str] = Form(None)
+) -> JSONResponse:
     req_id = str(uuid.uuid4())
-    logger.info(f"[{req_id}] Starting circuit analysis for file: {file.filename}")
+    logger.info(f"[{req_id}] Starting circuit analysis for {file.filename if file else f'artefact {artefactId}'}")
     
     try:
-        # Image preprocessing steps remain the same
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        image = preprocess_image(image, req_id)
-        width, height = image.size
-        
-        # Component detection
-        logger.info(f"[{req_id}] Running component detection")
-        model = app.state.models['component_model']
-        data_device, classes, component_boxes = extract_pred(image, model)
-        
-        # Generate device UUIDs and JSON
-        devices_json, devices_uuid, num_nodes = deviceJSON(data_device, classes)
-        logger.debug(f"[{req_id}] Generated device UUIDs and JSON for {len(devices_json)} devices")
-        
-        # Map device coordinates to UUIDs
-        data_device_dict = {k: data_device[i] for i, (k, _) in enumerate(devices_uuid.items())}
-        
-        # Wire detection
-        masked_image = create_white_mask(image, component_boxes)
-        data_wire = extract_pred_wire(masked_image, app.state.models['wire_model'])
-        logger.debug(f"[{req_id}] Detected {len(data_wire)} wires")
+        timer = metrics.timer("analyze-circuit")
+        contents = await read_upload(file, artefactId)
+        json_data, cached, artefact_id = await app.state.executor.run(
+            run_circuit_analysis, contents, req_id, timer, artefactId
+        )
+        component_json, wires_json = json_data["devices"], json_data["wires"]
         
-        # Generate wire UUIDs
-        wire_uuids = [(str(uuid.uuid4()), str(uuid.uuid4())) for _ in range(len(data_wire))]
+        logger.info(f"[{req_id}] Prepared JSON response with {len(component_json)} devices and {len(wires_json)} wires")
+        logger.debug(f"[{req_id}] JSON structure: {json.dumps(json_data)[:500]}...")
         
-        # Process final connections
-        devices, wires = inception(data_device_dict, data_wire, (width, height), classes)
-        logger.debug(f"[{req_id}] Inception completed: {len(devices)} devices, {len(wires)} wires")
+        with timer.stage("encode"):
+            response = JSONResponse(
+                content=with_artefact(json_data, artefact_id), headers={"X-Cache": "hit" if cached else "miss"}
+            )
+        return response
         
-        # Generate final JSON
-        component_json = componentJSON(devices, [])  # Empty list for freenodes
-        wires_json = wiresJSON(wires)  # This should create the wire connections
+    except (QueueFullError, ArtefactMissing, HTTPException):
+        raise
+    except Exception as e:
+        logger.exception(f"[{req_id}] Circuit analysis failed")
+        return JSONResponse(
+            status_code=500,
+            content={"result": "error", "message": str(e)}
+        )
+
+def sse_event(event, data):
+    """One Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stage_times(timer, stages, start):
+    """processingTime of a stream event: its stages plus the time since the upload was read"""
+    times = {name: f"{timer.durations[name]:.4f}s" for name in stages if name in timer.durations}
+    times["elapsed"] = f"{time.perf_counter() - start:.4f}s"
+    return times
+
+@app.post("/analyze-circuit/stream")
+async def analyze_circuit_stream(
+    file: Optional[UploadFile] = File(None), artefactId: Optional[str] = Form(None)
+):
+    """/analyze-circuit as Server-Sent Events, one event per finished stage.
+
+    components (boxes in original-image units and classes), then wires
+    (segments), then circuit (the devices/wires JSON of /analyze-circuit),
+    each with its stage timings; error if a stage fails. A cache hit sends circuit only.
+    Stages run as separate executor jobs, so a client that disconnects
+    stops the analysis at the next stage. The components and circuit events
+    carry the artefactId.
+    """
+    req_id = str(uuid.uuid4())
+    logger.info(f"[{req_id}] Starting streamed circuit analysis for {file.filename if file else f'artefact {artefactId}'}")
+    
+    try:
+        timer = metrics.timer("analyze-circuit-stream")
+        contents = await read_upload(file, artefactId)
+        start = time.perf_counter()
+        # the first stage runs before the response starts, so a full queue is still a 503
+        state = await app.state.executor.run(analysis_components, contents, req_id, timer, artefactId)
+    except (QueueFullError, ArtefactMissing, HTTPException):
+        raise
+    except Exception as e:
+        logger.exception(f"[{req_id}] Streamed circuit analysis failed")
+        return JSONResponse(
+            status_code=500,
+            content={"result": "error", "message": str(e)}
+        )
+    
+    async def events():
+        try:
+            json_data = state["cached"]
+            if json_data is None:
+                yield sse_event("components", with_artefact({
+                    "boxes": state["data_device"],
+                    "classes": state["classes"],
+                    "processingTime": stage_times(timer, ("decode", "resize", "component_inference", "component_queue"), start),
+                }, state["artefactId"]))
+                await app.state.executor.run(analysis_wires, state, req_id, timer)
+                yield sse_event("wires", {
+                    "wires": [list(wire) for wire in state["data_wire"]],
+                    "processingTime": stage_times(timer, ("masking", "wire_inference", "wire_queue"), start),
+                })
+                json_data = await app.state.executor.run(analysis_circuit, state, timer)
+            yield sse_event("circuit", with_artefact({
+                **json_data,
+                "cached": state["cached"] is not None,
+                "processingTime": stage_times(timer, ("inception", "json_build"), start),
+            }, state["artefactId"]))
+            logger.info(f"[{req_id}] Stream finished in {time.perf_counter() - start:.4f}s")
+        except (asyncio.CancelledError, GeneratorExit):
+            logger.info(f"[{req_id}] Client closed the stream, remaining stages skipped")
+            raise
+        except Exception as e:
+            logger.exception(f"[{req_id}] Streamed circuit analysis failed")
+            yield sse_event("error", {"result": "error", "message": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # proxies must pass events through as they come
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def run_job(job, check):
+    """Job handler: the /analyze-circuit pipeline, stopping between stages once cancelled"""
+    timer = metrics.timer("jobs")
+    # nobody polls a job for intermediate results, so nothing is kept
+    state = analysis_components(job.payload, job.id, timer, keep=False)
+    if state["cached"] is not None:
+        return state["cached"]
+    check()
+    analysis_wires(state, job.id, timer)
+    check()
+    return analysis_circuit(state, timer)
+
+@app.post("/jobs", status_code=202)
+def submit_job(file: UploadFile = File(...), priority: int = Form(0)):
+    """Queue a circuit analysis; poll GET /jobs/{id} for the result.
+
+    Higher priority jobs run first. 503 with Retry-After when the queue is full.
+    """
+    job_id = app.state.jobs.submit(file.file.read(), priority, {"filename": file.filename})
+    logger.info(f"[{job_id}] Queued job for file: {file.filename} (priority {priority})")
+    return JSONResponse(
+        status_code=202,
+        content={"jobId": job_id, "status": "queued", "priority": priority},
+        headers={"Location": f"/jobs/{job_id}"}
+    )
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """Status of a job, with the circuit JSON once it is done"""
+    status = app.state.jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return status
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a queued or running job; finished jobs are left as they are"""
+    status = app.state.jobs.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    if status != "cancelled":
+        raise HTTPException(status_code=409, detail=f"Job already {status}")
+    logger.info(f"[{job_id}] Job cancelled")
+    return {"jobId": job_id, "status": status}
+
+class DeviceGeometry(BaseModel):
+    deviceId: str
+    deviceType: str
+    # x1, y1, x2, y2 in original-image units, as in the stream's components event
+    box: Tuple[float, float, float, float]
+
+class WireGeometry(BaseModel):
+    wireId: str
+    # angle, x1, y1, x2, y2, as in the stream's wires event
+    wire: Tuple[float, float, float, float, float]
+
+class CircuitElements(BaseModel):
+    devices: List[DeviceGeometry] = []
+    wires: List[WireGeometry] = []
+
+class CircuitDiff(BaseModel):
+    added: CircuitElements = Field(default_factory=CircuitElements)
+    moved: CircuitElements = Field(default_factory=CircuitElements)
+    deleted: List[str] = []
+
+class ReconnectRequest(BaseModel):
+    sessionId: Optional[str] = None
+    # the circuit before the diff; only read when the session is unknown or expired
+    devices: List[DeviceGeometry] = []
+    wires: List[WireGeometry] = []
+    diff: CircuitDiff = Field(default_factory=CircuitDiff)
+
+def run_reconnect(body, timer):
+    """Blocking part of /reconnect: find or build the session's circuit, apply the diff"""
+    session_id, session = body.sessionId, app.state.sessions.get(body.sessionId)
+    rebuilt = session is None
+    if rebuilt:
+        with timer.stage("inception"):
+            circuit = IncrementalCircuit(
+                [(d.deviceId, d.deviceType, d.box) for d in body.devices],
+                [(w.wireId, w.wire) for w in body.wires]
+            )
+        session = {"circuit": circuit, "lock": threading.Lock()}
+        session_id = app.state.sessions.create(session)
+
+    diff = body.diff
+    # edits of one session apply one at a time
+    with session["lock"]:
+        circuit = session["circuit"]
+        with timer.stage("reconnect"):
+            rejoined = circuit.edit(
+                added_devices=[(d.deviceId, d.deviceType, d.box) for d in diff.added.devices],
+                added_wires=[(w.wireId, w.wire) for w in diff.added.wires],
+                moved_devices=[(d.deviceId, d.box) for d in diff.moved.devices],
+                moved_wires=[(w.wireId, w.wire) for w in diff.moved.wires],
+                deleted=diff.deleted
+            )
+        with timer.stage("json_build"):
+            json_data = circuit.to_json()
+    return {"sessionId": session_id, "rebuilt": rebuilt, "rejoinedEndpoints": rejoined, **json_data}
+
+@app.post("/reconnect")
+def reconnect(body: ReconnectRequest):
+    """Re-run only the connectivity stage after the user edits the detections.
+
+    Takes the session id of an earlier /reconnect and a diff of added,
+    moved and deleted devices and wires; only endpoints near the edit are
+    re-joined. Without a live session (first call, expired, or another
+    worker) the circuit is built from devices/wires first and a new
+    sessionId is returned. Junctions are derived, so the diff can't name
+    them. Responds with the devices/wires JSON of /analyze-circuit, with the
+    client's device and wire ids.
+    """
+    timer = metrics.timer("reconnect")
+    start = time.perf_counter()
+    try:
+        response = run_reconnect(body, timer)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response["processingTime"] = stage_times(timer, list(timer.durations), start)
+    logger.info(f"[{response['sessionId']}] Re-joined {response['rejoinedEndpoints']} endpoints after the edit")
+    return response
+
+def run_batch_detection(contents_list, req_id):
+    """Blocking part of /analyze-circuit/batch: preprocessing and both detectors.
+
+    Returns one entry per upload: (original size, component prediction,
+    wires), or the error message for a page that could not be decoded.
+    """
+    # Decode and preprocess every page up front; a bad page only fails itself
+    pages, errors = [], {}
+    for index, contents in enumerate(contents_list):
+        try:
+            pages.append((index, *preprocess_image(decode_image(contents), req_id)))
+        except Exception as e:
+            logger.error(f"[{req_id}] Could not read page {index}: {str(e)}")
+            errors[index] = str(e)
+    images, transforms = [image for _, image, _ in pages], [transform for _, _, transform in pages]
+    
+    # Component detection, one forward pass per chunk
+    logger.info(f"[{req_id}] Running batched component detection")
+    component_preds = extract_pred_batch(
+        images, app.state.models['component_model'], config.BATCH_INFERENCE_SIZE, config.CONFIDENCE_THRESHOLD
+    )
+    
+    # Wire detection on the masked pages
+    masked_images = [
+        create_white_mask(image, boxes, out=image) for image, (_, _, boxes) in zip(images, component_preds)
+    ]
+    logger.info(f"[{req_id}] Running batched wire detection")
+    wire_preds = extract_pred_wire_batch(
+        masked_images, app.state.models['wire_model'], config.BATCH_INFERENCE_SIZE, config.CONFIDENCE_THRESHOLD
+    )
+    
+    results = list(errors.get(index) for index in range(len(contents_list)))
+    for (index, _, transform), (coords, classes, boxes), data_wire in zip(pages, component_preds, wire_preds):
+        results[index] = (
+            transform.original_size,
+            (unmap_boxes(coords, transform), classes, boxes),
+            unmap_wires(data_wire, transform),
+        )
+    return results
+
+@app.post("/analyze-circuit/batch")
+async def analyze_circuit_batch(files: List[UploadFile] = File(...)) -> JSONResponse:
+    """Analyze several circuit images with batched model calls.
+
+    Failures are per page: a page that can't be decoded or connected gets
+    an error entry in results and the others are still analysed.
+    """
+    req_id = str(uuid.uuid4())
+    logger.info(f"[{req_id}] Starting batch circuit analysis for {len(files)} files")
+    
+    try:
+        contents_list = [await file.read() for file in files]
+        pages = await app.state.executor.run(run_batch_detection, contents_list, req_id)
         
-        json_data = {
-            "wires": wires_json,
-            "devices": component_json
-        }
+        # Fan inception out to the worker pool
+        loop = asyncio.get_running_loop()
+        tasks = [
+            loop.run_in_executor(
+                app.state.inception_pool, connect_circuit, data_device, classes, data_wire, image_size
+            )
+            for image_size, (data_device, classes, _), data_wire in [page for page in pages if not isinstance(page, str)]
+        ]
+        outcomes = iter(await asyncio.gather(*tasks, return_exceptions=True))
         
-        logger.info(f"[{req_id}] Prepared JSON response with {len(component_json)} devices and {len(wires_json)} wires")
-        logger.debug(f"[{req_id}] JSON structure: {json.dumps(json_data)[:500]}...")
+        results = []
+        for file, page in zip(files, pages):
+            if isinstance(page, str):
+                results.append({"filename": file.filename, "result": "error", "message": f"Could not read image: {page}"})
+                continue
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                logger.error(f"[{req_id}] Inception failed for {file.filename}: {str(outcome)}")
+                results.append({"filename": file.filename, "result": "error", "message": str(outcome)})
+            else:
+                results.append({"filename": file.filename, **outcome})
         
-        return JSONResponse(content=json_data)
+        logger.info(f"[{req_id}] Prepared batch response for {len(results)} files")
+        return JSONResponse(content={"results": results})
         
+    except QueueFullError:
+        raise
     except Exception as e:
-        logger.exception(f"[{req_id}] Circuit analysis failed")
+        logger.exception(f"[{req_id}] Batch circuit analysis failed")
         return JSONResponse(
             status_code=500,
             content={"result": "error", "message": str(e)}
         )
 
 # test pipeline
+def run_detect_preview(image_data):
+    """Blocking part of /detect/: side-by-side annotated JPEG"""
+    image = decode_image(image_data)
+    
+    # Use the shared component model instance
+    component_results = app.state.models['component_model'](image, conf=config.CONFIDENCE_THRESHOLD)[0]
+    component_boxes = component_results.boxes.xyxy.cpu().numpy()
+    
+    # Annotate before masking, the results keep a reference to the input array
+    component_annotated = component_results.plot()
+    
+    # Create masked image with white rectangles
+    masked_image = create_white_mask(image, component_boxes, out=image)
+    
+    # Run masked image through final model
+    final_results = app.state.models['wire_model'](masked_image, conf=config.CONFIDENCE_THRESHOLD)[0]
+    final_annotated = final_results.plot()
+    
+    # Combine both results side by side (same input image, so same height)
+    combined_image = np.hstack((component_annotated, final_annotated))
+    
+    # Convert to bytes
+    ok, encoded = cv.imencode(".jpg", combined_image)
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return io.BytesIO(encoded.tobytes())
+
 @app.post("/detect/")
 async def detect_image(file: UploadFile = File(...)):
 
@@ -250,56 +942,137 @@ async def detect_image(file: UploadFile = File(...)):
     
     # Read image from the uploaded file
     image_data = await file.read()
-    image = Image.open(io.BytesIO(image_data))
-    width, height = image.size
+    img_byte_arr = await app.state.executor.run(run_detect_preview, image_data)
     
-    # Use the shared component model instance
-    component_results = app.state.models['component_model'](image)[0]
-    component_boxes = component_results.boxes.xyxy.cpu().numpy()
+    return StreamingResponse(img_byte_arr, media_type="image/jpeg")
+
+def preview_options(fmt=None, quality=None, max_side=None):
+    """A /detect request's PreviewOptions, config defaults for what it leaves out.
+
+    Raises ValueError for an unknown format or a quality out of range.
+    """
+    fmt = (fmt or config.PREVIEW_FORMAT).lower()
+    if quality is None:
+        quality = config.PREVIEW_PNG_COMPRESSION if fmt == "png" else config.PREVIEW_QUALITY
+    return PreviewOptions(fmt, quality, config.PREVIEW_MAX_SIDE if max_side is None else max_side).check()
+
+def run_detect_steps(contents, req_id, timer, artefact_id=None, options=None, inline=True):
+    """Blocking part of /detect: both detectors, masking and the three previews.
+
+    Starts from the stored artefacts of artefact_id when there are any, so
+    the stages an earlier /detect or /analyze-circuit ran are not run again.
+    The previews are encoded side by side on the encode pool and kept with
+    the artefacts; inline puts them in the body as data URIs, otherwise the
+    body has their URLs. Returns the response body and whether it came from
+    the result cache (only inline bodies are cached, URLs name one artefact).
+    """
+    options = options or preview_options()
+    artefact_id, artefacts = load_artefacts(contents, artefact_id, req_id, timer)
+    logger.debug(f"[{req_id}] Image ready, shape: {artefacts['image'].shape}")
     
-    # Create masked image with white rectangles
-    masked_image = create_white_mask(image, component_boxes)
+    route = f"detect|{options.format}|{options.quality}|{options.max_side}"
+    key = cache_key(route, artefacts) if inline else None
+    if key is not None:
+        cached = app.state.result_cache.get(key)
+        if cached is not None:
+            logger.info(f"[{req_id}] Result cache hit")
+            return with_artefact(cached, artefact_id), True
     
-    # Run masked image through final model
-    final_results = app.state.models['wire_model'](masked_image)[0]
+    # Component detection
+    reused = [stage for stage in ("components", "masked", "wires") if stage in artefacts]
+    stored = artefacts.get("previews")
+    if stored is not None and stored["options"] == options:
+        reused.append("previews")
+    components = detect_components(artefacts, req_id, timer)
+    component_time = timer.durations.get("component_inference", 0.0)
+    component_queue = timer.durations.get("component_queue", 0.0)
+    logger.info(f"[{req_id}] Component detection completed in {component_time:.4f}s")
+    logger.debug(f"[{req_id}] Found {len(components['boxes'])} components")
+    # plot before masking, which may paint over the image the result holds
+    component_image = components["result"].plot() if "previews" not in reused else None
     
-    # Get annotated images
-    component_annotated = Image.fromarray(np.uint8(component_results.plot()))
-    final_annotated = Image.fromarray(np.uint8(final_results.plot()))
+    # Create masked image
+    masked_image = mask_components(artefacts, timer)
+    masked_time = timer.durations.get("masking", 0.0)
+    logger.info(f"[{req_id}] Masked image created in {masked_time:.4f}s")
     
-    # Create a new image combining both results side by side
-    total_width = component_annotated.width + final_annotated.width
-    max_height = max(component_annotated.height, final_annotated.height)
-    combined_image = Image.new('RGB', (total_width, max_height))
+    # Wire detection
+    wire_results = detect_wires(artefacts, req_id, timer)["result"]
+    wire_time = timer.durations.get("wire_inference", 0.0)
+    wire_queue = timer.durations.get("wire_queue", 0.0)
+    logger.info(f"[{req_id}] Wire detection completed in {wire_time:.4f}s")
     
-    # Paste both images
-    combined_image.paste(component_annotated, (0, 0))
-    combined_image.paste(final_annotated, (component_annotated.width, 0))
+    with artefacts["lock"]:
+        # another request may have encoded them since, or with other options
+        stored = artefacts.get("previews")
+        if stored is None or stored["options"] != options:
+            logger.info(f"[{req_id}] Encoding previews as {options.format}")
+            if component_image is None:
+                # only for stored bundles, whose mask is a copy
+                component_image = components["result"].plot()
+            images = {"components": component_image, "masked": masked_image, "lines": wire_results.plot()}
+            with timer.stage("encode"):
+                # cv2 releases the GIL while encoding, so the three run in parallel
+                futures = {
+                    name: app.state.encode_pool.submit(encode_preview, image, options)
+                    for name, image in images.items()
+                }
+                artefacts["previews"] = {"options": options, "images": {name: f.result() for name, f in futures.items()}}
+            logger.info(f"[{req_id}] Previews encoded in {timer.durations['encode']:.4f}s")
+        previews = artefacts["previews"]["images"]
+    save_artefacts(artefact_id, artefacts)
     
-    # Convert to bytes
-    img_byte_arr = io.BytesIO()
-    combined_image.save(img_byte_arr, format='JPEG')
-    img_byte_arr.seek(0)
+    if inline:
+        previews = {
+            name: f"data:{options.media_type};base64,{base64.b64encode(data).decode()}"
+            for name, data in previews.items()
+        }
+    else:
+        previews = {name: f"/artefacts/{artefact_id}/previews/{name}" for name in previews}
     
-    return StreamingResponse(img_byte_arr, media_type="image/jpeg")
+    response = {
+        **previews,
+        "processingTime": {
+            "component": f"{component_time:.4f}s",
+            "componentQueue": f"{component_queue:.4f}s",
+            "masking": f"{masked_time:.4f}s",
+            "wire": f"{wire_time:.4f}s",
+            "wireQueue": f"{wire_queue:.4f}s",
+            "encode": f"{timer.durations.get('encode', 0.0):.4f}s",
+        }
+    }
+    if key is not None:
+        app.state.result_cache.put(key, response)
+    return with_artefact({**response, "reused": reused}, artefact_id), False
 
 @app.post("/detect")
-async def detect_steps(file: UploadFile = File(...)):
+async def detect_steps(
+    file: Optional[UploadFile] = File(None),
+    artefactId: Optional[str] = Form(None),
+    previewFormat: Optional[str] = Form(None),
+    previewQuality: Optional[int] = Form(None),
+    previewMaxSide: Optional[int] = Form(None),
+    inline: Optional[bool] = Form(None)
+):
+    """Component and wire detection with annotated previews.
+
+    previewFormat (png, jpeg, webp), previewQuality and previewMaxSide
+    override the PREVIEW_* settings. With inline=false the previews are not
+    in the body but fetched from GET /artefacts/{artefactId}/previews/{name}.
+    """
     req_id = str(uuid.uuid4())
-    logger.info(f"[{req_id}] Processing detection steps for file: {file.filename}")
+    logger.info(f"[{req_id}] Processing detection steps for {file.filename if file else f'artefact {artefactId}'}")
+    
+    try:
+        options = preview_options(previewFormat, previewQuality, previewMaxSide)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    inline = config.PREVIEW_INLINE if inline is None else inline
+    if not inline and app.state.artefacts is None:
+        raise HTTPException(status_code=400, detail="Previews can only be fetched separately with the artefact store enabled")
     
     try:
-        # Read image
         start_time = time.time()
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        logger.debug(f"[{req_id}] Image opened successfully, format: {image.format}, size: {image.size}")
-        
-        # Preprocess image
-        image = preprocess_image(image, req_id)
-        
-        # Component detection
-        logger.info(f"[{req_id}] Running component detection")
         if 'component_model' not in app.state.models:
             available_models = list(app.state.models.keys()) if hasattr(app.state, 'models') else "None"
             logger.error(f"[{req_id}] Component model not found. Available: {available_models}")
@@ -307,100 +1080,30 @@ async def detect_steps(file: UploadFile = File(...)):
                 content={"error": f"Component model not found. Available: {available_models}"},
                 status_code=500
             )
-            
-        component_start = time.time()
-        component_results = app.state.models['component_model'](image)[0]
-        component_time = time.time() - component_start
-        
-        logger.info(f"[{req_id}] Component detection completed in {component_time:.4f}s")
-        
-        component_boxes = component_results.boxes.xyxy.cpu().numpy()
-        component_image = component_results.plot()
-        logger.debug(f"[{req_id}] Found {len(component_boxes)} components")
-        
-        # Create masked image
-        logger.info(f"[{req_id}] Creating masked image")
-        masked_start = time.time()
-        masked_image = create_white_mask(image, component_boxes)
-        masked_time = time.time() - masked_start
-        
-        logger.info(f"[{req_id}] Masked image created in {masked_time:.4f}s")
-        
-        # Convert masked image correctly
-        if isinstance(masked_image, Image.Image):
-            masked_np = np.array(masked_image)
-            logger.debug(f"[{req_id}] Converted PIL Image to numpy array, shape: {masked_np.shape}")
-        else:
-            masked_np = masked_image
-            logger.debug(f"[{req_id}] Using existing numpy array, shape: {masked_np.shape if hasattr(masked_np, 'shape') else 'unknown'}")
-        
-        # Wire detection
-        logger.info(f"[{req_id}] Running wire detection")
         if 'wire_model' not in app.state.models:
             logger.error(f"[{req_id}] Wire model not found")
             return JSONResponse(
                 content={"error": "Wire model not found"},
                 status_code=500
             )
-            
-        wire_start = time.time()
-        wire_results = app.state.models['wire_model'](Image.fromarray(masked_np))[0]
-        wire_time = time.time() - wire_start
-        
-        logger.info(f"[{req_id}] Wire detection completed in {wire_time:.4f}s")
-        wire_image = wire_results.plot()
-        
-        # Convert images to base64
-        logger.info(f"[{req_id}] Converting images to base64")
         
-        def image_to_base64(img_array):
-            logger.debug(f"[{req_id}] Converting image to base64. Type: {type(img_array)}")
-            try:
-                # Handle different input types
-                if isinstance(img_array, Image.Image):
-                    img = img_array
-                else:
-                    img = Image.fromarray(np.uint8(img_array))
-                
-                # Flip the image vertically before converting to base64
-                img = img.transpose(Image.FLIP_TOP_BOTTOM)
-                
-                buffered = io.BytesIO()
-                img.save(buffered, format="PNG")
-                img_str = base64.b64encode(buffered.getvalue()).decode()
-                return f"data:image/png;base64,{img_str}"
-            except Exception as e:
-                logger.error(f"[{req_id}] Error in image conversion: {str(e)}")
-                raise
-        
-        b64_start = time.time()
-        components_b64 = image_to_base64(component_image)
-        masked_b64 = image_to_base64(masked_np)
-        lines_b64 = image_to_base64(wire_image)
-        b64_time = time.time() - b64_start
-        
-        logger.info(f"[{req_id}] Base64 conversion completed in {b64_time:.4f}s")
+        timer = metrics.timer("detect")
+        contents = await read_upload(file, artefactId)
+        response, cached = await app.state.executor.run(
+            run_detect_steps, contents, req_id, timer, artefactId, options, inline
+        )
         
         # Calculate total processing time
         total_time = time.time() - start_time
         logger.info(f"[{req_id}] Total processing time: {total_time:.4f}s")
-        
-        # Prepare response
-        response = {
-            "components": components_b64,
-            "masked": masked_b64,
-            "lines": lines_b64,
-            "processingTime": {
-                "component": f"{component_time:.4f}s",
-                "masking": f"{masked_time:.4f}s",
-                "wire": f"{wire_time:.4f}s",
-                "total": f"{total_time:.4f}s"
-            }
-        }
+        # the cached body shares processingTime, so don't write into it
+        response["processingTime"] = {**response["processingTime"], "total": f"{total_time:.4f}s"}
         
         logger.info(f"[{req_id}] Response prepared successfully")
-        return JSONResponse(content=response)
+        return JSONResponse(content=response, headers={"X-Cache": "hit" if cached else "miss"})
         
+    except (QueueFullError, ArtefactMissing, HTTPException):
+        raise
     except Exception as e:
         logger.exception(f"[{req_id}] Detection failed: {str(e)}")
         return JSONResponse(
@@ -412,6 +1115,8 @@ async def detect_steps(file: UploadFile = File(...)):
         )
 
 if __name__ == "__main__":
+    import uvicorn
+
     logger.info("Starting application server")
     try:
         uvicorn.run(app, host="127.0.0.1", port=8000)
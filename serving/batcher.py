@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, List
+
+from loguru import logger
+
+
+class _BatchRequest:
+    __slots__ = ("images", "kwargs", "future", "enqueued")
+
+    def __init__(self, images: List[Any], kwargs: dict):
+        self.images = images
+        self.kwargs = kwargs
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class MicroBatcher:
+    """Collects model calls that arrive close together into one forward pass.
+
+    Drop-in for a YOLO model: calling it with an image (or a list of images)
+    blocks until the batched pass containing it has run and returns the
+    same list of results the model would. A single dispatcher thread owns
+    the model, so concurrent requests never call it in parallel.
+    """
+    def __init__(self, model, max_batch_size: int = 8, max_wait_ms: float = 5, name: str = "model"):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._thread = threading.Thread(target=self._loop, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    @property
+    def names(self):
+        return self.model.names
+
+    @property
+    def queue_wait(self) -> float:
+        """Seconds the calling thread's last request waited for its batch"""
+        return getattr(self._local, "queue_wait", 0.0)
+
+    def submit(self, source, **kwargs) -> Future:
+        """Queue an image or list of images; the future resolves to (results, queue_wait)"""
+        images = list(source) if isinstance(source, list) else [source]
+        request = _BatchRequest(images, kwargs)
+        self._queue.put(request)
+        return request.future
+
+    def __call__(self, source, **kwargs):
+        results, wait = self.submit(source, **kwargs).result()
+        self._local.queue_wait = wait
+        return results
+
+    def close(self):
+        self._queue.put(None)
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            # Gather whatever arrives within the wait window
+            batch = [first]
+            size = len(first.images)
+            deadline = time.monotonic() + self.max_wait
+            closing = False
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    closing = True
+                    break
+                batch.append(request)
+                size += len(request.images)
+
+            self._run(batch)
+            if closing:
+                break
+
+    def _run(self, batch: List[_BatchRequest]):
+        # Requests with different call options can't share a forward pass
+        groups = {}
+        for request in batch:
+            key = tuple(sorted(request.kwargs.items()))
+            groups.setdefault(key, []).append(request)
+
+        for requests in groups.values():
+            started = time.monotonic()
+            images = [image for request in requests for image in request.images]
+            try:
+                results = self.model(images, **requests[0].kwargs)
+            except Exception as e:
+                logger.error(f"Batched {self.name} inference failed: {str(e)}")
+                for request in requests:
+                    request.future.set_exception(e)
+                continue
+
+            logger.debug(f"Ran {self.name} on a batch of {len(images)} images from {len(requests)} requests")
+            offset = 0
+            for request in requests:
+                count = len(request.images)
+                request.future.set_result((results[offset:offset + count], started - request.enqueued))
+                offset += count
+
+
+class LockedModel:
+    """Drop-in for a YOLO model that lets one thread call it at a time.
+
+    The ultralytics predictor keeps per-call state on the model, so two
+    threads calling it at once can get each other's results. MicroBatcher
+    avoids that with its dispatcher thread; without micro-batching the
+    models are wrapped in this instead. The time a call waited for the
+    lock is its queue_wait.
+    """
+    def __init__(self, model, name: str = "model"):
+        self.model = model
+        self.name = name
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def names(self):
+        return self.model.names
+
+    @property
+    def queue_wait(self) -> float:
+        """Seconds the calling thread's last call waited for the model"""
+        return getattr(self._local, "queue_wait", 0.0)
+
+    def __call__(self, source, **kwargs):
+        enqueued = time.monotonic()
+        with self._lock:
+            self._local.queue_wait = time.monotonic() - enqueued
+            return self.model(source, **kwargs)
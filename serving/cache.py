@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import numpy as np
+from loguru import logger
+
+
+def model_fingerprint(paths: Iterable[str]) -> str:
+    """Identify model weights by path, size and modification time"""
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{path}:{stat.st_size}:{int(stat.st_mtime)}")
+        except OSError:
+            parts.append(path)
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """Response cache keyed on image content, models and settings.
+
+    Entries live in an in-memory LRU bounded by max_bytes of encoded JSON.
+    If db_path is set, every entry is also written to a sqlite file so the
+    cache survives restarts; memory misses fall back to it and promote.
+    The file is bounded by db_max_bytes: each write deletes the oldest
+    entries (by creation) until the table fits again.
+    """
+    def __init__(self, max_bytes: int, db_path: Optional[str] = None, db_max_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.db_max_bytes = db_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB, created REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+            self._db.commit()
+            logger.info(f"Result cache disk tier at {db_path}")
+
+    @staticmethod
+    def make_key(route: str, image: np.ndarray, model_id: str, conf: float, transform: tuple = ()) -> str:
+        """Hash of the preprocessed image array plus everything that changes the output.
+
+        transform is how the image was fitted to the model input (a
+        Letterbox): different originals can give the same canvas, and the
+        response is mapped back to the original.
+        """
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"{route}|{model_id}|{conf}|{tuple(transform)}|{image.dtype}|{image.shape}".encode())
+        # hashes the buffer directly, no bytes copy for contiguous arrays
+        h.update(np.ascontiguousarray(image).data)
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(blob)
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self.disk_hits += 1
+                    self._insert(key, row[0])
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: dict):
+        blob = json.dumps(value).encode()
+        with self._lock:
+            self._insert(key, blob)
+            if self._db is not None and len(blob) <= self.db_max_bytes:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)",
+                    (key, blob, time.time())
+                )
+                self._trim_db()
+                self._db.commit()
+
+    def _trim_db(self):
+        """Delete the oldest disk entries until the table is within db_max_bytes"""
+        # summed from the table, other processes may share the file
+        excess = self._db.execute("SELECT TOTAL(LENGTH(value)) FROM results").fetchone()[0] - self.db_max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for key, size in self._db.execute("SELECT key, LENGTH(value) FROM results ORDER BY created"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM results WHERE key = ?", victims)
+        self.disk_evictions += len(victims)
+
+    def _insert(self, key: str, blob: bytes):
+        if len(blob) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = blob
+        self._bytes += len(blob)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "hitRate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "diskEvictions": self.disk_evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "diskEnabled": self._db is not None,
+            }
@@ -0,0 +1,67 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from loguru import logger
+
+
+class QueueFullError(Exception):
+    """Raised when the inference executor has no free slot"""
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """Bounded thread pool for the blocking (CPU-bound) parts of a request.
+
+    At most max_workers jobs run at once and at most max_queue more wait for
+    a worker; anything beyond that is rejected immediately with
+    QueueFullError instead of piling up behind the event loop. A slot is
+    freed when the job itself finishes, not when its caller stops waiting,
+    so jobs left running by disconnected clients still count.
+    """
+    def __init__(self, max_workers: int, max_queue: int, retry_after: int = 1):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        # released from worker threads when a job is done
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        """Jobs running or waiting for a worker"""
+        return self._pending
+
+    def _release(self, future: Optional[Future] = None):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool, or raise QueueFullError"""
+        with self._lock:
+            if self._pending >= self.capacity:
+                logger.warning(f"Inference queue full ({self._pending}/{self.capacity}), rejecting request")
+                raise QueueFullError(self.retry_after)
+            self._pending += 1
+
+        try:
+            future = self._pool.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        # a cancelled caller cancels a job still waiting for a worker (which
+        # then frees its slot here too), a running one keeps its slot until done
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
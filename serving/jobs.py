@@ -0,0 +1,433 @@
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from serving.executor import QueueFullError
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# finished jobs are swept at most this often
+PURGE_INTERVAL = 10.0
+# a job whose worker died this many times mid-run is failed instead of requeued
+MAX_ATTEMPTS = 2
+
+
+class JobCancelled(Exception):
+    """Raised inside a job handler once its job has been cancelled"""
+
+
+class Job:
+    """A claimed job, as handed to the handler"""
+    __slots__ = ("id", "payload", "priority", "meta")
+
+    def __init__(self, job_id: str, payload: bytes, priority: int, meta: dict):
+        self.id = job_id
+        self.payload = payload
+        self.priority = priority
+        self.meta = meta
+
+
+def _status(job_id, status, priority, created, started, finished, result, error, meta) -> dict:
+    body = {
+        "jobId": job_id,
+        "status": status,
+        "priority": priority,
+        "createdAt": created,
+        "startedAt": started,
+        "finishedAt": finished,
+        **meta,
+    }
+    if status == DONE:
+        body["result"] = result
+    if status == FAILED:
+        body["error"] = error
+    return body
+
+
+class JobQueue(ABC):
+    """Queued analyses and the results of finished ones.
+
+    Higher priority is claimed first, FIFO within a priority. submit()
+    raises QueueFullError once max_queued jobs are waiting. Cancelling a
+    queued job drops it; a running job is flagged and its handler stops at
+    the next check. Results and errors are kept for ttl seconds after the
+    job finishes.
+    """
+    def __init__(self, max_queued: int, ttl: float, retry_after: int = 1):
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._last_purge = 0.0
+
+    @abstractmethod
+    def submit(self, payload: bytes, priority: int = 0, meta: Optional[dict] = None) -> str:
+        ...
+
+    @abstractmethod
+    def claim(self, timeout: float) -> Optional[Job]:
+        """Next queued job, now marked running, or None after timeout seconds"""
+
+    @abstractmethod
+    def finish(self, job_id: str, result: Any = None, error: Optional[str] = None):
+        """Mark a running job done (or failed with error); cancelled jobs stay cancelled"""
+
+    @abstractmethod
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a queued or running job; returns its status after, None if unknown"""
+
+    @abstractmethod
+    def is_cancelled(self, job_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def status(self, job_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Jobs per status"""
+
+    def close(self):
+        pass
+
+    def _reject(self, queued: int):
+        logger.warning(f"Job queue full ({queued}/{self.max_queued}), rejecting job")
+        raise QueueFullError(self.retry_after)
+
+    def _purge_due(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return False
+        self._last_purge = now
+        return True
+
+
+class MemoryJobQueue(JobQueue):
+    """Job queue held in this process (lost on restart, not shared across workers)"""
+    def __init__(self, max_queued: int, ttl: float, retry_after: int = 1):
+        super().__init__(max_queued, ttl, retry_after)
+        self._jobs: Dict[str, dict] = {}
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._queued = 0
+        self._cond = threading.Condition()
+
+    def submit(self, payload: bytes, priority: int = 0, meta: Optional[dict] = None) -> str:
+        with self._cond:
+            self._purge()
+            if self._queued >= self.max_queued:
+                self._reject(self._queued)
+            job_id = str(uuid.uuid4())
+            self._jobs[job_id] = {
+                "status": QUEUED, "priority": priority, "payload": payload, "meta": meta or {},
+                "created": time.time(), "started": None, "finished": None, "result": None, "error": None,
+            }
+            heapq.heappush(self._heap, (-priority, next(self._seq), job_id))
+            self._queued += 1
+            self._cond.notify()
+            return job_id
+
+    def claim(self, timeout: float) -> Optional[Job]:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, _, job_id = heapq.heappop(self._heap)
+                    job = self._jobs.get(job_id)
+                    # cancelled (or purged) jobs stay in the heap until they surface
+                    if job is None or job["status"] != QUEUED:
+                        continue
+                    job["status"] = RUNNING
+                    job["started"] = time.time()
+                    self._queued -= 1
+                    payload, job["payload"] = job["payload"], None
+                    return Job(job_id, payload, job["priority"], job["meta"])
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    return None
+
+    def finish(self, job_id: str, result: Any = None, error: Optional[str] = None):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != RUNNING:
+                return
+            job["status"] = FAILED if error is not None else DONE
+            job["result"], job["error"] = result, error
+            job["finished"] = time.time()
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] in (QUEUED, RUNNING):
+                if job["status"] == QUEUED:
+                    self._queued -= 1
+                job["status"] = CANCELLED
+                job["payload"] = None
+                job["finished"] = time.time()
+            return job["status"]
+
+    def is_cancelled(self, job_id: str) -> bool:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return job is None or job["status"] == CANCELLED
+
+    def status(self, job_id: str) -> Optional[dict]:
+        with self._cond:
+            self._purge()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return _status(
+                job_id, job["status"], job["priority"], job["created"], job["started"],
+                job["finished"], job["result"], job["error"], job["meta"]
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            counts = dict.fromkeys((QUEUED, RUNNING, *FINISHED), 0)
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+            return counts
+
+    def _purge(self):
+        if not self._purge_due():
+            return
+        expired = time.time() - self.ttl
+        for job_id in [k for k, job in self._jobs.items() if job["finished"] is not None and job["finished"] < expired]:
+            del self._jobs[job_id]
+
+
+class SqliteJobQueue(JobQueue):
+    """Job queue in a sqlite file: survives restarts and is shared by pre-forked workers.
+
+    Claiming is one IMMEDIATE transaction, so processes sharing the file
+    never run the same job twice. Idle workers poll every poll_interval
+    seconds; submits from this process wake them straight away.
+
+    A running job keeps its payload and the pid of the process running it.
+    Opening the queue requeues the running jobs whose process is gone (a
+    crash or restart mid-job), or fails them after MAX_ATTEMPTS runs, so
+    the pid check assumes the processes sharing the file are on one host.
+    """
+    def __init__(self, db_path: str, max_queued: int, ttl: float, retry_after: int = 1, poll_interval: float = 0.5):
+        super().__init__(max_queued, ttl, retry_after)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, priority INTEGER, status TEXT, payload BLOB, "
+            "meta TEXT, result TEXT, error TEXT, created REAL, started REAL, finished REAL, "
+            "worker INTEGER, attempts INTEGER DEFAULT 0)"
+        )
+        # files written before jobs recorded their worker
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("worker", "INTEGER"), ("attempts", "INTEGER DEFAULT 0")):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created)")
+        self._recover()
+        logger.info(f"Job queue at {db_path}")
+
+    @staticmethod
+    def _alive(pid: Optional[int]) -> bool:
+        # this process hasn't claimed anything yet, so its own pid on a row is a dead predecessor's
+        if pid is None or pid == os.getpid():
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _recover(self):
+        """Requeue, or fail after MAX_ATTEMPTS, the running jobs of processes that died"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute("SELECT id, worker, attempts FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+                for job_id, worker, attempts in rows:
+                    if self._alive(worker):
+                        continue
+                    if (attempts or 0) >= MAX_ATTEMPTS:
+                        logger.warning(f"[{job_id}] Job failed, its worker died {attempts} times")
+                        self._db.execute(
+                            "UPDATE jobs SET status = ?, payload = NULL, error = ?, finished = ? WHERE id = ?",
+                            (FAILED, "worker restarted", time.time(), job_id)
+                        )
+                    else:
+                        logger.warning(f"[{job_id}] Requeueing job, its worker (pid {worker}) is gone")
+                        self._db.execute(
+                            "UPDATE jobs SET status = ?, started = NULL, worker = NULL WHERE id = ?", (QUEUED, job_id)
+                        )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def submit(self, payload: bytes, priority: int = 0, meta: Optional[dict] = None) -> str:
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._purge()
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                queued = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+                if queued >= self.max_queued:
+                    self._reject(queued)
+                self._db.execute(
+                    "INSERT INTO jobs (id, priority, status, payload, meta, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, priority, QUEUED, payload, json.dumps(meta or {}), time.time())
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        self._wakeup.set()
+        return job_id
+
+    def claim(self, timeout: float) -> Optional[Job]:
+        deadline = time.monotonic() + timeout
+        while True:
+            self._wakeup.clear()
+            job = self._claim_next()
+            remaining = deadline - time.monotonic()
+            if job is not None or remaining <= 0:
+                return job
+            self._wakeup.wait(min(remaining, self.poll_interval))
+
+    def _claim_next(self) -> Optional[Job]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id, payload, priority, meta FROM jobs WHERE status = ? "
+                    "ORDER BY priority DESC, created LIMIT 1",
+                    (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = ?, started = ?, worker = ?, attempts = attempts + 1 WHERE id = ?",
+                        (RUNNING, time.time(), os.getpid(), row[0])
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return Job(row[0], row[1], row[2], json.loads(row[3]))
+
+    def finish(self, job_id: str, result: Any = None, error: Optional[str] = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, payload = NULL, result = ?, error = ?, finished = ? "
+                "WHERE id = ? AND status = ?",
+                (FAILED if error is not None else DONE, json.dumps(result), error, time.time(), job_id, RUNNING)
+            )
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, payload = NULL, finished = ? WHERE id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING)
+            )
+            row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def is_cancelled(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is None or row[0] == CANCELLED
+
+    def status(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            self._purge()
+            row = self._db.execute(
+                "SELECT status, priority, created, started, finished, result, error, meta FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, priority, created, started, finished, result, error, meta = row
+        return _status(
+            job_id, status, priority, created, started, finished,
+            json.loads(result) if result is not None else None, error, json.loads(meta)
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {**dict.fromkeys((QUEUED, RUNNING, *FINISHED), 0), **dict(rows)}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _purge(self):
+        if self._purge_due():
+            self._db.execute("DELETE FROM jobs WHERE finished < ?", (time.time() - self.ttl,))
+
+
+class JobWorkers:
+    """Threads draining a JobQueue.
+
+    handler(job, check) returns the job's result; it should call check()
+    between stages, which raises JobCancelled once the job is cancelled.
+    """
+    def __init__(self, queue: JobQueue, handler: Callable[[Job, Callable[[], None]], Any], workers: int = 1):
+        self.queue = queue
+        self.handler = handler
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(timeout=1.0)
+            except Exception:
+                logger.exception("Failed to claim a job")
+                time.sleep(1.0)
+                continue
+            if job is not None:
+                self._run(job)
+
+    def _run(self, job: Job):
+        def check():
+            if self.queue.is_cancelled(job.id):
+                raise JobCancelled(job.id)
+
+        logger.info(f"[{job.id}] Job started (priority {job.priority})")
+        start = time.perf_counter()
+        try:
+            result = self.handler(job, check)
+        except JobCancelled:
+            logger.info(f"[{job.id}] Job cancelled")
+            return
+        except Exception as e:
+            logger.exception(f"[{job.id}] Job failed")
+            self.queue.finish(job.id, error=str(e))
+            return
+        self.queue.finish(job.id, result=result)
+        logger.info(f"[{job.id}] Job done in {time.perf_counter() - start:.4f}s")
+
+    def close(self):
+        self._stop.set()
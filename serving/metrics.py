@@ -0,0 +1,126 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Stage latencies range from sub-millisecond (masking) to seconds (CPU inference)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Minimal Prometheus-format counters, gauges and histograms"""
+    def __init__(self, prefix: str = "circuit", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+
+    def _declare(self, name, kind, help_text):
+        if name not in self._help:
+            self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, help_text: str, value: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "counter", help_text)
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, help_text: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "gauge", help_text)
+            self._gauges.setdefault(name, {})[key] = value
+
+    def add_gauge(self, name: str, help_text: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "gauge", help_text)
+            series = self._gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, help_text: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "histogram", help_text)
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = _Histogram(self.buckets)
+            series[key].observe(value)
+
+    def timer(self, route: str) -> "RequestTimer":
+        return RequestTimer(self, route)
+
+    def render(self) -> str:
+        """Text exposition format 0.0.4"""
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in self._help.items():
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {full} {help_text}")
+                lines.append(f"# TYPE {full} {kind}")
+                if kind == "histogram":
+                    for labels, hist in self._histograms.get(name, {}).items():
+                        for bound, count in zip(hist.buckets, hist.counts):
+                            le = 'le="%s"' % bound
+                            lines.append(f"{full}_bucket{_format_labels(labels, le)} {count}")
+                        le = 'le="+Inf"'
+                        lines.append(f"{full}_bucket{_format_labels(labels, le)} {hist.total}")
+                        lines.append(f"{full}_sum{_format_labels(labels)} {hist.sum}")
+                        lines.append(f"{full}_count{_format_labels(labels)} {hist.total}")
+                else:
+                    series = self._counters if kind == "counter" else self._gauges
+                    for labels, value in series.get(name, {}).items():
+                        lines.append(f"{full}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimer:
+    """Per-request stage timings, also fed into the registry's stage histogram"""
+    def __init__(self, registry: Optional[MetricsRegistry] = None, route: str = ""):
+        self.registry = registry
+        self.route = route
+        self.durations: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        if self.registry is not None:
+            self.registry.observe(
+                "stage_duration_seconds", "Time spent in each pipeline stage",
+                seconds, route=self.route, stage=name
+            )
@@ -0,0 +1,89 @@
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+class ModelStore(Mapping):
+    """The server's models by name, loaded once: at startup or on first use.
+
+    Indexing loads every model on first access (under a lock, so concurrent
+    first requests load them once), runs the optional warm-up call on each
+    and wraps it (e.g. in a MicroBatcher). Membership and iteration only
+    look at the names, so checking for a model never triggers a load.
+    Load and warm-up times per model are kept in timings for /health.
+
+    preload() splits loading in two for a process that forks workers: the
+    parent loads the weights (nothing that starts threads), every child
+    then warms up and wraps the models it inherited in load().
+    """
+    def __init__(
+        self,
+        loaders: Dict[str, Callable[[], Any]],
+        warmup: Optional[Callable[[Any], None]] = None,
+        wrap: Optional[Callable[[str, Any], Any]] = None
+    ):
+        self._loaders = loaders
+        self._warmup = warmup
+        self._wrap = wrap
+        self._models = None
+        self._preloaded = {}
+        self._lock = threading.Lock()
+        self.timings = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._models is not None
+
+    def preload(self) -> None:
+        """Load every model without warming it up or wrapping it"""
+        with self._lock:
+            for name, loader in self._loaders.items():
+                if name not in self._preloaded:
+                    start = time.perf_counter()
+                    self._preloaded[name] = loader()
+                    self.timings[name] = {"loadSeconds": time.perf_counter() - start, "warmupSeconds": 0.0}
+
+    def load(self) -> Dict[str, Any]:
+        if self._models is not None:
+            return self._models
+        with self._lock:
+            if self._models is None:
+                models = {}
+                for name, loader in self._loaders.items():
+                    start = time.perf_counter()
+                    if name in self._preloaded:
+                        model = self._preloaded.pop(name)
+                        load_seconds = self.timings[name]["loadSeconds"]
+                    else:
+                        model = loader()
+                        load_seconds = time.perf_counter() - start
+                    loaded = time.perf_counter()
+                    if self._warmup is not None:
+                        self._warmup(model)
+                        logger.info(f"Warmed up {name} in {time.perf_counter() - loaded:.3f}s")
+                    self.timings[name] = {
+                        "loadSeconds": load_seconds,
+                        "warmupSeconds": time.perf_counter() - loaded,
+                    }
+                    models[name] = self._wrap(name, model) if self._wrap else model
+                self._models = models
+        return self._models
+
+    def loaded_models(self) -> List[Any]:
+        """Models loaded so far, without loading any"""
+        return list(self._models.values()) if self._models is not None else []
+
+    def __getitem__(self, name: str) -> Any:
+        return self.load()[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._loaders
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def __len__(self) -> int:
+        return len(self._loaders)
@@ -0,0 +1,140 @@
+"""Pre-fork server: load the models once, fork workers that share them.
+
+    python -m serving.prefork --workers 4 --host 0.0.0.0 --port 8000
+
+`uvicorn --workers N` spawns fresh interpreters, so every worker imports
+torch and reads both models again. Here the master imports the app, loads
+the torch weights and binds the socket, then forks. Workers inherit the
+weights copy-on-write (inference never writes to them, so the pages stay
+shared) and accept on the inherited socket. Each worker caps the threads
+of torch, OpenCV and the ONNX Runtime/OpenVINO sessions at WORKER_THREADS
+(by default the cores split across the workers), so N workers don't
+oversubscribe the box.
+
+ONNX Runtime and OpenVINO sessions own thread pools that don't survive a
+fork. With those backends the master only imports the runtime and each
+worker builds its own session; their weights are a fraction of torch's,
+and with MODEL_SNAPSHOT_DIR OpenVINO maps the same compiled blob for all
+workers. Workers that exit are replaced. Needs os.fork (Linux/macOS).
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+
+import cv2 as cv
+from loguru import logger
+
+import config
+
+
+def worker_threads(workers: int) -> int:
+    """Intra-op threads per worker"""
+    return config.WORKER_THREADS or max(1, (os.cpu_count() or 1) // workers)
+
+
+def pin_threads(threads: int) -> None:
+    """Cap the threads of everything in this process that runs parallel kernels"""
+    cv.setNumThreads(threads)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def prepare_master(threads: int):
+    """Import the app and load what the workers can share; returns the app"""
+    # read by init_models and the startup hook in every worker
+    config.INFERENCE_THREADS = threads
+    if "INCEPTION_WORKERS" not in os.environ:
+        config.INCEPTION_WORKERS = threads
+
+    import main as api
+
+    models = api.init_models()
+    if config.INFERENCE_BACKEND == "torch":
+        import torch
+        # keep the master off parallel kernels: an OpenMP pool started here
+        # would be inherited half-alive by the workers
+        torch.set_num_threads(1)
+        if not config.LAZY_MODEL_LOAD:
+            models.preload()
+            logger.info("Model weights loaded in the master, shared with the workers")
+    elif config.INFERENCE_BACKEND == "onnx":
+        import onnxruntime  # noqa: F401
+    api.app.state.models = models
+    return api.app
+
+
+def serve(host: str, port: int, workers: int) -> None:
+    import uvicorn
+
+    if not hasattr(os, "fork"):
+        raise RuntimeError("serving.prefork needs os.fork; use uvicorn --workers on this platform")
+
+    threads = worker_threads(workers)
+    app = prepare_master(threads)
+    uvicorn_config = uvicorn.Config(app, host=host, port=port)
+    sock = uvicorn_config.bind_socket()
+
+    children = {}
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                pin_threads(threads)
+                uvicorn.Server(uvicorn_config).run(sockets=[sock])
+            except BaseException:
+                logger.exception(f"Worker {index} failed")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = index
+        logger.info(f"Started worker {index} (pid {pid}, {threads} threads)")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        logger.warning(f"Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+        # don't spin if a worker dies on startup
+        time.sleep(1)
+        spawn(index)
+    sock.close()
+    logger.info("All workers stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork server sharing one copy of the model weights")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.SERVER_WORKERS)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
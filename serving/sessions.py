@@ -0,0 +1,127 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+
+def array_bytes(value: Any, _seen: Optional[set] = None) -> int:
+    """Bytes of the numpy arrays and encoded images in value, each array counted once.
+
+    Walks dicts, lists and tuples, and the input image of detection results
+    (orig_img); everything else is small next to the images and is ignored.
+    """
+    seen = set() if _seen is None else _seen
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(array_bytes(v, seen) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(array_bytes(v, seen) for v in value)
+    orig_img = getattr(value, "orig_img", None)
+    return array_bytes(orig_img, seen) if isinstance(orig_img, np.ndarray) else 0
+
+
+class SessionStore:
+    """Per-client state kept between requests, by session id.
+
+    In-process (lost on restart, not shared across pre-forked workers), so
+    callers must be able to rebuild a session they no longer find. Sessions
+    unused for ttl seconds expire; past max_sessions, or past max_bytes as
+    measured by sizeof when a value is put, the least recently used ones
+    are dropped.
+    """
+    def __init__(
+        self,
+        max_sessions: int,
+        ttl: float,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None
+    ):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, session_id: str):
+        _, _, size = self._sessions.pop(session_id)
+        self._bytes -= size
+
+    def _purge(self, now: float):
+        while self._sessions:
+            session_id, (_, used, _) = next(iter(self._sessions.items()))
+            if now - used < self.ttl:
+                break
+            self._drop(session_id)
+            self.evictions += 1
+
+    def create(self, value: Any) -> str:
+        session_id = str(uuid.uuid4())
+        self.put(session_id, value)
+        return session_id
+
+    def put(self, session_id: str, value: Any):
+        """Store or replace a session; a value larger than max_bytes is not kept"""
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            if session_id in self._sessions:
+                self._drop(session_id)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._sessions[session_id] = (value, now, size)
+            self._bytes += size
+            while len(self._sessions) > self.max_sessions or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._sessions)))
+                self.evictions += 1
+
+    def get(self, session_id: Optional[str]) -> Optional[Any]:
+        """The session's value, marked as used; None when unknown or expired"""
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            entry = self._sessions.get(session_id) if session_id else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._sessions[session_id] = (entry[0], now, entry[2])
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return entry[0]
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            self._drop(session_id)
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._purge(time.monotonic())
+            return {
+                "sessions": len(self._sessions),
+                "maxSessions": self.max_sessions,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+            }
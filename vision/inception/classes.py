@@ -1,5 +1,7 @@
 from uuid import uuid4
+from typing import Dict, List, Optional
 import math
+import numpy as np
 
 # def calc_attach(x_top_left, y_top_left, x_bottom_right, y_bottom_right, flag):
 #     center_x = (x_top_left + x_bottom_right) / 2
@@ -45,8 +47,63 @@ import math
 
     
 
+class IdTable:
+    """ Ids of one request's objects and endpoints.
+
+    Matching only compares and hashes ids, so they are small ints handed out
+    in order; the UUID string for an id is made the first time the JSON asks
+    for it and reused after that.
+    """
+    __slots__ = ("_next", "_uuids")
+
+    def __init__(self):
+        self._next = 0
+        self._uuids: Dict[int, str] = {}
+
+    def __len__(self):
+        return self._next
+
+    def new(self) -> int:
+        self._next += 1
+        return self._next - 1
+
+    def uuid(self, id) -> str:
+        """ UUID string of an id (strings from older callers pass through) """
+        if isinstance(id, str):
+            return id
+        name = self._uuids.get(id)
+        if name is None:
+            name = self._uuids[id] = str(uuid4())
+        return name
+
+def _new_id(ids: Optional[IdTable]):
+    """ Next int id of ids; objects made without a table (scripts, the old matchers) get a UUID string """
+    return ids.new() if ids is not None else str(uuid4())
+
+# Attachment flags, one bit each in the flags slot
+ATTACHED_LEFT = 1
+ATTACHED_RIGHT = 2
+ATTACHED_TO_COMPONENT_LEFT = 4
+ATTACHED_TO_COMPONENT_RIGHT = 8
+ATTACHED_TO_FREENODE_LEFT = 16
+ATTACHED_TO_FREENODE_RIGHT = 32
+
+def _flag(bit):
+    def getter(self):
+        return bool(self.flags & bit)
+
+    def setter(self, value):
+        if value:
+            self.flags |= bit
+        else:
+            self.flags &= ~bit
+
+    return property(getter, setter)
+
 # Base Class
 class Comp:
+    __slots__ = ("uuid", "x_top_left", "y_top_left", "x_bottom_right", "y_bottom_right", "class_component")
+
     def __init__(self, component_uuid, x_top_left, y_top_left, x_bottom_right, y_bottom_right, class_component):
         self.uuid = component_uuid
         self.x_top_left = x_top_left
@@ -86,18 +143,21 @@ class Comp:
 
 # Component class inheriting from Base Component, with endpoints
 class Component(Comp):
-    def __init__(self, uuid, x_top_left, y_top_left, x_bottom_right, y_bottom_right, type):
+    __slots__ = ("type", "uuid_endpoint_left", "uuid_endpoint_right", "flags")
+
+    def __init__(self, uuid, x_top_left, y_top_left, x_bottom_right, y_bottom_right, type, ids: Optional[IdTable] = None):
         # Call parent constructor with type as class_component
         super().__init__(uuid, x_top_left, y_top_left, x_bottom_right, y_bottom_right, type)
         self.type = type  # Keep type separately for the Component class
-        self.uuid_endpoint_left = str(uuid4())
-        self.uuid_endpoint_right = str(uuid4())
-        
-        # Attachment flags
-        self.is_attached_left = False
-        self.is_attached_right = False
-        self.is_attached_to_component_left = False
-        self.is_attached_to_component_right = False
+        self.uuid_endpoint_left = _new_id(ids)
+        self.uuid_endpoint_right = _new_id(ids)
+        self.flags = 0
+
+    # Attachment flags
+    is_attached_left = _flag(ATTACHED_LEFT)
+    is_attached_right = _flag(ATTACHED_RIGHT)
+    is_attached_to_component_left = _flag(ATTACHED_TO_COMPONENT_LEFT)
+    is_attached_to_component_right = _flag(ATTACHED_TO_COMPONENT_RIGHT)
 
     # Explicitly add get_area method to ensure it's available
     def get_area(self):
@@ -108,6 +168,8 @@ class Component(Comp):
 
 # Freenode class inheriting from Base Component with dynamic endpoints
 class FreeNode(Comp):
+    __slots__ = ("endpoints_uuid",)
+
     def __init__(self, component_uuid, x_top_left, y_top_left, x_bottom_right, y_bottom_right, class_name="junction", endpoints=None):
         # Call the parent class constructor (Subcomponent)
         super().__init__(component_uuid, x_top_left, y_top_left, x_bottom_right, y_bottom_right, class_name)
@@ -121,7 +183,7 @@ class FreeNode(Comp):
 
     
     def __repr__(self):
-        return f"Freenode({self.uuid}, {self.class_component}, {len(self.endpoints)} endpoints)"
+        return f"Freenode({self.uuid}, {self.class_component}, {len(self.endpoints_uuid)} endpoints)"
 
     # def attach_endpoint(self, endpoint_index):
     #     """ Attach a given endpoint by index """
@@ -139,7 +201,7 @@ class FreeNode(Comp):
     
     def get_endpoints(self):
         """ Return all UUIDs of the endpoints """
-        return self.endpoints
+        return self.endpoints_uuid
         
     # def get_area(self):
     #     return (self.x_bottom_right - self.x_top_left) * (self.y_bottom_right - self.y_top_left)
@@ -165,23 +227,115 @@ class FreeNode(Comp):
     #     # The minimum distance to the component is the Euclidean distance
     #     return math.sqrt(dist_x ** 2 + dist_y ** 2) 
 
+# Columnar layout of the wire detections, one row per wire
+WIRE_DTYPE = np.dtype([
+    ("angle", np.float64),
+    ("x_top_left", np.float64),
+    ("y_top_left", np.float64),
+    ("x_bottom_right", np.float64),
+    ("y_bottom_right", np.float64),
+    ("radius", np.float64),
+    ("x_left", np.float64),
+    ("y_left", np.float64),
+    ("x_right", np.float64),
+    ("y_right", np.float64),
+])
+
+_GEOMETRY_FIELDS = ("angle", "x_top_left", "y_top_left", "x_bottom_right", "y_bottom_right")
+
+class WireBatch:
+    """ Every wire's box, angle and endpoints in one structured array.
+
+    Iterating yields (angle, x1, y1, x2, y2) tuples, so a batch can be passed
+    anywhere a plain data_wire list is expected.
+    """
+    def __init__(self, data_wire):
+        self.data = np.zeros(len(data_wire), dtype=WIRE_DTYPE)
+        if len(data_wire):
+            geometry = np.asarray([tuple(w[:5]) for w in data_wire], dtype=np.float64)
+            for i, name in enumerate(_GEOMETRY_FIELDS):
+                self.data[name] = geometry[:, i]
+        self.compute_endpoints()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data[list(_GEOMETRY_FIELDS)].tolist())
+
+    def compute_endpoints(self, index=slice(None)):
+        """ Vectorized get_endpoint_left/right for the selected rows """
+        d = self.data
+        width = np.abs(d["x_bottom_right"][index] - d["x_top_left"][index]) / 2
+        height = np.abs(d["y_bottom_right"][index] - d["y_top_left"][index]) / 2
+        radius = np.sqrt(width**2 + height**2)
+
+        center_x = (d["x_top_left"][index] + d["x_bottom_right"][index]) / 2
+        center_y = (d["y_top_left"][index] + d["y_bottom_right"][index]) / 2
+        angle_rad = np.radians(d["angle"][index])
+        dx = radius * np.cos(angle_rad)
+        dy = radius * np.sin(angle_rad)
+
+        d["radius"][index] = radius
+        d["x_left"][index] = center_x - dx
+        d["y_left"][index] = center_y - dy
+        d["x_right"][index] = center_x + dx
+        d["y_right"][index] = center_y + dy
+
+    def endpoints(self):
+        """ (x_left, y_left, x_right, y_right) as plain float lists """
+        d = self.data
+        return d["x_left"].tolist(), d["y_left"].tolist(), d["x_right"].tolist(), d["y_right"].tolist()
+
+    def wires(self, ids: Optional[IdTable] = None) -> List["Wire"]:
+        """ Per-object views over the rows of this batch """
+        return [Wire.from_batch(self, row, ids) for row in range(len(self.data))]
+
+
+def _batch_field(name):
+    def getter(self):
+        return float(self._batch.data[name][self._row])
+
+    def setter(self, value):
+        self._batch.data[name][self._row] = value
+        self._batch.compute_endpoints(slice(self._row, self._row + 1))
+
+    return property(getter, setter)
+
 class Wire:
-    def __init__(self, angle, x_top_left, y_top_left, x_bottom_right, y_bottom_right):
-        self.uuid = str(uuid4())
-        self.angle = angle
-        self.x_top_left = x_top_left
-        self.y_top_left = y_top_left
-        self.x_bottom_right = x_bottom_right
-        self.y_bottom_right = y_bottom_right
-        self.uuid_endpoint_left = str(uuid4())
-        self.uuid_endpoint_right = str(uuid4())
-        self.is_attached_left = False
-        self.is_attached_right = False
-        self.is_attached_to_component_left = False
-        self.is_attached_to_component_right = False
-        self.is_attached_to_freenode_left = False # True if attached to a freenode and left endpoint of wire
-        self.is_attached_to_freenode_right = False # True if attached to a freenode and right endpoint of wire
-        
+    """ Thin view over one row of a WireBatch """
+    __slots__ = ("_batch", "_row", "uuid", "uuid_endpoint_left", "uuid_endpoint_right", "flags")
+
+    def __init__(self, angle, x_top_left, y_top_left, x_bottom_right, y_bottom_right, ids: Optional[IdTable] = None):
+        batch = WireBatch([(angle, x_top_left, y_top_left, x_bottom_right, y_bottom_right)])
+        self._init_view(batch, 0, ids)
+
+    @classmethod
+    def from_batch(cls, batch: WireBatch, row: int, ids: Optional[IdTable] = None) -> "Wire":
+        wire = cls.__new__(cls)
+        wire._init_view(batch, row, ids)
+        return wire
+
+    def _init_view(self, batch, row, ids):
+        self._batch = batch
+        self._row = row
+        self.uuid = _new_id(ids)
+        self.uuid_endpoint_left = _new_id(ids)
+        self.uuid_endpoint_right = _new_id(ids)
+        self.flags = 0
+
+    is_attached_left = _flag(ATTACHED_LEFT)
+    is_attached_right = _flag(ATTACHED_RIGHT)
+    is_attached_to_component_left = _flag(ATTACHED_TO_COMPONENT_LEFT)
+    is_attached_to_component_right = _flag(ATTACHED_TO_COMPONENT_RIGHT)
+    is_attached_to_freenode_left = _flag(ATTACHED_TO_FREENODE_LEFT) # attached to a freenode at the left endpoint
+    is_attached_to_freenode_right = _flag(ATTACHED_TO_FREENODE_RIGHT) # attached to a freenode at the right endpoint
+
+    angle = _batch_field("angle")
+    x_top_left = _batch_field("x_top_left")
+    y_top_left = _batch_field("y_top_left")
+    x_bottom_right = _batch_field("x_bottom_right")
+    y_bottom_right = _batch_field("y_bottom_right")
 
     def is_longest_side(self):
         width = abs(self.x_bottom_right - self.x_top_left)
@@ -196,41 +350,17 @@ class Wire:
 
     # Calculate the diagonal length (hypotenuse) of the bounding box
     def get_diagonal_radius(self):
-        width = abs(self.x_bottom_right - self.x_top_left) / 2
-        height = abs(self.y_bottom_right - self.y_top_left) / 2
-        return math.sqrt(width**2 + height**2)
+        return float(self._batch.data["radius"][self._row])
 
-    # Calculate the left endpoint based on the hypotenuse adjustment
+    # Left endpoint based on the hypotenuse adjustment (precomputed by the batch)
     def get_endpoint_left(self):
-        center_x = (self.x_top_left + self.x_bottom_right) / 2
-        center_y = (self.y_top_left + self.y_bottom_right) / 2
-        radius = self.get_diagonal_radius()
+        row = self._batch.data[self._row]
+        return (self.uuid_endpoint_left, float(row["x_left"]), float(row["y_left"]))
 
-        angle_rad = math.radians(self.angle)
-        cos_angle = math.cos(angle_rad)
-        sin_angle = math.sin(angle_rad)
-
-        # Adjust left endpoint based on the hypotenuse
-        x_left = center_x - radius * cos_angle
-        y_left = center_y - radius * sin_angle
-
-        return (self.uuid_endpoint_left, x_left, y_left)
-
-    # Calculate the right endpoint based on the hypotenuse adjustment
+    # Right endpoint based on the hypotenuse adjustment (precomputed by the batch)
     def get_endpoint_right(self):
-        center_x = (self.x_top_left + self.x_bottom_right) / 2
-        center_y = (self.y_top_left + self.y_bottom_right) / 2
-        radius = self.get_diagonal_radius()
-
-        angle_rad = math.radians(self.angle)
-        cos_angle = math.cos(angle_rad)
-        sin_angle = math.sin(angle_rad)
-
-        # Adjust right endpoint based on the hypotenuse
-        x_right = center_x + radius * cos_angle
-        y_right = center_y + radius * sin_angle
-
-        return (self.uuid_endpoint_right, x_right, y_right)
+        row = self._batch.data[self._row]
+        return (self.uuid_endpoint_right, float(row["x_right"]), float(row["y_right"]))
 
     def __str__(self):
         return f"Wire at ({self.x_top_left}, {self.y_top_left}) to ({self.x_bottom_right}, {self.y_bottom_right}) of angle {self.angle}"
\ No newline at end of file
@@ -0,0 +1,110 @@
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+from vision.inception.spatial import EndpointIndex
+
+Point = Tuple[float, float]
+
+# Inception's joining passes, and the nearest endpoints each one may join
+JOIN_PASSES = 5
+MAX_CONNECTIONS = 3
+
+class DisjointSet:
+    """Union-find over the endpoints 0..n-1, with each cluster's centroid.
+
+    Path compression plus union by rank keep find() near constant, and
+    find() is iterative, so long wire chains can't hit the recursion
+    limit. Every root also holds the size and coordinate sums of its
+    cluster, merged on union, so a cluster's centroid is ready once its
+    last union is done instead of needing a walk over its members.
+    """
+    __slots__ = ("parent", "rank", "size", "sum_x", "sum_y")
+
+    def __init__(self, positions: Sequence[Point]):
+        n = len(positions)
+        self.parent: List[int] = list(range(n))
+        self.rank: List[int] = [0] * n
+        self.size: List[int] = [1] * n
+        self.sum_x: List[float] = [p[0] for p in positions]
+        self.sum_y: List[float] = [p[1] for p in positions]
+
+    def __len__(self):
+        return len(self.parent)
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def union(self, a: int, b: int) -> int:
+        """Merge the clusters of a and b; returns the root of the merged cluster"""
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.rank[a] < self.rank[b]:
+            a, b = b, a
+        self.parent[b] = a
+        if self.rank[a] == self.rank[b]:
+            self.rank[a] += 1
+        self.size[a] += self.size[b]
+        self.sum_x[a] += self.sum_x[b]
+        self.sum_y[a] += self.sum_y[b]
+        return a
+
+    def centroid(self, i: int) -> Point:
+        root = self.find(i)
+        return (self.sum_x[root] / self.size[root], self.sum_y[root] / self.size[root])
+
+    def cluster_size(self, i: int) -> int:
+        return self.size[self.find(i)]
+
+
+def join_endpoints(
+    nodes: Dict[Hashable, Point],
+    belongs: Dict[Hashable, Hashable],
+    radius: float,
+    passes: int = JOIN_PASSES,
+    max_connections: int = MAX_CONNECTIONS
+) -> Dict[Hashable, Hashable]:
+    """Inception's endpoint joining: the node label of every endpoint.
+
+    Each pass unions every endpoint with its max_connections nearest
+    endpoints of other elements (belongs maps endpoint -> element) closer
+    than radius, then collapses each cluster to its centroid. nodes holds
+    the endpoint positions and is left with the collapsed ones. A label is
+    an endpoint key, carried through the passes: endpoints with the same
+    label are one node.
+    """
+    index = EndpointIndex(radius)
+    for k, p in nodes.items():
+        index.insert(k, p)
+
+    # Endpoints by dense index for the union-find
+    keys = list(nodes)
+    slot = {k: i for i, k in enumerate(keys)}
+    labels = {k: k for k in keys}
+
+    for _ in range(passes):
+        clusters = DisjointSet([nodes[k] for k in keys])
+        for i, k1 in enumerate(keys):
+            # N closest points of other elements within the threshold
+            owner = belongs[k1]
+            distSort = index.nearest(nodes[k1], radius, max_connections, exclude=lambda k2: belongs[k2] == owner)
+            for dist, k2 in distSort:
+                clusters.union(i, slot[k2])
+
+        # Collapse every cluster to its centroid, labelled by its root
+        parents = {}
+        for i, k in enumerate(keys):
+            root = clusters.find(i)
+            parents[k] = keys[root]
+            if clusters.size[root] > 1:
+                nodes[k] = clusters.centroid(root)
+                index.move(k, nodes[k])
+
+        for k in keys:
+            labels[k] = parents[labels[k]]
+    return labels
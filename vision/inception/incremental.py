@@ -0,0 +1,242 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from vision.inception.classes import Component, IdTable, WireBatch
+from vision.inception.connectivity import join_endpoints
+from vision.inception.spatial import EndpointIndex
+from vision.json.new_json import componentJSON, wiresJSON
+
+Point = Tuple[float, float]
+Box = Tuple[float, float, float, float]
+WireGeometry = Tuple[float, float, float, float, float]
+
+# Device classes without terminals of their own (inception makes junctions itself)
+NO_TERMINALS = ("junction", "text")
+# Rings of neighbours, each a joining radius plus the whole nodes it reaches,
+# re-joined around an edit
+NEIGHBOURHOOD_RINGS = 2
+
+
+class IncrementalCircuit:
+    """Inception's connectivity for one circuit, kept between edits.
+
+    Holds every device terminal and wire endpoint at its detected position
+    in an EndpointIndex, and the node each one was joined into. An edit
+    (devices or wires added, moved, deleted) re-joins only the endpoints
+    near the changed ones: everything within NEIGHBOURHOOD_RINGS joining
+    radii, grown to whole nodes, goes through the same passes as inception
+    and the rest of the circuit keeps its nodes. Node and junction ids stay
+    the same wherever a node survives the edit.
+
+    The joining radius is fixed when the circuit is built (inception's
+    10 x average device area), so an edit never moves anything far from it.
+    """
+    def __init__(
+        self,
+        devices: Iterable[Tuple[str, str, Box]],
+        wires: Iterable[Tuple[str, WireGeometry]],
+        radius: Optional[float] = None
+    ):
+        self.ids = IdTable()
+        self.devices: Dict[str, Tuple[str, Box]] = {}
+        self.wires: Dict[str, WireGeometry] = {}
+        # endpoint keys are ints in creation order, like inception's ids
+        self.endpoints: Dict[str, Tuple[int, int]] = {}
+        self.owner: Dict[int, str] = {}
+        self.positions: Dict[int, Point] = {}
+        self.node_of: Dict[int, int] = {}
+        self.members: Dict[int, Set[int]] = {}
+        # node -> (junction id, position), for nodes with a free wire end
+        self.junctions: Dict[int, Tuple[int, Point]] = {}
+
+        devices, wires = list(devices), list(wires)
+        self.radius = radius if radius is not None else self.joining_radius(
+            [box for _, kind, box in devices if kind not in NO_TERMINALS]
+        )
+        self.index = EndpointIndex(self.radius)
+        self._add(devices, wires)
+        self._rejoin(set(self.positions))
+
+    @staticmethod
+    def joining_radius(boxes: List[Box]) -> float:
+        """inception's min_dist: 10 x the average device area"""
+        if not boxes:
+            return 0.0
+        return 10 * sum(abs(x2 - x1) * abs(y2 - y1) for x1, y1, x2, y2 in boxes) / len(boxes)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _add(self, devices, wires) -> List[int]:
+        keys = []
+        for device_id, kind, box in devices:
+            if kind in NO_TERMINALS:
+                continue
+            x1, y1, x2, y2 = box
+            self.devices[device_id] = (kind, tuple(box))
+            keys += self._place(device_id, ((x1, (y1 + y2) / 2), (x2, (y1 + y2) / 2)))
+        if wires:
+            x_left, y_left, x_right, y_right = WireBatch([w for _, w in wires]).endpoints()
+            for i, (wire_id, wire) in enumerate(wires):
+                self.wires[wire_id] = tuple(wire)
+                keys += self._place(wire_id, ((x_left[i], y_left[i]), (x_right[i], y_right[i])))
+        return keys
+
+    def _place(self, element_id: str, points: Tuple[Point, Point]) -> Tuple[int, int]:
+        keys = self.endpoints.get(element_id)
+        if keys is None:
+            keys = self.endpoints[element_id] = (self.ids.new(), self.ids.new())
+        for key, point in zip(keys, points):
+            self.owner[key] = element_id
+            self.positions[key] = point
+            self.index.insert(key, point)
+        return keys
+
+    def _remove(self, element_id: str) -> List[Point]:
+        """Drop an element's endpoints; returns where they were"""
+        old = []
+        for key in self.endpoints.pop(element_id):
+            old.append(self.positions.pop(key))
+            self.index.remove(key)
+            del self.owner[key]
+            node = self.node_of.pop(key, None)
+            if node is not None:
+                self.members[node].discard(key)
+        self.devices.pop(element_id, None)
+        self.wires.pop(element_id, None)
+        return old
+
+    def edit(
+        self,
+        added_devices: Iterable[Tuple[str, str, Box]] = (),
+        added_wires: Iterable[Tuple[str, WireGeometry]] = (),
+        moved_devices: Iterable[Tuple[str, Box]] = (),
+        moved_wires: Iterable[Tuple[str, WireGeometry]] = (),
+        deleted: Iterable[str] = ()
+    ) -> int:
+        """Apply one diff and re-join around it; returns how many endpoints were re-joined.
+
+        Raises ValueError, before changing anything, for an added id that
+        exists or a moved or deleted id that doesn't. Added devices without
+        terminals (junctions, text) are ignored, as inception ignores them.
+        """
+        added_devices, added_wires = list(added_devices), list(added_wires)
+        moved_devices, moved_wires, deleted = list(moved_devices), list(moved_wires), list(deleted)
+        added = [d[0] for d in added_devices] + [w[0] for w in added_wires]
+        named = added + [d for d, _ in moved_devices] + [w for w, _ in moved_wires] + deleted
+        if len(set(named)) < len(named):
+            raise ValueError("An element can only appear once in an edit")
+        for element_id in added:
+            if element_id in self.endpoints:
+                raise ValueError(f"Element {element_id} already exists")
+        for element_id, known in [(d, self.devices) for d, _ in moved_devices] + \
+                [(w, self.wires) for w, _ in moved_wires] + [(e, self.endpoints) for e in deleted]:
+            if element_id not in known:
+                raise ValueError(f"Unknown element {element_id}")
+
+        seeds: List[Point] = []
+        touched: Set[int] = set()
+        for element_id in deleted:
+            touched |= {self.node_of[key] for key in self.endpoints[element_id]}
+            seeds += self._remove(element_id)
+        moved = [(d, self.devices[d][0], box) for d, box in moved_devices]
+        for element_id in [d for d, _, _ in moved] + [w for w, _ in moved_wires]:
+            touched |= {self.node_of[key] for key in self.endpoints[element_id]}
+            for key in self.endpoints[element_id]:
+                seeds.append(self.positions[key])
+                self.members[self.node_of.pop(key)].discard(key)
+        for node in touched:
+            if not self.members[node]:
+                del self.members[node]
+                self.junctions.pop(node, None)
+        touched &= self.members.keys()
+        changed = self._add(added_devices + moved, added_wires + moved_wires)
+        if self.radius == 0 and self.devices:
+            # the first devices of a circuit that had none set the radius
+            self.radius = self.joining_radius([box for _, box in self.devices.values()])
+            self.index = EndpointIndex(self.radius)
+            for key, point in self.positions.items():
+                self.index.insert(key, point)
+            return self._rejoin(set(self.positions))
+
+        region = set(changed)
+        for node in touched:
+            region |= self.members[node]
+        seeds += [self.positions[key] for key in region]
+        for _ in range(NEIGHBOURHOOD_RINGS):
+            near = {key for point in seeds for _, key in self.index.query(point, self.radius)} - region
+            near |= {m for key in near for m in self.members[self.node_of[key]]}
+            near -= region
+            region |= near
+            seeds = [self.positions[key] for key in near]
+        return self._rejoin(region)
+
+    def _rejoin(self, region: Set[int]) -> int:
+        """Run inception's joining over region, which must hold whole nodes"""
+        old_nodes = {self.node_of[key] for key in region if key in self.node_of}
+        # the positions in creation order, as a full run would see them
+        nodes = {key: self.positions[key] for key in sorted(region)}
+        labels = join_endpoints(nodes, self.owner, self.radius)
+        groups: Dict[int, List[int]] = {}
+        for key in nodes:
+            groups.setdefault(labels[key], []).append(key)
+
+        # a new node takes the id of the old node most of it came from
+        claims = sorted(
+            ((-count, min(members), label, node)
+             for label, members in groups.items()
+             for node, count in Counter(self.node_of.get(key) for key in members).items() if node is not None),
+        )
+        names, taken = {}, set()
+        for _, _, label, node in claims:
+            if label not in names and node not in taken:
+                names[label] = node
+                taken.add(node)
+        for node in old_nodes - taken:
+            del self.members[node]
+            self.junctions.pop(node, None)
+
+        for label, members in groups.items():
+            node = names.get(label)
+            if node is None:
+                node = self.ids.new()
+            self.members[node] = set(members)
+            for key in members:
+                self.node_of[key] = node
+            # a wire end with no device terminal in reach gets a junction
+            free = any(
+                self.owner[key] in self.wires and not any(
+                    self.owner[k] in self.devices for _, k in self.index.query(self.positions[key], self.radius)
+                )
+                for key in members
+            )
+            if free:
+                junction = self.junctions.get(node)
+                self.junctions[node] = (junction[0] if junction else self.ids.new(), nodes[label])
+            else:
+                self.junctions.pop(node, None)
+        return len(region)
+
+    def to_json(self) -> Dict[str, list]:
+        """The devices/wires JSON of connect_circuit, with the ids of the edits"""
+        scratch = IdTable()
+        devices = []
+        for device_id, (kind, (x1, y1, x2, y2)) in self.devices.items():
+            device = Component(device_id, x1, y1, x2, y2, kind, scratch)
+            left, right = self.endpoints[device_id]
+            device.uuid_endpoint_left, device.uuid_endpoint_right = self.node_of[left], self.node_of[right]
+            devices.append(device)
+        for node, (junction_id, (x, y)) in self.junctions.items():
+            junction = Component(junction_id, x, y, x, y, "junction", scratch)
+            junction.uuid_endpoint_left = junction.uuid_endpoint_right = node
+            devices.append(junction)
+
+        wires = WireBatch(list(self.wires.values())).wires(scratch)
+        for wire, wire_id in zip(wires, self.wires):
+            left, right = self.endpoints[wire_id]
+            wire.uuid = wire_id
+            wire.uuid_endpoint_left, wire.uuid_endpoint_right = self.node_of[left], self.node_of[right]
+        return {
+            "wires": wiresJSON(wires, self.ids),
+            "devices": componentJSON(devices, [], self.ids),
+        }
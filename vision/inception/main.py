@@ -1,22 +1,30 @@
 import sys
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Union
 import math
 import uuid
 import json
 
 from loguru import logger
-from vision.inception.classes import Component, Wire, FreeNode
+from vision.inception.classes import Component, Wire, FreeNode, WireBatch, IdTable
 from vision.inception.calculations import calculate_avg_component_area
+from vision.inception.connectivity import join_endpoints
+from vision.inception.spatial import EndpointIndex
 from vision.inception.temp import match_wire_device_points, match_wire_points, conversion_to_freenodes
 from vision.class_map import get_class_mapping
 
 def classInitialisation(
     data_device: Dict[str, Tuple[float, float, float, float]],
-    data_wire: Dict[str, Tuple[float, float, float, float, float]],
+    data_wire: Union[List[Tuple[float, float, float, float, float]], WireBatch],
     image_size: List[Tuple[str, str]],
-    classes: List[str]
+    classes: List[str],
+    ids: IdTable = None
 ) -> Tuple[List[Component], List[Wire], List[FreeNode]]:
-    """ Initialize the classes and the data. """
+    """ Initialize the classes and the data.
+
+    Objects and endpoints get int ids from ids (one table per request, a
+    new one when none is passed); the JSON turns them into UUID strings.
+    """
+    ids = IdTable() if ids is None else ids
 
     device_list = []
     wire_list = []
@@ -29,29 +37,30 @@ def classInitialisation(
             print("Found a free node")
             x_top_left, y_top_left, x_bottom_right, y_bottom_right = data_device[device]
             
-            freenode_uuid = str(uuid.uuid4())
+            freenode_uuid = ids.new()
             freenode = FreeNode(freenode_uuid, x_top_left, y_top_left, x_bottom_right, y_bottom_right)
             freenode_list.append(freenode)
             continue
 
         # normal devices
-        device_uuid = str(uuid.uuid4())
+        device_uuid = ids.new()
         x_top_left, y_top_left, x_bottom_right, y_bottom_right = data_device[device]
-        device = Component(device_uuid, x_top_left, y_top_left, x_bottom_right, y_bottom_right, classes[i])
+        device = Component(device_uuid, x_top_left, y_top_left, x_bottom_right, y_bottom_right, classes[i], ids)
         device_list.append(device)
     
-    for wire in data_wire:
-        angle, x_top_left, y_top_left, x_bottom_right, y_bottom_right = wire[0], wire[1], wire[2], wire[3], wire[4]
-        wire = Wire(angle, x_top_left, y_top_left, x_bottom_right, y_bottom_right)
-        wire_list.append(wire)
+    # wires are views over one columnar batch with precomputed endpoints
+    if not isinstance(data_wire, WireBatch):
+        data_wire = WireBatch(data_wire)
+    wire_list = data_wire.wires(ids)
     
     return device_list, wire_list, freenode_list
 
-def inceptionFunction(data_device, data_wire, image_size, classes):
-    # based on the len of data_wire
-    wire_uuid = [(str(uuid.uuid4()), str(uuid.uuid4())) for _ in range(len(data_wire))] 
-
-    devices, wires, freenodes = classInitialisation(data_device, data_wire, image_size, classes)
+def inceptionFunction(data_device, data_wire, image_size, classes, ids=None):
+    # pass ids to build the JSON of the result, componentJSON and wiresJSON need the same table
+    ids = IdTable() if ids is None else ids
+    wire_batch = data_wire if isinstance(data_wire, WireBatch) else WireBatch(data_wire)
+    devices, wires, freenodes = classInitialisation(data_device, wire_batch, image_size, classes, ids)
+    wire_endpoints = list(zip(*wire_batch.endpoints()))
     avg_area = calculate_avg_component_area(devices, image_size)
 
     nodes = {} 
@@ -67,104 +76,26 @@ def inceptionFunction(data_device, data_wire, image_size, classes):
         belongs[node1_uuid] = d.uuid
         belongs[node2_uuid] = d.uuid
 
-    for w in wires:
-        left = w.get_endpoint_left()
-        right = w.get_endpoint_right()
-        nodes[left[0]] = left[1:]
-        nodes[right[0]] = right[1:]
-        belongs[left[0]] = w.uuid
-        belongs[right[0]] = w.uuid
-
-    iters = 5
-    while(iters > 0):
-        iters-=1
-
-        # Use half of the average component area for joining threshold
-        min_dist = 10 * avg_area  # Changed from 1.5 to 0.5
-        logger.debug(f"Using joining threshold of {min_dist} (half of average component area: {avg_area})")
-        
-        # parents = {k: k for k in nodes.keys()}
-        parents = {}
-        for k in nodes.keys():
-            parents[k] = k
-        
-        # Graph variable
-        graph = {}
-        print("got nodes")
-        def calculate_distance(p1: Tuple[float, float], p2: Tuple[float, float]) -> float:
-            """Calculate Euclidean distance between two points."""
-            return math.sqrt((p2[0] - p1[0])**2 + (p2[1] - p1[1])**2)
-        # Union 
-        
-        for k1, p1 in nodes.items():
-            distSort = []
-            for k2, p2 in nodes.items():
-                if k1 == k2:
-                    continue
-                if(belongs[k1] == belongs[k2]): continue
-                d = calculate_distance(p1, p2)
-                # Add all close nodes, not just the closest one
-                if d < min_dist:
-                    distSort.append((d, k2))
-
-            # Sort by distance and take the N closest points
-            distSort.sort()
-            max_connections = 3  # Allow more connections per node
-            
-            for dist, k2 in distSort[:max_connections]:
-                if k1 not in graph:
-                    graph[k1] = [k2]
-                else:
-                    graph[k1].append(k2)
-                if k2 not in graph:
-                    graph[k2] = [k1]
-                else:
-                    graph[k2].append(k1)
-        
-        print("created graph")
-        
-        def dfs_visit(node, visited):
-            
-            for x in graph[node]:
-                if x not in visited:
-                    visited.add(x)
-                    dfs_visit(x, visited)
-            return visited
-        
-        visited = set()
-        for node in graph.keys():
-            if node not in visited:
-                visited.add(node)
-                tempVis = set()
-                
-                visited = dfs_visit(node, tempVis)
-            
-            avg = [0,0]
-            for v in tempVis:
-                avg[0] += nodes[v][0]
-                avg[1] += nodes[v][1]
-            
-            avg[0] /= len(tempVis)
-            avg[1] /= len(tempVis)
-
-            for v in tempVis:
-                parents[v] = node
-                visited.add(v)
-                nodes[v] = (avg[0], avg[1])
-        
-        print("done dfs")
-        for p in parents:
-            print(p, parents[p])
-            
-        for d in devices:
-            d.uuid_endpoint_left = parents[d.uuid_endpoint_left]
-            d.uuid_endpoint_right = parents[d.uuid_endpoint_right]
+    for w, (x_left, y_left, x_right, y_right) in zip(wires, wire_endpoints):
+        nodes[w.uuid_endpoint_left] = (x_left, y_left)
+        nodes[w.uuid_endpoint_right] = (x_right, y_right)
+        belongs[w.uuid_endpoint_left] = w.uuid
+        belongs[w.uuid_endpoint_right] = w.uuid
+
+    # Use half of the average component area for joining threshold
+    min_dist = 10 * avg_area  # Changed from 1.5 to 0.5
+    logger.debug(f"Using joining threshold of {min_dist} (half of average component area: {avg_area})")
+
+    # Collapses nodes to the cluster centroids as it goes
+    labels = join_endpoints(nodes, belongs, min_dist)
 
-        for w in wires:
-            w.uuid_endpoint_left = parents[w.uuid_endpoint_left]
-            w.uuid_endpoint_right = parents[w.uuid_endpoint_right]
+    for d in devices:
+        d.uuid_endpoint_left = labels[d.uuid_endpoint_left]
+        d.uuid_endpoint_right = labels[d.uuid_endpoint_right]
 
-        
+    for w in wires:
+        w.uuid_endpoint_left = labels[w.uuid_endpoint_left]
+        w.uuid_endpoint_right = labels[w.uuid_endpoint_right]
 
     # Modify junction detection logic
     junctions = set()
@@ -178,20 +109,15 @@ def inceptionFunction(data_device, data_wire, image_size, classes):
         nodePositions[d.uuid_endpoint_left] = (d.x_top_left, (d.y_top_left + d.y_bottom_right)/2)
         nodePositions[d.uuid_endpoint_right] = (d.x_bottom_right, (d.y_top_left + d.y_bottom_right)/2)
 
+    device_index = EndpointIndex(min_dist)
+    for device_node in deviceNodes:
+        device_index.insert(device_node, nodePositions[device_node])
+
     # Second pass: check wire endpoints
-    for w in wires:
-        left_pos = w.get_endpoint_left()
-        right_pos = w.get_endpoint_right()
-        
+    for w, (x_left, y_left, x_right, y_right) in zip(wires, wire_endpoints):
         # Check if wire endpoints are close to device nodes
-        left_close = False
-        right_close = False
-        
-        for device_node in deviceNodes:
-            if calculate_distance(left_pos[1:], nodePositions[device_node]) < min_dist:
-                left_close = True
-            if calculate_distance(right_pos[1:], nodePositions[device_node]) < min_dist:
-                right_close = True
+        left_close = device_index.any_within((x_left, y_left), min_dist)
+        right_close = device_index.any_within((x_right, y_right), min_dist)
                 
         if not left_close:
             junctions.add(w.uuid_endpoint_left)
@@ -199,9 +125,8 @@ def inceptionFunction(data_device, data_wire, image_size, classes):
             junctions.add(w.uuid_endpoint_right)
 
     # Create junction components
-    junc_uuid = [str(uuid.uuid4()) for _ in range(len(junctions))]
-    for i, j in enumerate(junctions):
-        temp = Component(junc_uuid[i], nodes[j][0], nodes[j][1], nodes[j][0], nodes[j][1], "junction")
+    for j in junctions:
+        temp = Component(ids.new(), nodes[j][0], nodes[j][1], nodes[j][0], nodes[j][1], "junction", ids)
         temp.uuid_endpoint_left = j
         temp.uuid_endpoint_right = j
         devices.append(temp)
@@ -0,0 +1,115 @@
+import math
+import heapq
+from bisect import insort
+from collections import defaultdict
+from typing import Dict, Hashable, List, Tuple, Callable, Optional
+
+Point = Tuple[float, float]
+
+class EndpointIndex:
+    """Uniform grid over endpoint coordinates for fixed-radius neighbour queries.
+
+    The cell size is the join radius, so every point closer than the radius
+    lives in the 3x3 block of cells around the query. Points can be moved in
+    place when clusters collapse to their centroid.
+
+    Within a cell, keys at the same position share one sorted list. Once a
+    cluster has collapsed, its members are all at one point, and a query
+    measures that point once instead of once per member.
+    """
+    def __init__(self, cell_size: float):
+        # a zero radius (no devices -> avg area 0) never joins anything
+        self.cell_size = cell_size if cell_size > 0 else 1.0
+        self.cells: Dict[Tuple[int, int], Dict[Point, List[Hashable]]] = defaultdict(dict)
+        self.positions: Dict[Hashable, Point] = {}
+
+    def _cell(self, pos: Point) -> Tuple[int, int]:
+        return (math.floor(pos[0] / self.cell_size), math.floor(pos[1] / self.cell_size))
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def _add(self, key: Hashable, pos: Point):
+        group = self.cells[self._cell(pos)].get(pos)
+        if group is None:
+            self.cells[self._cell(pos)][pos] = [key]
+        else:
+            insort(group, key)
+
+    def _discard(self, key: Hashable, pos: Point):
+        cell = self._cell(pos)
+        group = self.cells[cell][pos]
+        group.remove(key)
+        if not group:
+            del self.cells[cell][pos]
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def insert(self, key: Hashable, pos: Point):
+        if key in self.positions:
+            self.move(key, pos)
+            return
+        self.positions[key] = pos
+        self._add(key, pos)
+
+    def remove(self, key: Hashable):
+        self._discard(key, self.positions.pop(key))
+
+    def move(self, key: Hashable, pos: Point):
+        """Update the position of an indexed point in place"""
+        old = self.positions[key]
+        if old == pos:
+            return
+        self._discard(key, old)
+        self.positions[key] = pos
+        self._add(key, pos)
+
+    def _groups(self, pos: Point, radius: float):
+        """(distance, sorted keys) for every occupied position strictly closer than radius"""
+        if radius <= 0:
+            return
+        cx, cy = self._cell(pos)
+        # radius may exceed the cell size when the index is shared
+        reach = max(1, math.ceil(radius / self.cell_size))
+        x, y = pos
+        for gx in range(cx - reach, cx + reach + 1):
+            for gy in range(cy - reach, cy + reach + 1):
+                cell = self.cells.get((gx, gy))
+                if not cell:
+                    continue
+                for (px, py), keys in cell.items():
+                    d = math.sqrt((px - x)**2 + (py - y)**2)
+                    if d < radius:
+                        yield d, keys
+
+    def query(self, pos: Point, radius: float) -> List[Tuple[float, Hashable]]:
+        """All (distance, key) pairs strictly closer than radius, unsorted"""
+        return [(d, key) for d, keys in self._groups(pos, radius) for key in keys]
+
+    def nearest(
+        self,
+        pos: Point,
+        radius: float,
+        k: int,
+        exclude: Optional[Callable[[Hashable], bool]] = None
+    ) -> List[Tuple[float, Hashable]]:
+        """The k closest points within radius, sorted by (distance, key)"""
+        found = []
+        for d, keys in self._groups(pos, radius):
+            # keys at one position tie on distance, so only the k smallest
+            # that aren't excluded can make the cut
+            taken = 0
+            for key in keys:
+                if exclude is not None and exclude(key):
+                    continue
+                found.append((d, key))
+                taken += 1
+                if taken == k:
+                    break
+        return heapq.nsmallest(k, found)
+
+    def any_within(self, pos: Point, radius: float) -> bool:
+        return next(self._groups(pos, radius), None) is not None
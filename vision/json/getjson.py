@@ -4,7 +4,6 @@ import numpy as np
 import uuid
 
 # from vision.proces
-from vision.processing import extract_pred
 # from vision.processing import extract_pred
 from vision.class_map import get_class_mapping
 
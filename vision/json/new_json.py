@@ -6,10 +6,9 @@ from typing import List, Dict, Tuple
 
 
 # from vision.proces
-from vision.processing import extract_pred
 # from vision.processing import extract_pred
 from vision.class_map import get_class_mapping
-from vision.inception.classes import Component, Wire, FreeNode
+from vision.inception.classes import Component, Wire, FreeNode, IdTable
 
 def toJSON(data, classes, data_wire = None):
 
@@ -101,8 +100,10 @@ def toJSON(data, classes, data_wire = None):
     # return json.dumps(json_data, indent=4)
 
 # Component json
-def componentJSON(devices: List[Component], freeNodes: List[FreeNode]):
-    # components json
+def componentJSON(devices: List[Component], freeNodes: List[FreeNode], ids: IdTable = None):
+    # components json, the int ids of the objects become UUID strings here;
+    # pass the table the objects were made with, so node ids match wiresJSON's
+    ids = IdTable() if ids is None else ids
     devices_json = []
     devices_uuid = {}
     num_nodes = []
@@ -122,11 +123,11 @@ def componentJSON(devices: List[Component], freeNodes: List[FreeNode]):
             nodes = 2
         num_nodes.append(nodes)
 
-        deviceId = d.uuid
+        deviceId = ids.uuid(d.uuid)
         if nodes == 2:
-            node_uuids = [d.uuid_endpoint_left, d.uuid_endpoint_right]
+            node_uuids = [ids.uuid(d.uuid_endpoint_left), ids.uuid(d.uuid_endpoint_right)]
         elif nodes == 1:
-            node_uuids = [d.uuid_endpoint_left]
+            node_uuids = [ids.uuid(d.uuid_endpoint_left)]
 
         device = {
             "nodes": node_uuids,
@@ -148,7 +149,7 @@ def componentJSON(devices: List[Component], freeNodes: List[FreeNode]):
         x1, y1, x2, y2 = fn.x_top_left, fn.y_top_left, fn.x_bottom_right, fn.y_bottom_right
         freeNode = {
             "deviceId": str(uuid.uuid4()),
-            "nodes": [fn.uuid],
+            "nodes": [ids.uuid(fn.uuid)],
             "position": {
                 "x": ((fn.x_top_left+fn.x_bottom_right)/2),
                 "y": 0,
@@ -160,22 +161,21 @@ def componentJSON(devices: List[Component], freeNodes: List[FreeNode]):
     return devices_json
 
 # Wire json
-def wiresJSON(wires: List[Wire]):
+def wiresJSON(wires: List[Wire], ids: IdTable = None):
+    ids = IdTable() if ids is None else ids
     wire_json = []
     if wires is not None:
 
         for i, dw in enumerate(wires):
             
             # print(dw)
-            x1, y1, x2, y2 = dw.x_top_left, dw.y_top_left, dw.x_bottom_right, dw.y_bottom_right
-
-            node1, node2 = dw.uuid_endpoint_left, dw.uuid_endpoint_right
+            node1, node2 = ids.uuid(dw.uuid_endpoint_left), ids.uuid(dw.uuid_endpoint_right)
             wire_device = {
                 "nodes":[
                         node1,
                         node2
                     ],
-                "wireId": dw.uuid,
+                "wireId": ids.uuid(dw.uuid),
             }
 
             wire_json.append(wire_device)
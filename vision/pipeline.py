@@ -0,0 +1,38 @@
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, List, Optional, Tuple
+
+from vision.json.new_json import componentJSON, wiresJSON
+from vision.inception.classes import IdTable
+from vision.inception.main import inceptionFunction as inception
+
+# Post-inference stage shared by the routes: detections in, circuit JSON out.
+# Kept free of model/PIL imports so it can run in pool workers.
+def connect_circuit(
+    data_device: List[Tuple[float, float, float, float]],
+    classes: List[str],
+    data_wire: List[Tuple[float, float, float, float, float]],
+    image_size: Tuple[int, int],
+    stage: Optional[Callable[[str], ContextManager]] = None
+) -> Dict[str, list]:
+    """Run inception on one image's detections and build the devices/wires JSON.
+
+    stage, if given, is called with a stage name and must return a context
+    manager wrapping that stage (used for latency instrumentation).
+    """
+    stage = stage or (lambda name: nullcontext())
+
+    with stage("inception"):
+        # Devices that get nodes (not text), by index. Objects and endpoints
+        # get int ids from one table, the JSON turns them into UUIDs
+        ids = IdTable()
+        count = sum(1 for name in classes if name != "text")
+        data_device_dict = {i: data_device[i] for i in range(count)}
+
+        # Process final connections
+        devices, wires = inception(data_device_dict, data_wire, image_size, classes, ids)
+
+    with stage("json_build"):
+        return {
+            "wires": wiresJSON(wires, ids),
+            "devices": componentJSON(devices, [], ids)  # Empty list for freenodes
+        }
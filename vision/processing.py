@@ -1,4 +1,3 @@
-from ultralytics import YOLO
 import numpy as np
 
 # Prev Implementation of extract_pred
@@ -26,14 +25,16 @@ import numpy as np
 #     x2, y2 = x+w/2, y+h/2
 #     return x1, y1, x2, y2
 
-# Extracts the predictions from the image (coordinates and classes) 
-def extract_pred(image, model):
+# Only override the model's default confidence when one is given
+def _predict_kwargs(conf_threshold):
+    return {} if conf_threshold is None else {"conf": conf_threshold}
 
-    results = model(image)
-    boxes = results[0].boxes.xyxyn
+# Parses one YOLO result into (coordinates, classes, boxes for masking)
+def parse_component_result(result, names):
+    boxes = result.boxes.xyxyn
     
     # Box for masking(white)
-    component_boxes = results[0].boxes.xyxy.cpu().numpy()
+    component_boxes = result.boxes.xyxy.cpu().numpy()
 
     classes = []
     coords = []
@@ -44,12 +45,24 @@ def extract_pred(image, model):
         coords.append(coordinate)
         
     # classes
-    names = model.names
-    for result in results:
-        for c in result.boxes.cls:
-            classes.append(names[int(c)])
+    for c in result.boxes.cls:
+        classes.append(names[int(c)])
     
     return coords, classes, component_boxes
 
+# Extracts the predictions from the image (coordinates and classes) 
+def extract_pred(image, model, conf_threshold=None):
+
+    results = model(image, **_predict_kwargs(conf_threshold))
+    return parse_component_result(results[0], model.names)
+
+# Same as extract_pred for a list of images, in one forward pass per chunk
+def extract_pred_batch(images, model, batch_size=8, conf_threshold=None):
+    preds = []
+    for start in range(0, len(images), batch_size):
+        results = model(images[start:start + batch_size], **_predict_kwargs(conf_threshold))
+        preds.extend(parse_component_result(result, model.names) for result in results)
+    return preds
+
 if __name__ == "__main__":
     data = extract_pred(r"C:\Users\HP\Desktop\wire_images\AC-Voltage-Detector-Circuit.png")
\ No newline at end of file
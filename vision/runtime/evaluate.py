@@ -0,0 +1,183 @@
+import contextlib
+import io
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from vision.inception.main import inceptionFunction
+from vision.runtime import ops
+
+# Accuracy of one model against another (e.g. INT8 against FP32): detection
+# mAP with the reference predictions as ground truth, and whether inception
+# builds the same nets from both sets of detections.
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+
+def box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of xyxy boxes, (N, M)"""
+    lt = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    rb = np.minimum(boxes1[:, None, 2:4], boxes2[None, :, 2:4])
+    inter = np.clip(rb - lt, 0, None).prod(axis=2)
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    return inter / (area1[:, None] + area2[None] - inter + 1e-7)
+
+
+def detections(result) -> Dict[str, np.ndarray]:
+    """Boxes (xyxy, or xywhr for OBB), confidences and classes of one result"""
+    if result.obb is not None:
+        return {
+            "boxes": np.asarray(result.obb.xywhr.cpu().numpy(), dtype=np.float64),
+            "conf": np.asarray(result.obb.conf.cpu().numpy()),
+            "cls": np.asarray(result.obb.cls.cpu().numpy()).astype(int),
+            "rotated": True,
+        }
+    return {
+        "boxes": np.asarray(result.boxes.xyxy.cpu().numpy(), dtype=np.float64),
+        "conf": np.asarray(result.boxes.conf.cpu().numpy()),
+        "cls": np.asarray(result.boxes.cls.cpu().numpy()).astype(int),
+        "rotated": False,
+    }
+
+
+def match_predictions(pred: dict, ref: dict) -> np.ndarray:
+    """(n_pred, 10) true-positive flags at IoU 0.5:0.95, one reference box per prediction"""
+    correct = np.zeros((len(pred["cls"]), len(IOU_THRESHOLDS)), dtype=bool)
+    if not len(pred["cls"]) or not len(ref["cls"]):
+        return correct
+
+    if pred["rotated"]:
+        iou = ops.batch_probiou(ref["boxes"], pred["boxes"])
+    else:
+        iou = box_iou(ref["boxes"], pred["boxes"])
+    iou = iou * (ref["cls"][:, None] == pred["cls"][None])
+
+    for ti, threshold in enumerate(IOU_THRESHOLDS):
+        matches = np.array(np.nonzero(iou >= threshold)).T
+        if not len(matches):
+            continue
+        # highest IoU first, then each prediction and each reference used once
+        matches = matches[iou[matches[:, 0], matches[:, 1]].argsort()[::-1]]
+        matches = matches[np.unique(matches[:, 1], return_index=True)[1]]
+        matches = matches[np.unique(matches[:, 0], return_index=True)[1]]
+        correct[matches[:, 1], ti] = True
+    return correct
+
+
+def _average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """101-point interpolated AP (COCO)"""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    return float(_trapezoid(np.interp(x, mrec, mpre), x))
+
+
+def mean_average_precision(preds: List[dict], refs: List[dict]) -> Dict[str, float]:
+    """mAP50 and mAP50-95 of preds over a set of images, refs as ground truth"""
+    tp, conf, pred_cls, ref_cls = [], [], [], []
+    for pred, ref in zip(preds, refs):
+        tp.append(match_predictions(pred, ref))
+        conf.append(pred["conf"])
+        pred_cls.append(pred["cls"])
+        ref_cls.append(ref["cls"])
+    tp, conf = np.concatenate(tp), np.concatenate(conf)
+    pred_cls, ref_cls = np.concatenate(pred_cls), np.concatenate(ref_cls)
+
+    classes = np.unique(ref_cls)
+    if not len(classes):
+        return {"mAP50": float("nan"), "mAP50-95": float("nan"), "classes": 0}
+
+    order = np.argsort(-conf, kind="stable")
+    tp, pred_cls = tp[order], pred_cls[order]
+    ap = np.zeros((len(classes), len(IOU_THRESHOLDS)))
+    for ci, c in enumerate(classes):
+        is_c = pred_cls == c
+        n_ref = (ref_cls == c).sum()
+        if not is_c.any():
+            continue
+        tpc = tp[is_c].cumsum(axis=0)
+        fpc = (1 - tp[is_c]).cumsum(axis=0)
+        recall = tpc / (n_ref + 1e-16)
+        precision = tpc / (tpc + fpc)
+        for ti in range(len(IOU_THRESHOLDS)):
+            ap[ci, ti] = _average_precision(recall[:, ti], precision[:, ti])
+    return {"mAP50": float(ap[:, 0].mean()), "mAP50-95": float(ap.mean()), "classes": int(len(classes))}
+
+
+def circuit_nets(
+    data_device: List[Tuple[float, float, float, float]],
+    classes: List[str],
+    data_wire: List[Tuple[float, float, float, float, float]],
+    image_size: Tuple[int, int]
+) -> Dict[str, list]:
+    """Run inception and label each device terminal with the net it ends up on"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        devices, wires = inceptionFunction(
+            {str(i): box for i, box in enumerate(data_device)}, data_wire, image_size, classes
+        )
+
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for wire in wires:
+        parent[find(wire.uuid_endpoint_left)] = find(wire.uuid_endpoint_right)
+
+    return {
+        "boxes": [(d.x_top_left, d.y_top_left, d.x_bottom_right, d.y_bottom_right) for d in devices],
+        "classes": [d.type for d in devices],
+        "terminals": [(find(d.uuid_endpoint_left), find(d.uuid_endpoint_right)) for d in devices],
+    }
+
+
+def net_agreement(ref: Dict[str, list], test: Dict[str, list], iou_threshold: float = 0.5) -> Dict[str, float]:
+    """Compare two circuits' connectivity on the devices both of them found.
+
+    Devices are paired by class and box IoU. pairAgreement is the share of
+    terminal pairs that are connected in both or in neither; identical means
+    every device was paired and every pair agrees.
+    """
+    pairs = []
+    if ref["boxes"] and test["boxes"]:
+        iou = box_iou(np.array(ref["boxes"], dtype=np.float64), np.array(test["boxes"], dtype=np.float64))
+        same_class = np.array([[a == b for b in test["classes"]] for a in ref["classes"]])
+        iou = iou * same_class
+        used_ref, used_test = set(), set()
+        for flat in np.argsort(-iou, axis=None, kind="stable"):
+            i, j = np.unravel_index(flat, iou.shape)
+            if iou[i, j] < iou_threshold:
+                break
+            if i in used_ref or j in used_test:
+                continue
+            used_ref.add(i)
+            used_test.add(j)
+            pairs.append((i, j))
+
+    ref_nets = [ref["terminals"][i][k] for i, _ in pairs for k in (0, 1)]
+    test_nets = [test["terminals"][j][k] for _, j in pairs for k in (0, 1)]
+    n = len(ref_nets)
+    if n < 2:
+        agreement = 1.0
+    else:
+        ref_same = np.array(ref_nets, dtype=object)[:, None] == np.array(ref_nets, dtype=object)[None]
+        test_same = np.array(test_nets, dtype=object)[:, None] == np.array(test_nets, dtype=object)[None]
+        upper = np.triu_indices(n, k=1)
+        agreement = float((ref_same[upper] == test_same[upper]).mean())
+
+    all_paired = len(pairs) == len(ref["boxes"]) == len(test["boxes"])
+    return {
+        "matchedDevices": len(pairs),
+        "refDevices": len(ref["boxes"]),
+        "testDevices": len(test["boxes"]),
+        "pairAgreement": agreement,
+        "identical": bool(all_paired and agreement == 1.0),
+    }
@@ -0,0 +1,57 @@
+"""Export the component and wire detectors for the onnx/openvino backends.
+
+    python -m vision.runtime.export
+    python -m vision.runtime.export --component path/to/component.pt --wire path/to/wire.pt
+
+Needs ultralytics (and torch) once, at export time. Each .pt gets a .onnx
+next to it plus a .json with the task, class names and input size. The
+OpenVINO backend reads the same .onnx file.
+"""
+import argparse
+import json
+import os
+import shutil
+from typing import Optional
+
+import config
+
+
+def export_model(weights: str, imgsz: int = 640, output: Optional[str] = None, opset: Optional[int] = None) -> str:
+    """Export one model to ONNX with a dynamic batch axis; returns the .onnx path"""
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    # raw head output only: NMS and OBB decoding run in vision.runtime.ops
+    exported = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True, opset=opset)
+    if output and os.path.abspath(output) != os.path.abspath(exported):
+        shutil.move(exported, output)
+        exported = output
+
+    meta = {
+        "task": model.task,
+        "names": {int(k): v for k, v in model.names.items()},
+        "imgsz": imgsz,
+        "source": os.path.basename(weights),
+    }
+    with open(os.path.splitext(exported)[0] + ".json", "w") as file:
+        json.dump(meta, file, indent=2)
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export YOLO detectors to ONNX")
+    parser.add_argument("--component", default=config.COMPONENT_MODEL_PATH, help="component detector weights")
+    parser.add_argument("--wire", default=config.WIRE_MODEL_PATH, help="wire (OBB) detector weights")
+    parser.add_argument("--component-output", default=config.COMPONENT_ONNX_PATH)
+    parser.add_argument("--wire-output", default=config.WIRE_ONNX_PATH)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--opset", type=int, default=None)
+    args = parser.parse_args()
+
+    for weights, output in ((args.component, args.component_output), (args.wire, args.wire_output)):
+        exported = export_model(weights, args.imgsz, output, args.opset)
+        print(f"{weights} -> {exported}")
+
+
+if __name__ == "__main__":
+    main()
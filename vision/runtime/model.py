@@ -0,0 +1,294 @@
+import ast
+import json
+import os
+from typing import Dict, List, Optional
+
+import cv2 as cv
+import numpy as np
+from loguru import logger
+
+from vision.runtime import ops
+from vision.runtime.snapshot import snapshot_path
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+# ultralytics predict defaults
+DEFAULT_CONF = 0.25
+DEFAULT_IOU = 0.7
+DEFAULT_MAX_DET = 300
+
+
+class _Array(np.ndarray):
+    """ndarray with the .cpu()/.numpy() calls the parsers make on torch tensors"""
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.asarray(self)
+
+
+def _wrap(array: np.ndarray) -> _Array:
+    return np.ascontiguousarray(array, dtype=np.float32).view(_Array)
+
+
+class Boxes:
+    """Axis-aligned detections in the layout of ultralytics' Boxes"""
+    def __init__(self, data: np.ndarray, orig_shape):
+        h, w = orig_shape
+        self.data = _wrap(data)
+        self.xyxy = _wrap(data[:, :4])
+        self.xyxyn = _wrap(data[:, :4] / np.array([w, h, w, h], dtype=np.float32))
+        self.conf = _wrap(data[:, 4])
+        self.cls = _wrap(data[:, 5])
+
+    def __len__(self):
+        return len(self.data)
+
+
+class OBB:
+    """Rotated detections (xywhr, conf, cls) in the layout of ultralytics' OBB"""
+    def __init__(self, data: np.ndarray, orig_shape):
+        h, w = orig_shape
+        self.data = _wrap(data)
+        self.xywhr = _wrap(data[:, :5])
+        self.conf = _wrap(data[:, 5])
+        self.cls = _wrap(data[:, 6])
+        self.xyxyxyxy = _wrap(ops.xywhr2xyxyxyxy(data[:, :5]))
+        self.xyxyxyxyn = _wrap(self.xyxyxyxy / np.array([w, h], dtype=np.float32))
+
+    def __len__(self):
+        return len(self.data)
+
+
+# BGR colours for plot(), cycled by class id
+_PALETTE = [(56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+            (10, 249, 72), (23, 204, 146), (134, 219, 61), (211, 188, 0), (209, 119, 0)]
+
+
+class Results:
+    """One image's detections; exposes what the routes read from ultralytics Results"""
+    def __init__(self, orig_img: np.ndarray, names: Dict[int, str], boxes=None, obb=None):
+        self.orig_img = orig_img
+        self.orig_shape = orig_img.shape[:2]
+        self.names = names
+        self.boxes = Boxes(boxes, self.orig_shape) if boxes is not None else None
+        self.obb = OBB(obb, self.orig_shape) if obb is not None else None
+
+    def plot(self) -> np.ndarray:
+        """Annotated BGR copy of the input image"""
+        image = self.orig_img.copy()
+        thickness = max(round(sum(self.orig_shape) / 2 * 0.003), 2)
+        if self.obb is not None:
+            for corners, conf, cls in zip(self.obb.xyxyxyxy.numpy(), self.obb.conf.tolist(), self.obb.cls.tolist()):
+                color = _PALETTE[int(cls) % len(_PALETTE)]
+                cv.polylines(image, [corners.astype(np.int32)], True, color, thickness)
+        if self.boxes is not None:
+            for box, conf, cls in zip(self.boxes.xyxy.numpy(), self.boxes.conf.tolist(), self.boxes.cls.tolist()):
+                color = _PALETTE[int(cls) % len(_PALETTE)]
+                x1, y1, x2, y2 = map(int, box)
+                cv.rectangle(image, (x1, y1), (x2, y2), color, thickness)
+                cv.putText(image, f"{self.names[int(cls)]} {conf:.2f}", (x1, max(y1 - 4, 10)),
+                           cv.FONT_HERSHEY_SIMPLEX, thickness / 3, color, max(thickness - 1, 1))
+        return image
+
+
+class _OrtSession:
+    def __init__(self, path: str, threads: int):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.input_shape = self.session.get_inputs()[0].shape
+
+    def metadata(self) -> Dict[str, str]:
+        return self.session.get_modelmeta().custom_metadata_map
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class _OpenVinoSession:
+    def __init__(self, path: str, threads: int, cache_dir: str = ""):
+        try:
+            import openvino as ov
+        except ImportError:
+            raise ImportError("INFERENCE_BACKEND=openvino needs the openvino package (pip install openvino)")
+
+        core = ov.Core()
+        if cache_dir:
+            # compiling from the path lets a cache hit skip reading the ONNX file
+            core.set_property({"CACHE_DIR": cache_dir})
+        config = {"INFERENCE_NUM_THREADS": threads} if threads else {}
+        self.compiled = core.compile_model(path, "CPU", config)
+        self.input_shape = [d.get_length() if d.is_static else None for d in self.compiled.inputs[0].get_partial_shape()]
+
+    def metadata(self) -> Dict[str, str]:
+        return {}
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        # one request per call, compiled models are shared across threads
+        request = self.compiled.create_infer_request()
+        request.infer({0: batch})
+        return request.get_output_tensor(0).data.copy()
+
+
+class _TorchSession:
+    """Network from a torch snapshot, memory-mapped rather than read into memory"""
+    def __init__(self, path: str, threads: int):
+        import torch
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.torch = torch
+        self.network = torch.load(path, map_location="cpu", mmap=True, weights_only=False)
+        self.input_shape = [None, 3, None, None]
+
+    def metadata(self) -> Dict[str, str]:
+        return {}
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        with self.torch.inference_mode():
+            # eval-mode heads return (decoded predictions, raw maps)
+            return self.network(self.torch.from_numpy(batch))[0].numpy()
+
+
+def read_metadata(path: str, session=None) -> dict:
+    """Task, class names and input size written next to the model at export.
+
+    Falls back to the metadata ultralytics embeds in its ONNX exports.
+    """
+    sidecar = os.path.splitext(path)[0] + ".json"
+    if os.path.exists(sidecar):
+        with open(sidecar, "r") as file:
+            meta = json.load(file)
+    elif session is not None and session.metadata():
+        raw = session.metadata()
+        meta = {
+            "task": raw.get("task", "detect"),
+            "names": ast.literal_eval(raw["names"]),
+            "imgsz": ast.literal_eval(raw.get("imgsz", "[640, 640]")),
+        }
+    else:
+        raise FileNotFoundError(f"No model metadata for {path}; expected {sidecar} from vision.runtime.export")
+
+    meta["names"] = {int(k): v for k, v in meta["names"].items()}
+    imgsz = meta.get("imgsz", 640)
+    meta["imgsz"] = imgsz[0] if isinstance(imgsz, (list, tuple)) else int(imgsz)
+    return meta
+
+
+class ExportedYOLO:
+    """Runs an exported detect/OBB model and returns ultralytics-shaped Results.
+
+    Callable like a YOLO object (single image or list, conf keyword), so
+    extract_pred, extract_pred_wire and the batcher work unchanged. The
+    torch backend here means a torch snapshot (vision.runtime.snapshot).
+    """
+    def __init__(
+        self,
+        path: str,
+        backend: str = "onnx",
+        threads: int = 0,
+        iou: float = DEFAULT_IOU,
+        max_det: int = DEFAULT_MAX_DET,
+        cache_dir: str = ""
+    ):
+        if backend == "onnx":
+            self.session = _OrtSession(path, threads)
+        elif backend == "openvino":
+            self.session = _OpenVinoSession(path, threads, cache_dir)
+        elif backend == "torch":
+            self.session = _TorchSession(path, threads)
+        else:
+            raise ValueError(f"Unknown exported model backend: {backend}")
+
+        meta = read_metadata(path, self.session)
+        self.path = path
+        self.backend = backend
+        self.task = meta["task"]
+        self.names = meta["names"]
+        self.imgsz = meta["imgsz"]
+        self.iou = iou
+        self.max_det = max_det
+        # static batch-1 exports have to be fed one image at a time
+        self.max_batch = self.session.input_shape[0] if isinstance(self.session.input_shape[0], int) else None
+
+    def __call__(self, source, conf: Optional[float] = None, iou: Optional[float] = None, **kwargs) -> List[Results]:
+        images = source if isinstance(source, list) else [source]
+        images = [self._as_bgr(image) for image in images]
+        conf = DEFAULT_CONF if conf is None else conf
+        iou = self.iou if iou is None else iou
+
+        results = []
+        step = self.max_batch or len(images) or 1
+        for start in range(0, len(images), step):
+            chunk = images[start:start + step]
+            boxed = [ops.letterbox(image, self.imgsz) for image in chunk]
+            preds = self.session.run(ops.to_input([b[0] for b in boxed]))
+            results.extend(self._postprocess(preds, chunk, boxed, conf, iou))
+        return results
+
+    def predict(self, source, **kwargs) -> List[Results]:
+        return self(source, **kwargs)
+
+    @staticmethod
+    def _as_bgr(image) -> np.ndarray:
+        if isinstance(image, np.ndarray):
+            return image
+        # PIL images (streamlit app) are RGB
+        return np.ascontiguousarray(np.asarray(image.convert("RGB"))[..., ::-1])
+
+    def _postprocess(self, preds, images, boxed, conf, iou) -> List[Results]:
+        rotated = self.task == "obb"
+        detections = ops.non_max_suppression(
+            preds, conf, iou, nc=len(self.names), max_det=self.max_det, rotated=rotated
+        )
+
+        results = []
+        for det, image, (_, gain, pad) in zip(detections, images, boxed):
+            shape = image.shape[:2]
+            if rotated:
+                rboxes = ops.regularize_rboxes(np.concatenate([det[:, :4], det[:, -1:]], axis=1))
+                rboxes[:, :4] = ops.scale_boxes(rboxes[:, :4], gain, pad, shape, xywh=True)
+                # xywhr, conf, cls
+                results.append(Results(image, self.names, obb=np.concatenate([rboxes, det[:, 4:6]], axis=1)))
+            else:
+                det[:, :4] = ops.scale_boxes(det[:, :4], gain, pad, shape)
+                results.append(Results(image, self.names, boxes=det[:, :6]))
+        return results
+
+
+def load_model(
+    path: str,
+    backend: str = "torch",
+    threads: int = 0,
+    iou: float = DEFAULT_IOU,
+    max_det: int = DEFAULT_MAX_DET,
+    snapshot_dir: str = ""
+):
+    """YOLO weights for the torch backend, otherwise an exported model file.
+
+    With snapshot_dir, the snapshot of path in that folder is loaded instead
+    (for openvino the folder is the compiled-model cache).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"INFERENCE_BACKEND must be one of {BACKENDS}, got {backend!r}")
+    if snapshot_dir and backend == "openvino":
+        logger.info(f"Loading openvino model from {path} (compiled-model cache {snapshot_dir})")
+        return ExportedYOLO(path, backend, threads, iou, max_det, cache_dir=snapshot_dir)
+    if snapshot_dir:
+        snapshot = snapshot_path(path, backend, snapshot_dir)
+        if not os.path.exists(snapshot):
+            raise FileNotFoundError(f"No snapshot of {path} at {snapshot}; create it with python -m vision.runtime.snapshot")
+        logger.info(f"Loading {backend} snapshot from {snapshot}")
+        return ExportedYOLO(snapshot, backend, threads, iou, max_det)
+    if backend == "torch":
+        # only this backend needs torch, keep it out of onnx/openvino processes
+        from ultralytics import YOLO
+        return YOLO(path)
+
+    logger.info(f"Loading {backend} model from {path}")
+    return ExportedYOLO(path, backend, threads, iou, max_det)
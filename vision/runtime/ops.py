@@ -0,0 +1,173 @@
+import math
+from typing import List, Tuple
+
+import cv2 as cv
+import numpy as np
+
+# NumPy ports of the ultralytics 8.1 predict-time pre/post-processing, so the
+# exported detectors give the same boxes as the PyTorch YOLO objects without
+# importing torch. Keep these in step with ultralytics.utils.ops.
+
+def letterbox(image: np.ndarray, size: int = 640) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Resize keeping aspect ratio and pad to size x size with grey (114).
+
+    Returns the padded image, the scale gain and the (left, top) padding.
+    """
+    height, width = image.shape[:2]
+    gain = min(size / height, size / width)
+    new_w, new_h = int(round(width * gain)), int(round(height * gain))
+    dw, dh = (size - new_w) / 2, (size - new_h) / 2
+
+    if (width, height) != (new_w, new_h):
+        image = cv.resize(image, (new_w, new_h), interpolation=cv.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    if top or bottom or left or right:
+        image = cv.copyMakeBorder(image, top, bottom, left, right, cv.BORDER_CONSTANT, value=(114, 114, 114))
+    return image, gain, (left, top)
+
+def to_input(images: List[np.ndarray]) -> np.ndarray:
+    """Stack letterboxed BGR images into a float32 RGB NCHW batch in 0..1"""
+    batch = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255
+
+def xywh2xyxy(boxes: np.ndarray) -> np.ndarray:
+    out = np.empty_like(boxes)
+    half_w, half_h = boxes[..., 2] / 2, boxes[..., 3] / 2
+    out[..., 0] = boxes[..., 0] - half_w
+    out[..., 1] = boxes[..., 1] - half_h
+    out[..., 2] = boxes[..., 0] + half_w
+    out[..., 3] = boxes[..., 1] + half_h
+    return out
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy NMS like torchvision.ops.nms: drop boxes with IoU > threshold to a kept one"""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.intp)
+
+def _covariance(boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Covariance terms of the Gaussian for xywhr boxes"""
+    a = boxes[:, 2] ** 2 / 12
+    b = boxes[:, 3] ** 2 / 12
+    cos, sin = np.cos(boxes[:, 4]), np.sin(boxes[:, 4])
+    return a * cos**2 + b * sin**2, a * sin**2 + b * cos**2, (a - b) * cos * sin
+
+def batch_probiou(obb1: np.ndarray, obb2: np.ndarray, eps: float = 1e-7) -> np.ndarray:
+    """Pairwise probabilistic IoU (Hellinger distance) of xywhr boxes, (N, M)"""
+    x1, y1 = obb1[:, 0:1], obb1[:, 1:2]
+    x2, y2 = obb2[None, :, 0], obb2[None, :, 1]
+    a1, b1, c1 = (v[:, None] for v in _covariance(obb1))
+    a2, b2, c2 = (v[None] for v in _covariance(obb2))
+
+    denom = (a1 + a2) * (b1 + b2) - (c1 + c2) ** 2
+    t1 = (((a1 + a2) * (y1 - y2) ** 2 + (b1 + b2) * (x1 - x2) ** 2) / (denom + eps)) * 0.25
+    t2 = (((c1 + c2) * (x2 - x1) * (y1 - y2)) / (denom + eps)) * 0.5
+    t3 = np.log(
+        denom / (4 * np.sqrt(np.clip(a1 * b1 - c1**2, 0, None) * np.clip(a2 * b2 - c2**2, 0, None)) + eps) + eps
+    ) * 0.5
+    bd = np.clip(t1 + t2 + t3, eps, 100.0)
+    hd = np.sqrt(1.0 - np.exp(-bd) + eps)
+    return 1 - hd
+
+def nms_rotated(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Rotated NMS as in ultralytics: a box is dropped if any higher scoring box overlaps it"""
+    if len(boxes) == 0:
+        return np.empty((0,), dtype=np.intp)
+    order = np.argsort(-scores, kind="stable")
+    ious = np.triu(batch_probiou(boxes[order], boxes[order]), k=1)
+    return order[ious.max(axis=0) < iou_threshold]
+
+def non_max_suppression(
+    prediction: np.ndarray,
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.7,
+    nc: int = 0,
+    max_det: int = 300,
+    rotated: bool = False,
+    max_nms: int = 30000,
+    max_wh: int = 7680
+) -> List[np.ndarray]:
+    """Per-image detections from raw (batch, 4 + nc [+ angle], anchors) model output.
+
+    Rows are (x1, y1, x2, y2, conf, cls), or (x, y, w, h, conf, cls, angle)
+    when rotated, in letterboxed input pixels.
+    """
+    nc = nc or (prediction.shape[1] - 4)
+    candidates = prediction[:, 4:4 + nc].max(axis=1) > conf_threshold
+    prediction = prediction.transpose(0, 2, 1)
+
+    output = []
+    for xi, x in enumerate(prediction):
+        x = x[candidates[xi]]
+        if not rotated:
+            x = np.concatenate((xywh2xyxy(x[:, :4]), x[:, 4:]), axis=1)
+        box, cls, extra = x[:, :4], x[:, 4:4 + nc], x[:, 4 + nc:]
+        conf = cls.max(axis=1, keepdims=True)
+        j = cls.argmax(axis=1)[:, None].astype(x.dtype)
+        x = np.concatenate((box, conf, j, extra), axis=1)[conf[:, 0] > conf_threshold]
+        if not len(x):
+            output.append(x)
+            continue
+        if len(x) > max_nms:
+            x = x[np.argsort(-x[:, 4], kind="stable")[:max_nms]]
+
+        # Offset boxes by class so classes never suppress each other
+        offset = x[:, 5:6] * max_wh
+        if rotated:
+            keep = nms_rotated(np.concatenate((x[:, :2] + offset, x[:, 2:4], x[:, -1:]), axis=1), x[:, 4], iou_threshold)
+        else:
+            keep = nms(x[:, :4] + offset, x[:, 4], iou_threshold)
+        output.append(x[keep[:max_det]])
+    return output
+
+def clip_boxes(boxes: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """Clip xyxy (or the xy of xywh) columns in place to an (h, w) shape"""
+    boxes[..., [0, 2]] = boxes[..., [0, 2]].clip(0, shape[1])
+    boxes[..., [1, 3]] = boxes[..., [1, 3]].clip(0, shape[0])
+    return boxes
+
+def scale_boxes(
+    boxes: np.ndarray,
+    gain: float,
+    pad: Tuple[int, int],
+    shape: Tuple[int, int],
+    xywh: bool = False
+) -> np.ndarray:
+    """Map boxes from letterboxed input pixels back to the original (h, w) image"""
+    boxes[..., 0] -= pad[0]
+    boxes[..., 1] -= pad[1]
+    if not xywh:
+        boxes[..., 2] -= pad[0]
+        boxes[..., 3] -= pad[1]
+    boxes[..., :4] /= gain
+    return clip_boxes(boxes, shape)
+
+def regularize_rboxes(rboxes: np.ndarray) -> np.ndarray:
+    """Make w the long side and keep the angle in [0, pi)"""
+    x, y, w, h, t = rboxes.T
+    wide = w > h
+    return np.stack(
+        [x, y, np.where(wide, w, h), np.where(wide, h, w), np.where(wide, t, t + math.pi / 2) % math.pi],
+        axis=-1
+    )
+
+def xywhr2xyxyxyxy(rboxes: np.ndarray) -> np.ndarray:
+    """Corner points (N, 4, 2) of xywhr boxes"""
+    ctr = rboxes[..., :2]
+    w, h, angle = (rboxes[..., i:i + 1] for i in range(2, 5))
+    cos, sin = np.cos(angle), np.sin(angle)
+    vec1 = np.concatenate([w / 2 * cos, w / 2 * sin], axis=-1)
+    vec2 = np.concatenate([-h / 2 * sin, h / 2 * cos], axis=-1)
+    return np.stack([ctr + vec1 + vec2, ctr + vec1 - vec2, ctr - vec1 - vec2, ctr - vec1 + vec2], axis=-2)
@@ -0,0 +1,263 @@
+"""INT8 versions of the exported detectors, and how they compare to FP32.
+
+    python -m vision.runtime.quantize calibrate --images samples/
+    python -m vision.runtime.quantize report --images samples/ --output int8_report.json
+
+calibrate runs ONNX Runtime static quantization (QDQ, per-channel INT8
+weights, UINT8 activations) on the .onnx files from vision.runtime.export,
+calibrating on the sample schematics preprocessed the way the server does.
+The wire model is calibrated on masked images, as it sees them in serving.
+The box/class decoding at the end of each head stays FP32.
+
+report runs FP32 and INT8 side by side on the samples: mAP of INT8 with
+the FP32 detections as ground truth, connectivity agreement of the nets
+inception builds, and per-image latency. Serve the INT8 files with
+MODEL_PRECISION=int8 (onnx or openvino backend).
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import config
+from vision.processing import parse_component_result
+from vision.runtime import ops
+from vision.runtime.evaluate import circuit_nets, detections, mean_average_precision, net_agreement
+from vision.runtime.model import ExportedYOLO
+from vision.tools.operations import create_white_mask, decode_image, image_size, prepare_image
+from vision.wire.processing import parse_wire_result
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def load_samples(folder: str, limit: Optional[int] = None) -> List[np.ndarray]:
+    """Sample schematics, decoded, resized and flipped like uploads"""
+    names = sorted(n for n in os.listdir(folder) if n.lower().endswith(IMAGE_EXTENSIONS))[:limit]
+    if not names:
+        raise FileNotFoundError(f"No images in {folder}")
+    images = []
+    for name in names:
+        with open(os.path.join(folder, name), "rb") as file:
+            images.append(prepare_image(decode_image(file.read())))
+    return images
+
+
+def head_decode_nodes(model_path: str) -> List[str]:
+    """Nodes between the last head convolutions and the outputs.
+
+    These turn raw head maps into boxes and scores (DFL softmax, anchor
+    offsets, stride scaling, sigmoid); quantizing them costs most of the
+    accuracy for little speed. The DFL's fixed conv (the one fed by the
+    softmax) is part of the decoding, every other Conv ends the walk.
+    """
+    import onnx
+
+    graph = onnx.load(model_path).graph
+    producers = {output: node for node in graph.node for output in node.output}
+
+    def is_dfl(node):
+        source = producers.get(node.input[0])
+        return source is not None and source.op_type == "Softmax"
+
+    excluded = set()
+    stack = [output.name for output in graph.output]
+    while stack:
+        node = producers.get(stack.pop())
+        if node is None or node.name in excluded:
+            continue
+        if node.op_type == "Conv" and not is_dfl(node):
+            continue
+        excluded.add(node.name)
+        stack.extend(node.input)
+    return sorted(excluded)
+
+
+def int8_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".int8.onnx"
+
+
+def quantize_model(model_path: str, images: List[np.ndarray], output: str, per_channel: bool = True) -> str:
+    """Static INT8 quantization of one exported model; writes output and its .json sidecar"""
+    from onnxruntime.quantization import (
+        CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quant_pre_process, quantize_static
+    )
+
+    class Reader(CalibrationDataReader):
+        """Feeds letterboxed samples to the calibrator one at a time"""
+        def __init__(self, images, input_name, imgsz):
+            self.inputs = iter(
+                {input_name: ops.to_input([ops.letterbox(image, imgsz)[0]])} for image in images
+            )
+
+        def get_next(self):
+            return next(self.inputs, None)
+
+    fp32 = ExportedYOLO(model_path)
+    prepared = output + ".prep.onnx"
+    # shape inference and graph cleanup so the quantizer sees every tensor;
+    # plain ONNX shape inference is enough for a conv net
+    quant_pre_process(model_path, prepared, skip_symbolic_shape=True)
+    try:
+        quantize_static(
+            prepared,
+            output,
+            Reader(images, fp32.session.input_name, fp32.imgsz),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=head_decode_nodes(prepared),
+        )
+    finally:
+        os.remove(prepared)
+        if os.path.exists(prepared + ".data"):
+            os.remove(prepared + ".data")
+
+    sidecar = os.path.splitext(model_path)[0] + ".json"
+    with open(sidecar, "r") as file:
+        meta = json.load(file)
+    meta.update({"precision": "int8", "calibrationImages": len(images), "source": os.path.basename(model_path)})
+    with open(os.path.splitext(output)[0] + ".json", "w") as file:
+        json.dump(meta, file, indent=2)
+    return output
+
+
+def calibrate(component: str, wire: str, images: List[np.ndarray], per_channel: bool = True) -> Dict[str, str]:
+    component_out = quantize_model(component, images, int8_path(component), per_channel)
+
+    # the wire model only ever sees images with the components masked out
+    component_model = ExportedYOLO(component)
+    masked = [
+        create_white_mask(image, component_model(image, conf=config.CONFIDENCE_THRESHOLD)[0].boxes.xyxy.cpu().numpy())
+        for image in images
+    ]
+    wire_out = quantize_model(wire, masked, int8_path(wire), per_channel)
+    return {"component": component_out, "wire": wire_out}
+
+
+def _run_pipeline(image: np.ndarray, component_model, wire_model, conf: float) -> dict:
+    """Detections, nets and stage timings for one preprocessed image"""
+    timings = {}
+    start = time.perf_counter()
+    component_result = component_model(image, conf=conf)[0]
+    timings["component"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data_device, classes, boxes = parse_component_result(component_result, component_model.names)
+    masked = create_white_mask(image, boxes)
+    wire_result = wire_model(masked, conf=conf)[0]
+    timings["wire"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data_wire = parse_wire_result(wire_result, image_size(image))
+    nets = circuit_nets(data_device, classes, data_wire, image_size(image))
+    timings["inception"] = time.perf_counter() - start
+    timings["total"] = sum(timings.values())
+
+    return {
+        "component": detections(component_result),
+        "wire": detections(wire_result),
+        "nets": nets,
+        "timings": timings,
+    }
+
+
+def _latency(runs: List[dict]) -> Dict[str, float]:
+    return {
+        f"{stage}{stat}Ms": fn([run["timings"][stage] for run in runs]) * 1000
+        for stage in ("component", "wire", "inception", "total")
+        for stat, fn in (("Median", statistics.median), ("Mean", statistics.mean))
+    }
+
+
+def report(
+    component: str,
+    wire: str,
+    images: List[np.ndarray],
+    backend: str = "onnx",
+    conf: float = 0.25,
+    threads: int = 0
+) -> dict:
+    """Accuracy and latency of the INT8 models against their FP32 sources"""
+    models = {
+        "fp32": (ExportedYOLO(component, backend, threads), ExportedYOLO(wire, backend, threads)),
+        "int8": (ExportedYOLO(int8_path(component), backend, threads), ExportedYOLO(int8_path(wire), backend, threads)),
+    }
+    runs = {}
+    for precision, (component_model, wire_model) in models.items():
+        # warm-up: first calls allocate arenas and pick kernels
+        _run_pipeline(images[0], component_model, wire_model, conf)
+        runs[precision] = [_run_pipeline(image, component_model, wire_model, conf) for image in images]
+
+    agreement = [net_agreement(ref["nets"], test["nets"]) for ref, test in zip(runs["fp32"], runs["int8"])]
+    fp32_latency, int8_latency = _latency(runs["fp32"]), _latency(runs["int8"])
+    return {
+        "images": len(images),
+        "backend": backend,
+        "conf": conf,
+        "mAP": {
+            name: mean_average_precision([r[name] for r in runs["int8"]], [r[name] for r in runs["fp32"]])
+            for name in ("component", "wire")
+        },
+        "connectivity": {
+            "identicalImages": sum(a["identical"] for a in agreement) / len(agreement),
+            "meanPairAgreement": statistics.mean(a["pairAgreement"] for a in agreement),
+            "perImage": agreement,
+        },
+        "latency": {
+            "fp32": fp32_latency,
+            "int8": int8_latency,
+            "speedup": fp32_latency["totalMedianMs"] / int8_latency["totalMedianMs"],
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 quantization of the exported detectors")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("calibrate", "report"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("--images", required=True, help="folder of sample schematics")
+        cmd.add_argument("--limit", type=int, default=None, help="use at most this many images")
+        cmd.add_argument("--component", default=config.COMPONENT_ONNX_PATH, help="FP32 component .onnx")
+        cmd.add_argument("--wire", default=config.WIRE_ONNX_PATH, help="FP32 wire .onnx")
+    sub.choices["calibrate"].add_argument("--per-tensor", action="store_true", help="per-tensor instead of per-channel weights")
+    report_cmd = sub.choices["report"]
+    report_cmd.add_argument("--backend", default="onnx", choices=["onnx", "openvino"])
+    report_cmd.add_argument("--conf", type=float, default=config.CONFIDENCE_THRESHOLD)
+    report_cmd.add_argument("--threads", type=int, default=config.INFERENCE_THREADS)
+    report_cmd.add_argument("--output", help="write the full report as JSON")
+    args = parser.parse_args()
+
+    images = load_samples(args.images, args.limit)
+    if args.command == "calibrate":
+        outputs = calibrate(args.component, args.wire, images, per_channel=not args.per_tensor)
+        for name, path in outputs.items():
+            print(f"{name}: {path} (calibrated on {len(images)} images)")
+        return
+
+    result = report(args.component, args.wire, images, args.backend, args.conf, args.threads)
+    for name, scores in result["mAP"].items():
+        print(f"{name:<10} mAP50 {scores['mAP50']:.4f}  mAP50-95 {scores['mAP50-95']:.4f}")
+    connectivity = result["connectivity"]
+    print(f"nets       identical on {connectivity['identicalImages']:.1%} of images, "
+          f"pair agreement {connectivity['meanPairAgreement']:.4f}")
+    for precision in ("fp32", "int8"):
+        latency = result["latency"][precision]
+        print(f"{precision:<10} median per image {latency['totalMedianMs']:.1f} ms "
+              f"(component {latency['componentMedianMs']:.1f}, wire {latency['wireMedianMs']:.1f}, "
+              f"inception {latency['inceptionMedianMs']:.1f})")
+    print(f"speedup    {result['latency']['speedup']:.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
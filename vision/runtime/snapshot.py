@@ -0,0 +1,97 @@
+"""Pre-serialised model snapshots for a fast cold start.
+
+    python -m vision.runtime.snapshot --output snapshots/
+    python -m vision.runtime.snapshot --backend onnx --output snapshots/
+
+Serve them with MODEL_SNAPSHOT_DIR=snapshots/ and the same INFERENCE_BACKEND
+(and MODEL_PRECISION). What a snapshot holds depends on the backend:
+
+torch: the fused, FP32, eval-mode network saved with torch.save. It loads
+with torch.load(mmap=True), so the weights are paged in from the file
+instead of being unpickled, upcast from FP16 and fused on every start, and
+runs through the same NumPy pre/post-processing as the exported models.
+onnx: the graph after ONNX Runtime's basic and extended optimizations, so
+creating the session doesn't redo them.
+openvino: nothing to build here. MODEL_SNAPSHOT_DIR is used as OpenVINO's
+compiled-model cache; the first start fills it and later starts map the
+compiled blob instead of reading and compiling the ONNX file.
+"""
+import argparse
+import json
+import os
+import shutil
+
+import config
+
+SNAPSHOT_SUFFIX = {"torch": ".snapshot.pt", "onnx": ".snapshot.onnx"}
+
+
+def snapshot_path(path: str, backend: str, directory: str) -> str:
+    """Where the snapshot of a model file lives in directory"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(directory, name + SNAPSHOT_SUFFIX[backend])
+
+
+def snapshot_torch(weights: str, output: str, imgsz: int = 640) -> str:
+    """Save the fused FP32 network behind a .pt file, plus its .json sidecar"""
+    import torch
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    network = model.model.float().fuse(verbose=False).eval()
+    torch.save(network, output)
+
+    meta = {
+        "task": model.task,
+        "names": {int(k): v for k, v in model.names.items()},
+        "imgsz": imgsz,
+        "source": os.path.basename(weights),
+    }
+    with open(os.path.splitext(output)[0] + ".json", "w") as file:
+        json.dump(meta, file, indent=2)
+    return output
+
+
+def snapshot_onnx(model_path: str, output: str) -> str:
+    """Save the ONNX Runtime optimized graph of an exported model, plus its .json sidecar"""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    # extended, not all: the layout passes ORT_ENABLE_ALL adds are specific
+    # to the CPU they ran on and are cheap to redo at load time
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = output
+    ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+    shutil.copyfile(os.path.splitext(model_path)[0] + ".json", os.path.splitext(output)[0] + ".json")
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot the detectors for MODEL_SNAPSHOT_DIR")
+    parser.add_argument("--output", required=True, help="snapshot folder")
+    parser.add_argument("--backend", default=config.INFERENCE_BACKEND, choices=list(SNAPSHOT_SUFFIX))
+    parser.add_argument("--component", default=None, help="component model (default from config)")
+    parser.add_argument("--wire", default=None, help="wire model (default from config)")
+    parser.add_argument("--imgsz", type=int, default=640)
+    args = parser.parse_args()
+
+    if args.backend == "torch":
+        defaults = (config.COMPONENT_MODEL_PATH, config.WIRE_MODEL_PATH)
+    elif config.MODEL_PRECISION == "int8":
+        defaults = (config.COMPONENT_INT8_PATH, config.WIRE_INT8_PATH)
+    else:
+        defaults = (config.COMPONENT_ONNX_PATH, config.WIRE_ONNX_PATH)
+
+    os.makedirs(args.output, exist_ok=True)
+    for path in (args.component or defaults[0], args.wire or defaults[1]):
+        output = snapshot_path(path, args.backend, args.output)
+        if args.backend == "torch":
+            snapshot_torch(path, output, args.imgsz)
+        else:
+            snapshot_onnx(path, output)
+        print(f"{path} -> {output}")
+
+
+if __name__ == "__main__":
+    main()
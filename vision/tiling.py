@@ -0,0 +1,231 @@
+from math import atan2, degrees, radians, sin
+from typing import List, Tuple
+
+import numpy as np
+
+from vision.processing import _predict_kwargs
+from vision.wire.wire_calc import calculate_angle
+
+# Tiled inference for scans much larger than the model input. The image is
+# cut into overlapping tile x tile views (no copies), the tiles go through
+# the detector in batches, and the per-tile detections are mapped back to
+# full-image pixels and merged across the seams: boxes by cross-tile NMS,
+# wire segments by joining the collinear pieces of one wire. Outputs are
+# in the same formats as extract_pred / extract_pred_wire, normalised to
+# the full image.
+
+# Boxes overlapping a kept box by more than this share of the smaller one
+# are duplicates (a component cut at a seam lies inside its whole copy)
+MERGE_IOS = 0.6
+# Pieces of one wire from neighbouring tiles: at most this far apart (px)
+# and this far off parallel (degrees)
+STITCH_DISTANCE = 8.0
+STITCH_ANGLE = 10.0
+# Detections within this many px of a tile edge inside the image are cut by it
+SEAM_MARGIN = 2.0
+
+
+def tile_origins(length: int, tile: int, overlap: float) -> List[int]:
+    """Start offsets along one axis so tiles cover length with at least overlap between neighbours"""
+    if length <= tile:
+        return [0]
+    step = max(1, int(tile * (1 - overlap)))
+    starts = list(range(0, length - tile, step))
+    starts.append(length - tile)
+    return starts
+
+
+def make_tiles(image: np.ndarray, tile: int = 640, overlap: float = 0.2) -> Tuple[List[np.ndarray], np.ndarray]:
+    """Tile views of an HxWxC image and their (x, y) origins"""
+    height, width = image.shape[:2]
+    origins = [
+        (x, y) for y in tile_origins(height, tile, overlap) for x in tile_origins(width, tile, overlap)
+    ]
+    tiles = [image[y:y + tile, x:x + tile] for x, y in origins]
+    return tiles, np.array(origins, dtype=np.float64)
+
+
+def _predict_tiles(tiles: List[np.ndarray], model, batch_size: int, conf_threshold):
+    results = []
+    for start in range(0, len(tiles), batch_size):
+        results.extend(model(tiles[start:start + batch_size], **_predict_kwargs(conf_threshold)))
+    return results
+
+
+def _on_seam(boxes: np.ndarray, origin: np.ndarray, tile_shape: Tuple[int, int], image_shape: Tuple[int, int]) -> np.ndarray:
+    """Which xyxy boxes (tile pixels) reach a tile edge that lies inside the image"""
+    tile_h, tile_w = tile_shape
+    height, width = image_shape
+    x0, y0 = origin
+    seam = np.zeros(len(boxes), dtype=bool)
+    if x0 > 0:
+        seam |= boxes[:, 0] <= SEAM_MARGIN
+    if y0 > 0:
+        seam |= boxes[:, 1] <= SEAM_MARGIN
+    if x0 + tile_w < width:
+        seam |= boxes[:, 2] >= tile_w - SEAM_MARGIN
+    if y0 + tile_h < height:
+        seam |= boxes[:, 3] >= tile_h - SEAM_MARGIN
+    return seam
+
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def merge_boxes(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    classes: np.ndarray,
+    tile_ids: np.ndarray,
+    on_seam: np.ndarray,
+    threshold: float = MERGE_IOS
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Join what the seams cut, then cross-tile NMS.
+
+    Pieces cut by a seam are first merged with the intersecting pieces of
+    the same class from other tiles into one box (a component wider than
+    the overlap only ever shows up in pieces). Then greedy NMS per class on
+    intersection over the smaller box, visiting boxes clear of any seam
+    before cut ones and each group by score, so a whole copy of a component
+    wins over what was stitched from its pieces.
+    """
+    if not len(boxes):
+        return boxes, scores, classes
+    parent = list(range(len(boxes)))
+    cut = np.flatnonzero(on_seam)
+    if len(cut) > 1:
+        b = boxes[cut]
+        touch = (
+            (b[:, None, 0] <= b[None, :, 2]) & (b[None, :, 0] <= b[:, None, 2])
+            & (b[:, None, 1] <= b[None, :, 3]) & (b[None, :, 1] <= b[:, None, 3])
+            & (tile_ids[cut][:, None] != tile_ids[cut][None]) & (classes[cut][:, None] == classes[cut][None])
+        )
+        for a, b in zip(*np.nonzero(np.triu(touch, 1))):
+            parent[_find(parent, cut[a])] = _find(parent, cut[b])
+    roots = np.array([_find(parent, i) for i in range(len(boxes))])
+    groups = np.unique(roots)
+    boxes = np.array([
+        (*boxes[roots == root, :2].min(axis=0), *boxes[roots == root, 2:].max(axis=0)) for root in groups
+    ]).reshape(-1, 4)
+    scores = np.array([scores[roots == root].max() for root in groups])
+    classes, on_seam = classes[groups], on_seam[groups]
+
+    order = np.lexsort((-scores, on_seam))
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+        h = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+        ios = w * h / np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+        order = rest[(ios <= threshold) | (classes[rest] != classes[i])]
+    keep = np.array(keep)
+    keep = keep[np.argsort(-scores[keep], kind="stable")]
+    return boxes[keep], scores[keep], classes[keep]
+
+
+def detect_components_tiled(image, model, conf_threshold=None, tile=640, overlap=0.2, batch_size=8):
+    """extract_pred for a large image: (normalised coords, class names, xyxy pixel boxes)"""
+    height, width = image.shape[:2]
+    tiles, origins = make_tiles(image, tile, overlap)
+    results = _predict_tiles(tiles, model, batch_size, conf_threshold)
+
+    boxes, scores, classes, tile_ids, on_seam = [], [], [], [], []
+    for index, (result, origin, view) in enumerate(zip(results, origins, tiles)):
+        xyxy = np.asarray(result.boxes.xyxy.cpu().numpy(), dtype=np.float64)
+        on_seam.append(_on_seam(xyxy, origin, view.shape[:2], (height, width)))
+        boxes.append(xyxy + np.tile(origin, 2))
+        scores.append(np.asarray(result.boxes.conf.cpu().numpy(), dtype=np.float64))
+        classes.append(np.asarray(result.boxes.cls.cpu().numpy()).astype(int))
+        tile_ids.append(np.full(len(xyxy), index))
+
+    boxes, scores, classes = merge_boxes(
+        np.concatenate(boxes), np.concatenate(scores), np.concatenate(classes),
+        np.concatenate(tile_ids), np.concatenate(on_seam)
+    )
+    coords = [tuple(box) for box in (boxes / [width, height, width, height]).tolist()]
+    return coords, [model.names[int(c)] for c in classes], boxes
+
+
+def stitch_segments(segments: np.ndarray, tile_ids: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """Join the pieces of one wire found in different tiles.
+
+    Two candidate segments from different tiles belong together when they
+    are near parallel, the endpoints of one lie within STITCH_DISTANCE of
+    the other's line, and they overlap or nearly touch along it. Each group
+    becomes one segment between its two outermost endpoints.
+    """
+    n = len(segments)
+    parent = list(range(n))
+    index = np.flatnonzero(candidates)
+    if len(index) > 1:
+        seg = segments[index]
+        p1, p2 = seg[:, :2], seg[:, 2:]
+        length = np.hypot(*(p2 - p1).T)
+        unit = (p2 - p1) / np.maximum(length, 1e-9)[:, None]
+
+        def cross(a, b):
+            return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+        parallel = np.abs(cross(unit[:, None], unit[None])) <= sin(radians(STITCH_ANGLE))
+        # endpoints of j relative to the line of i, across and along it
+        d1, d2 = p1[None] - p1[:, None], p2[None] - p1[:, None]
+        across = np.maximum(np.abs(cross(unit[:, None], d1)), np.abs(cross(unit[:, None], d2)))
+        along1, along2 = (d1 * unit[:, None]).sum(-1), (d2 * unit[:, None]).sum(-1)
+        gap = np.maximum(np.maximum(np.minimum(along1, along2) - length[:, None], -np.maximum(along1, along2)), 0)
+        close = parallel & (across <= STITCH_DISTANCE) & (gap <= STITCH_DISTANCE)
+        close &= tile_ids[index][:, None] != tile_ids[index][None]
+        for a, b in zip(*np.nonzero(np.triu(close | close.T, 1))):
+            parent[_find(parent, index[a])] = _find(parent, index[b])
+
+    roots = np.array([_find(parent, i) for i in range(n)])
+    stitched = []
+    for root in np.unique(roots):
+        group = segments[roots == root]
+        if len(group) == 1:
+            stitched.append(group[0])
+            continue
+        # outermost endpoints along the longest piece
+        longest = group[np.argmax(np.hypot(group[:, 2] - group[:, 0], group[:, 3] - group[:, 1]))]
+        direction = longest[2:] - longest[:2]
+        points = group.reshape(-1, 2)
+        along = (points - longest[:2]) @ direction
+        stitched.append(np.concatenate([points[np.argmin(along)], points[np.argmax(along)]]))
+    return np.array(stitched).reshape(-1, 4)
+
+
+def detect_wires_tiled(image, model, conf_threshold=None, tile=640, overlap=0.2, batch_size=8):
+    """extract_pred_wire for a large image: (angle, x1, y1, x2, y2) normalised to the full image"""
+    height, width = image.shape[:2]
+    tiles, origins = make_tiles(image, tile, overlap)
+    results = _predict_tiles(tiles, model, batch_size, conf_threshold)
+
+    segments, tile_ids = [], []
+    for index, (result, origin) in enumerate(zip(results, origins)):
+        corners = np.asarray(result.obb.xyxyxyxy.cpu().numpy(), dtype=np.float64)
+        for box in corners.reshape(-1, 8).tolist():
+            _, x1, y1, x2, y2 = calculate_angle(box)
+            segments.append((x1 + origin[0], y1 + origin[1], x2 + origin[0], y2 + origin[1]))
+            tile_ids.append(index)
+    segments = np.array(segments, dtype=np.float64).reshape(-1, 4)
+    tile_ids = np.array(tile_ids, dtype=np.intp)
+
+    # only pieces reaching into another tile can have a copy there
+    rects = np.array([(x, y, x + view.shape[1], y + view.shape[0]) for view, (x, y) in zip(tiles, origins)])
+    low, high = np.minimum(segments[:, :2], segments[:, 2:]), np.maximum(segments[:, :2], segments[:, 2:])
+    inside = (
+        (low[:, None, 0] <= rects[None, :, 2]) & (high[:, None, 0] >= rects[None, :, 0])
+        & (low[:, None, 1] <= rects[None, :, 3]) & (high[:, None, 1] >= rects[None, :, 1])
+    )
+    inside[np.arange(len(segments)), tile_ids] = False
+    stitched = stitch_segments(segments, tile_ids, inside.any(axis=1))
+    return [
+        (degrees(atan2(y2 - y1, x2 - x1)), x1 / width, y1 / height, x2 / width, y2 / height)
+        for x1, y1, x2, y2 in stitched.tolist()
+    ]
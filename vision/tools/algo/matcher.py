@@ -0,0 +1,323 @@
+"""Wire endpoint matching: one problem, pluggable strategies.
+
+Wire endpoints are linked to device connection points or to endpoints of
+other wires, and each point can be claimed by at most one endpoint (the
+occupancy match_algo_v1..v5 each tracked their own way). Linked points
+form a node: every wire end is renamed to its node's uuid, which is a
+device connection point's when the node has one.
+
+Strategies, by name in MATCHERS:
+    greedy   wires in input order, each free endpoint claims the nearest
+             free point and both become occupied. A linear scan per
+             endpoint; the reference the others are checked against.
+    grid     the same links as greedy, the nearest free point found
+             through PointGrid instead of a scan.
+    optimal  all endpoints assigned at once with the least total distance
+             over a sparse set of nearby candidates (scipy's sparse
+             min-cost matching), so the result doesn't depend on the order
+             of the wires.
+
+    wire_uuids = match_wire_device_points(boxes, data_wire, device_uuids, num_nodes, wire_uuids)
+"""
+import math
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from vision.inception.connectivity import DisjointSet
+
+Point = Tuple[float, float]
+Link = Tuple[int, int]
+
+# Points each endpoint may claim in the optimal assignment, nearest first
+OPTIMAL_CANDIDATES = 8
+
+MATCHERS: Dict[str, Callable[["MatchPoints", Optional[float]], List[Link]]] = {}
+
+
+def register(name: str):
+    """Add a strategy to MATCHERS: fn(points, radius) -> [(endpoint, point), ...]"""
+    def decorator(fn):
+        MATCHERS[name] = fn
+        return fn
+    return decorator
+
+
+def connection_points(box: Sequence[float], num_nodes: int) -> List[Point]:
+    """Where wires attach to a device.
+
+    Two-terminal devices at the middle of their left and right edges (the
+    terminals inception uses); four-node devices at the quarter points of
+    their top and bottom edges.
+    """
+    x1, y1, x2, y2 = box[:4]
+    if num_nodes == 4:
+        quarter = (x2 - x1) / 4
+        return [(x1 + quarter, y1), (x2 - quarter, y1), (x1 + quarter, y2), (x2 - quarter, y2)]
+    center_y = (y1 + y2) / 2
+    return [(x1, center_y), (x2, center_y)][:num_nodes]
+
+
+class MatchPoints:
+    """Every point taking part in a match, by index.
+
+    Wire endpoints come first (2 * wire, 2 * wire + 1), then device
+    connection points; ties between equally close points go to the lower
+    index. owner is the wire index of an endpoint and -1 for device points,
+    so an endpoint is never linked to its own wire.
+    """
+    __slots__ = ("xy", "owner", "uuids", "n_endpoints")
+
+    def __init__(
+        self,
+        data_device: Sequence[Sequence[float]],
+        data_wire: Sequence[Sequence[float]],
+        device_uuids: Dict[str, List[str]],
+        num_nodes: Sequence[int],
+        wire_uuids: Sequence[Tuple[str, str]]
+    ):
+        xy, owner, uuids = [], [], []
+        for index, ((_, x1, y1, x2, y2), (uuid1, uuid2)) in enumerate(zip(data_wire, wire_uuids)):
+            xy += [(x1, y1), (x2, y2)]
+            owner += [index, index]
+            uuids += [uuid1, uuid2]
+        self.n_endpoints = len(xy)
+        for box, nodes, count in zip(data_device, device_uuids.values(), num_nodes):
+            for point, node in zip(connection_points(box, count), nodes):
+                xy.append(point)
+                owner.append(-1)
+                uuids.append(node)
+        self.xy: List[Point] = xy
+        self.owner: List[int] = owner
+        self.uuids: List[str] = uuids
+
+    def __len__(self):
+        return len(self.xy)
+
+    def is_device(self, index: int) -> bool:
+        return index >= self.n_endpoints
+
+    def nodes(self, links: Sequence[Link]) -> List[int]:
+        """The point whose uuid names each point's node.
+
+        A node is named after its first device point; a node of wire ends
+        only after its last endpoint (for a greedy link, the one claimed).
+        """
+        groups = DisjointSet(self.xy)
+        for a, b in links:
+            groups.union(a, b)
+        names = {}
+        for index in range(len(self.xy)):
+            root = groups.find(index)
+            name = names.get(root)
+            if name is None or (not self.is_device(name) and (self.is_device(index) or index > name)):
+                names[root] = index
+        return [names[groups.find(index)] for index in range(len(self.xy))]
+
+    def rename(self, links: Sequence[Link]) -> List[Tuple[str, str]]:
+        """wire_uuids with both ends of every wire renamed to their node"""
+        nodes = self.nodes(links)
+        return [
+            (self.uuids[nodes[2 * wire]], self.uuids[nodes[2 * wire + 1]])
+            for wire in range(self.n_endpoints // 2)
+        ]
+
+
+class PointGrid:
+    """Uniform grid over the match points that tracks which are still free.
+
+    nearest_free searches rings of cells outwards from the query and stops
+    once no unsearched cell can hold anything closer, so it returns exactly
+    what a scan over every free point would (ties to the lower index).
+    Cells whose points are all taken are skipped without being read.
+    """
+    def __init__(self, points: Sequence[Point], cell_size: Optional[float] = None):
+        self.points = points
+        self.cell_size = cell_size or self.default_cell_size(points)
+        self.cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for index, point in enumerate(points):
+            self.cells[self._cell(point)].append(index)
+        self.free = [True] * len(points)
+        self.free_in_cell = {cell: len(indices) for cell, indices in self.cells.items()}
+        if self.cells:
+            xs, ys = zip(*self.cells)
+            self.bounds = (min(xs), min(ys), max(xs), max(ys))
+        else:
+            self.bounds = (0, 0, 0, 0)
+
+    @staticmethod
+    def default_cell_size(points: Sequence[Point]) -> float:
+        """About two points per cell for points spread over their bounding box"""
+        if len(points) < 2:
+            return 1.0
+        xy = np.asarray(points, dtype=np.float64)
+        span = xy.max(axis=0) - xy.min(axis=0)
+        area = max(span[0] * span[1], max(span) ** 2 / len(points), 1e-12)
+        return math.sqrt(2 * area / len(points))
+
+    def _cell(self, point: Point) -> Tuple[int, int]:
+        return (math.floor(point[0] / self.cell_size), math.floor(point[1] / self.cell_size))
+
+    def occupy(self, index: int) -> None:
+        if self.free[index]:
+            self.free[index] = False
+            self.free_in_cell[self._cell(self.points[index])] -= 1
+
+    def _ring(self, cx: int, cy: int, r: int):
+        if r == 0:
+            yield cx, cy
+            return
+        for dx in range(-r, r + 1):
+            yield cx + dx, cy - r
+            yield cx + dx, cy + r
+        for dy in range(-r + 1, r):
+            yield cx - r, cy + dy
+            yield cx + r, cy + dy
+
+    def nearest_free(
+        self,
+        point: Point,
+        owner: Sequence[int],
+        exclude_owner: int,
+        radius: Optional[float] = None
+    ) -> Tuple[float, int]:
+        """(distance, index) of the closest free point not owned by exclude_owner
+        and strictly closer than radius; index is -1 when there is none"""
+        limit = math.inf if radius is None else radius
+        best = (limit, -1)
+        x, y = point
+        cx, cy = self._cell(point)
+        min_x, min_y, max_x, max_y = self.bounds
+        last = max(cx - min_x, max_x - cx, cy - min_y, max_y - cy, 0)
+        for r in range(last + 1):
+            for cell in self._ring(cx, cy, r):
+                if not self.free_in_cell.get(cell):
+                    continue
+                for index in self.cells[cell]:
+                    if self.free[index] and owner[index] != exclude_owner:
+                        px, py = self.points[index]
+                        candidate = (math.hypot(px - x, py - y), index)
+                        if candidate < best:
+                            best = candidate
+            # everything outside rings 0..r is at least r cells away
+            reach = r * self.cell_size
+            if best[0] < reach or limit <= reach:
+                break
+        return best
+
+
+@register("greedy")
+def match_greedy(points: MatchPoints, radius: Optional[float] = None) -> List[Link]:
+    limit = math.inf if radius is None else radius
+    xy, owner = points.xy, points.owner
+    free = [True] * len(xy)
+    links = []
+    for source in range(points.n_endpoints):
+        if not free[source]:
+            continue
+        x, y = xy[source]
+        best, best_distance = -1, limit
+        for target, (px, py) in enumerate(xy):
+            if free[target] and owner[target] != owner[source]:
+                distance = math.hypot(px - x, py - y)
+                if distance < best_distance:
+                    best, best_distance = target, distance
+        if best >= 0:
+            free[source] = free[best] = False
+            links.append((source, best))
+    return links
+
+
+@register("grid")
+def match_grid(points: MatchPoints, radius: Optional[float] = None) -> List[Link]:
+    grid = PointGrid(points.xy)
+    links = []
+    for source in range(points.n_endpoints):
+        if not grid.free[source]:
+            continue
+        _, target = grid.nearest_free(points.xy[source], points.owner, points.owner[source], radius)
+        if target >= 0:
+            grid.occupy(source)
+            grid.occupy(target)
+            links.append((source, target))
+    return links
+
+
+@register("optimal")
+def match_optimal(
+    points: MatchPoints,
+    radius: Optional[float] = None,
+    candidates: int = OPTIMAL_CANDIDATES
+) -> List[Link]:
+    """Each endpoint claims at most one point and each point is claimed at
+    most once, with the least total distance. Unlike the greedy order an
+    endpoint can both claim a point and be claimed, so three wire ends
+    can meet in one node.
+
+    Sparse: only an endpoint's `candidates` nearest points (closer than
+    radius) are considered, found through a k-d tree, and the assignment
+    is solved by scipy's LAPJVsp (min_weight_full_bipartite_matching), so
+    it scales with the number of endpoints rather than its square.
+    """
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+    from scipy.spatial import cKDTree
+
+    n, total = points.n_endpoints, len(points.xy)
+    if n == 0:
+        return []
+    xy = np.asarray(points.xy, dtype=np.float64)
+    owner = np.asarray(points.owner)
+    limit = np.inf if radius is None else radius
+    # two extra for the endpoint itself and the other end of its wire
+    k = min(candidates + 2, total)
+    distance, index = cKDTree(xy).query(xy[:n], k=k, distance_upper_bound=limit)
+    distance, index = distance.reshape(n, k), index.reshape(n, k)
+    # missing neighbours come back as index total, distance inf
+    valid = (distance < limit) & (owner[np.minimum(index, total - 1)] != owner[:n, None])
+    valid &= np.cumsum(valid, axis=1) <= candidates
+    rows = np.broadcast_to(np.arange(n)[:, None], (n, k))[valid]
+    cols, cost = index[valid], distance[valid]
+
+    # one way out per endpoint, a column of its own: staying unlinked
+    # costs more than any link (radius, when there is one)
+    miss = radius if radius is not None else 2 * (cost.max() if cost.size else 1.0) + 1
+    rows = np.concatenate([rows, np.arange(n)])
+    cols = np.concatenate([cols, total + np.arange(n)])
+    # every endpoint takes exactly one edge, so adding 1 to all of them
+    # keeps the optimum and keeps coincident points (distance 0) from
+    # reading as missing edges
+    cost = np.concatenate([cost, np.full(n, miss)]) + 1
+    graph = csr_matrix((cost, (rows, cols)), shape=(n, total + n))
+    rows, cols = min_weight_full_bipartite_matching(graph)
+    return [(int(row), int(col)) for row, col in zip(rows, cols) if col < total]
+
+
+def match_points(points: MatchPoints, strategy: str = "grid", radius: Optional[float] = None) -> List[Link]:
+    """Links (endpoint, point) chosen by one of the MATCHERS"""
+    try:
+        matcher = MATCHERS[strategy]
+    except KeyError:
+        raise ValueError(f"Unknown matching strategy {strategy!r}, expected one of {sorted(MATCHERS)}") from None
+    return matcher(points, radius)
+
+
+def match_wire_device_points(
+    data_device: Sequence[Sequence[float]],
+    data_wire: Sequence[Sequence[float]],
+    device_uuids: Dict[str, List[str]],
+    num_nodes: Sequence[int],
+    wire_uuids: Sequence[Tuple[str, str]],
+    image_size: Optional[Tuple[int, int]] = None,
+    strategy: str = "grid",
+    radius: Optional[float] = None
+) -> List[Tuple[str, str]]:
+    """Match wire endpoints to device connection points and to each other.
+
+    Takes the arguments of the old match_algo_v4 (image_size is unused) and
+    returns wire_uuids with each end renamed to the node it joined.
+    radius, in the units of the coordinates, caps how far a link can reach.
+    """
+    points = MatchPoints(data_device, data_wire, device_uuids, num_nodes, wire_uuids)
+    return points.rename(match_points(points, strategy, radius))
@@ -1,17 +1,223 @@
+import cv2 as cv
 import numpy as np
-from PIL import Image, ImageDraw
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Images move through the server as contiguous uint8 BGR arrays (cv2 order,
+# which is also what ultralytics expects for numpy input); PIL images are
+# still accepted for the streamlit app, which is the only caller that
+# needs PIL imported.
+ImageLike = Union["Image.Image", np.ndarray]
+
+def decode_image(contents: bytes) -> np.ndarray:
+    """Decode upload bytes straight into a BGR array.
+
+    IMREAD_COLOR also applies the EXIF orientation tag, so phone photos come
+    out upright without a separate rotate/copy.
+    """
+    image = cv.imdecode(np.frombuffer(contents, dtype=np.uint8), cv.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image")
+    return image
+
+class Letterbox(NamedTuple):
+    """How an original image was placed on the model input canvas.
+
+    scale is canvas pixels per original pixel; pad_x/pad_y is where the
+    resized image starts on the canvas. Detections are unmapped from
+    canvas-normalised coordinates to 0-1 across the original image on each
+    axis, the units the JSON (and inception's thresholds) have always used
+    when every upload was stretched to the model input.
+    """
+    scale: float
+    pad_x: int
+    pad_y: int
+    width: int
+    height: int
+    canvas_width: int
+    canvas_height: int
+
+    @property
+    def original_size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    def unmap_points(self, xy: np.ndarray) -> np.ndarray:
+        """Canvas-normalised (..., 2) points to 0-1 across the original width and height.
+
+        Points in the padding are clipped to the edge of the image.
+        """
+        canvas = np.array([self.canvas_width, self.canvas_height], dtype=np.float64)
+        pixels = (np.asarray(xy, dtype=np.float64) * canvas - [self.pad_x, self.pad_y]) / self.scale
+        np.clip(pixels, 0, [self.width, self.height], out=pixels)
+        return pixels / [self.width, self.height]
+
+def letterbox(image: np.ndarray, size: int = 640, pad_value: int = 255) -> Tuple[np.ndarray, Letterbox]:
+    """Fit an image into a size x size canvas keeping its aspect ratio, flipped top to bottom.
+
+    INTER_AREA resizes straight into the canvas view, so the canvas is the
+    one new buffer and the flip runs in place on it. The padding is white
+    like the page (and the component mask), so it adds no edges for the
+    detectors to pick up.
+    """
+    height, width = image.shape[:2]
+    scale = size / max(height, width)
+    new_width, new_height = max(1, round(width * scale)), max(1, round(height * scale))
+    pad_x, pad_y = (size - new_width) // 2, (size - new_height) // 2
+
+    canvas = np.full((size, size) + image.shape[2:], pad_value, dtype=image.dtype)
+    view = canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width]
+    cv.resize(image, (new_width, new_height), dst=view, interpolation=cv.INTER_AREA)
+    cv.flip(view, 0, dst=view)
+    return canvas, Letterbox(new_width / width, pad_x, pad_y, width, height, size, size)
+
+def prepare_image(image: np.ndarray, size: int = 640) -> np.ndarray:
+    """Letterbox a decoded array to the model input size, flipped top to bottom"""
+    return letterbox(image, size)[0]
+
+def prepare_large_image(image: np.ndarray, max_side: int = 0) -> Tuple[np.ndarray, Letterbox]:
+    """Keep a scan near full resolution for tiled inference and flip it top to bottom.
+
+    Only scales down (INTER_AREA), when the longer side is over max_side;
+    the flip runs in place on the decoded or resized buffer. The transform
+    has no padding, the canvas is the scan itself.
+    """
+    height, width = image.shape[:2]
+    if max_side and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        image = cv.resize(image, (round(width * scale), round(height * scale)), interpolation=cv.INTER_AREA)
+    cv.flip(image, 0, dst=image)
+    return image, Letterbox(image.shape[1] / width, 0, 0, width, height, image.shape[1], image.shape[0])
+
+def unmap_boxes(coords: List[Tuple[float, ...]], transform: Letterbox) -> List[Tuple[float, ...]]:
+    """Canvas-normalised xyxy boxes to original-image units (see Letterbox)"""
+    if not len(coords):
+        return []
+    points = transform.unmap_points(np.asarray(coords, dtype=np.float64)[:, :4].reshape(-1, 2, 2))
+    return [tuple(box) for box in points.reshape(-1, 4).tolist()]
+
+def unmap_wires(data_wire: List[Tuple[float, ...]], transform: Letterbox) -> List[Tuple[float, ...]]:
+    """Canvas-normalised (angle, x1, y1, x2, y2) wires to original-image units.
+
+    The angle is measured in canvas pixels, which are original pixels
+    scaled uniformly; it is turned into the angle of the same direction in
+    the per-axis 0-1 units, where the wire endpoints are computed.
+    """
+    if not len(data_wire):
+        return []
+    wires = np.asarray(data_wire, dtype=np.float64)
+    points = transform.unmap_points(wires[:, 1:5].reshape(-1, 2, 2)).reshape(-1, 4)
+    radians = np.radians(wires[:, 0])
+    angles = np.degrees(np.arctan2(np.sin(radians) / transform.height, np.cos(radians) / transform.width))
+    return [(angle, *point) for angle, point in zip(angles.tolist(), points.tolist())]
+
+def image_size(image: ImageLike) -> Tuple[int, int]:
+    """(width, height) of a PIL image or an HxWxC array"""
+    if isinstance(image, np.ndarray):
+        return image.shape[1], image.shape[0]
+    return image.size
+
+def clip_boxes(boxes: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Integer (x1, y1, x2, y2) slice bounds for xyxy pixel boxes, clipped to the image.
+
+    Coordinates are truncated like int(); the far edge is inclusive (as with
+    ImageDraw.rectangle), so x2/y2 become exclusive slice ends. Boxes that
+    end up empty are dropped.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64)
+    if boxes.size == 0:
+        return np.empty((0, 4), dtype=np.intp)
+    bounds = boxes.reshape(len(boxes), -1)[:, :4].astype(np.intp)
+    bounds[:, 2:] += 1
+    np.clip(bounds[:, 0::2], 0, width, out=bounds[:, 0::2])
+    np.clip(bounds[:, 1::2], 0, height, out=bounds[:, 1::2])
+    keep = (bounds[:, 2] > bounds[:, 0]) & (bounds[:, 3] > bounds[:, 1])
+    return bounds[keep]
+
+# cv2 extension, media type and quality flag of each preview format; the
+# quality is 0-100 for JPEG/WebP and the zlib level 0-9 for PNG
+IMAGE_FORMATS = {
+    "png": (".png", "image/png", cv.IMWRITE_PNG_COMPRESSION, (0, 9)),
+    "jpeg": (".jpg", "image/jpeg", cv.IMWRITE_JPEG_QUALITY, (0, 100)),
+    "webp": (".webp", "image/webp", cv.IMWRITE_WEBP_QUALITY, (1, 100)),
+}
+
+class PreviewOptions(NamedTuple):
+    """How /detect encodes its preview images.
+
+    max_side scales a preview down (INTER_AREA) when its longer side is
+    over it; 0 keeps the model resolution.
+    """
+    format: str
+    quality: int
+    max_side: int = 0
+
+    def check(self) -> "PreviewOptions":
+        """The options themselves; ValueError for an unknown format or a quality out of range"""
+        if self.format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown preview format {self.format!r}, use one of {', '.join(IMAGE_FORMATS)}")
+        low, high = IMAGE_FORMATS[self.format][3]
+        if not low <= self.quality <= high:
+            raise ValueError(f"{self.format} preview quality must be between {low} and {high}")
+        if self.max_side < 0:
+            raise ValueError("Preview max side can't be negative")
+        return self
+
+    @property
+    def media_type(self) -> str:
+        return IMAGE_FORMATS[self.format][1]
+
+def encode_preview(image: np.ndarray, options: PreviewOptions) -> bytes:
+    """Encode a model-space (flipped) BGR array upright, as options says.
+
+    Downscaling first means the flip and the encoder see the smaller image;
+    the flip runs in place on the resized buffer.
+    """
+    extension, _, flag, _ = IMAGE_FORMATS[options.format]
+    height, width = image.shape[:2]
+    if options.max_side and max(height, width) > options.max_side:
+        scale = options.max_side / max(height, width)
+        image = cv.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                          interpolation=cv.INTER_AREA)
+        cv.flip(image, 0, dst=image)
+    else:
+        image = cv.flip(image, 0)
+    ok, encoded = cv.imencode(extension, image, [flag, options.quality])
+    if not ok:
+        raise ValueError(f"{options.format} encoding failed")
+    return encoded.tobytes()
 
 # creating a white mask on the components detected
-def create_white_mask(image: Image.Image, boxes: np.ndarray) -> Image.Image:
-    """Create a copy of the image with white rectangles over detected areas"""
+def create_white_mask(image: ImageLike, boxes: np.ndarray, out: Optional[np.ndarray] = None) -> ImageLike:
+    """Create a copy of the image with white rectangles over detected areas.
+
+    Arrays are painted with one slice assignment per clipped box and the
+    result is an array the wire model takes as is. Pass out to write into a
+    caller buffer instead of a new copy (out=image paints in place).
+    """
+    if isinstance(image, np.ndarray):
+        if out is None:
+            out = image.copy()
+        elif out is not image:
+            np.copyto(out, image)
+        height, width = out.shape[:2]
+        # Slicing beats composing one boolean mask even for thousands of boxes:
+        # each slice is a contiguous memset, the mask pass touches every pixel
+        for x1, y1, x2, y2 in clip_boxes(boxes, width, height).tolist():
+            out[y1:y2, x1:x2] = 255
+        return out
+
+    from PIL import ImageDraw
+
     if image.mode != 'RGB':
         image = image.convert('RGB')
-    
+
     masked_image = image.copy()
     draw = ImageDraw.Draw(masked_image)
-    
+
     for box in boxes:
         x1, y1, x2, y2 = map(int, box[:4])
         draw.rectangle([(x1, y1), (x2, y2)], fill='white')
-    
-    return masked_image
\ No newline at end of file
+
+    return masked_image
@@ -1,16 +1,15 @@
-from ultralytics import YOLO
-
 # wire calc import
 from vision.wire.wire_calc import calculate_angle
+from vision.processing import _predict_kwargs
+from vision.tools.operations import image_size
 
-def extract_pred_wire(image, model):
-    """Modified to accept model as parameter instead of loading it"""
-    w, h = image.size
+def parse_wire_result(result, image_size):
+    """Convert one OBB result to (angle, x1, y1, x2, y2) tuples normalised to image_size"""
+    w, h = image_size
 
     coords = []
-    results = model(image)
-    obb_boxes = results[0].obb.xyxyxyxyn
-    conf = results[0].obb.conf
+    obb_boxes = result.obb.xyxyxyxyn
+    conf = result.obb.conf
 
     for obb_box, confidence in zip(obb_boxes, conf):
         coordinate = obb_box.flatten().tolist()
@@ -23,5 +22,19 @@ def extract_pred_wire(image, model):
 
     return coords
 
+def extract_pred_wire(image, model, conf_threshold=None):
+    """Modified to accept model as parameter instead of loading it"""
+    results = model(image, **_predict_kwargs(conf_threshold))
+    return parse_wire_result(results[0], image_size(image))
+
+def extract_pred_wire_batch(images, model, batch_size=8, conf_threshold=None):
+    """extract_pred_wire for a list of images, one forward pass per chunk"""
+    preds = []
+    for start in range(0, len(images), batch_size):
+        chunk = images[start:start + batch_size]
+        results = model(chunk, **_predict_kwargs(conf_threshold))
+        preds.extend(parse_wire_result(result, image_size(image)) for result, image in zip(results, chunk))
+    return preds
+
 # if __name__ == "__main__":
 #     data = extract_pred_wire(r'C:\Users\chana\Documents\Coding\Backend\vision\test.jpg')
\ No newline at end of file